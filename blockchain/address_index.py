@@ -0,0 +1,107 @@
+import bisect
+
+class AddressIndex:
+    """
+    Maps each address to the confirmed transactions it sent or received,
+    including payments to it in any output of an explicit transaction.
+    
+    Each address keeps a list of (timestamp, height, position) entries sorted
+    by transaction time, so a page of history or a time range is found by
+    bisection and costs O(results) rather than a walk over the whole chain.
+    Blocks are added as they connect and removed as they disconnect.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        # {address: [(timestamp, height, position)]} sorted by time
+        self.entries = {}
+    
+    @staticmethod
+    def _addresses(transaction):
+        """Addresses whose history includes a transaction: its sender and every output's owner."""
+        # Rewards only count for their recipients
+        senders = () if transaction.is_coinbase() else (transaction.sender,)
+        recipients = tuple(address for address, _ in transaction.outputs)
+        return tuple(dict.fromkeys(senders + recipients))
+    
+    def connect_block(self, block, height):
+        """
+        Index the transactions of a block added to the chain.
+        
+        Args:
+            block: The connected Block
+            height: Its position in the chain
+        """
+        for position, tx in enumerate(block.transactions):
+            entry = (tx.timestamp, height, position)
+            for address in self._addresses(tx):
+                history = self.entries.setdefault(address, [])
+                if not history or history[-1] <= entry:
+                    history.append(entry)  # Usual case: newer than anything indexed
+                else:
+                    bisect.insort(history, entry)
+    
+    def disconnect_block(self, block, height):
+        """
+        Remove the transactions of a block taken off the chain.
+        
+        Args:
+            block: The disconnected Block
+            height: The position it had in the chain
+        """
+        for position, tx in enumerate(block.transactions):
+            entry = (tx.timestamp, height, position)
+            for address in self._addresses(tx):
+                history = self.entries.get(address)
+                if not history:
+                    continue
+                i = bisect.bisect_left(history, entry)
+                if i < len(history) and history[i] == entry:
+                    del history[i]
+                if not history:
+                    del self.entries[address]
+    
+    def query(self, address, start_time=None, end_time=None, offset=0, limit=None, newest_first=True):
+        """
+        Look up the transactions of an address in time order.
+        
+        Args:
+            address: Wallet address
+            start_time: Earliest transaction timestamp to include (optional)
+            end_time: Latest transaction timestamp to include (optional)
+            offset: Number of matching entries to skip (for paging)
+            limit: Maximum number of entries to return (None returns all)
+            newest_first: Order from the most recent transaction backwards
+        
+        Returns:
+            list: (height, position) of each matching transaction
+        """
+        history = self.entries.get(address)
+        if not history:
+            return []
+        
+        low = 0 if start_time is None else bisect.bisect_left(history, (start_time,))
+        high = len(history) if end_time is None else bisect.bisect_left(history, (end_time, float('inf')))
+        if newest_first:
+            stop = high - offset
+            start = stop - limit if limit is not None else low
+            selected = reversed(history[max(start, low):max(stop, low)])
+        else:
+            start = low + offset
+            stop = start + limit if limit is not None else high
+            selected = history[min(start, high):min(stop, high)]
+        return [(height, position) for _, height, position in selected]
+    
+    def count(self, address):
+        """Return the number of confirmed transactions of an address."""
+        return len(self.entries.get(address, ()))
+    
+    def __contains__(self, address):
+        return address in self.entries
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"AddressIndex(addresses={len(self.entries)})"
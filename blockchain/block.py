@@ -1,10 +1,35 @@
 import time
 import hashlib
+import copy
 import json
+import struct
+from .merkle import MerkleTree, verify_proof
+from .transaction import Transaction
 # from Crypto.Hash import SHA256
 
+# Version 1 blocks hash the full JSON of the block (including every transaction).
+# Version 2 blocks hash a fixed-layout binary header that commits to the
+# transactions only through the merkle root.
+# Version 3 blocks build the merkle root from raw digests with MerkleTree, which
+# hashes leaves and internal nodes under different prefixes (versions 1 and 2
+# hash concatenated hex strings).
+LEGACY_BLOCK_VERSION = 1
+BLOCK_VERSION = 3
+MERKLE_TREE_VERSION = 3
+
+# version, index, previous_hash, merkle_root, timestamp, bits, nonce
+# The nonce is the last field so the header prefix stays constant while mining.
+BLOCK_HEADER = struct.Struct('<IQ32s32sdII')
+BLOCK_HEADER_SIZE = BLOCK_HEADER.size
+
 class Block:
-    def __init__(self, index, previous_hash, transactions, timestamp=None, nonce=0):
+    # Fields covered by the cached encodings. Once sealed, they can only be
+    # changed through update(), add_transaction() or replace_transaction().
+    ENCODED_FIELDS = frozenset({'version', 'index', 'previous_hash', 'transactions', 'timestamp',
+                                'nonce', 'bits', 'merkle_root', 'hash'})
+    
+    def __init__(self, index, previous_hash, transactions, timestamp=None, nonce=0,
+                 bits=0, version=BLOCK_VERSION):
         """
         Initialize a new block in the blockchain.
         
@@ -14,32 +39,148 @@ class Block:
             transactions: List of Transaction objects
             timestamp: Time block was created (defaults to current time)
             nonce: Value for Proof-of-Work (defaults to 0)
+            bits: Compact Proof-of-Work target committed to in the header
+            version: Block format version (LEGACY_BLOCK_VERSION for JSON-hashed blocks)
         """
+        object.__setattr__(self, '_sealed', False)
+        object.__setattr__(self, '_encodings', {})
+        self.version = version
         self.index = index
         self.previous_hash = previous_hash
         self.transactions = transactions
         self.timestamp = timestamp if timestamp else time.time()
         self.nonce = nonce
-        self.merkle_root = self.calculate_merkle_root()
+        self.bits = bits
+        self.merkle_tree = None
+        if self.version >= MERKLE_TREE_VERSION:
+            self.merkle_tree = MerkleTree(tx.tx_id for tx in self.transactions)
+            self.merkle_root = self.merkle_tree.root_hex
+        else:
+            self.merkle_root = self.calculate_merkle_root()
         self.hash = self.calculate_hash()
     
+    @classmethod
+    def from_dict(cls, block_dict):
+        """
+        Rebuild a block from its dictionary representation.
+        
+        The merkle root and hash are recalculated from the contents, so callers
+        can compare them with the ones in the dictionary.
+        
+        Args:
+            block_dict: Dictionary as produced by to_dict
+            
+        Returns:
+            Block: The rebuilt block
+        """
+        return cls(
+            index=block_dict['index'],
+            previous_hash=block_dict['previous_hash'],
+            transactions=[Transaction.from_dict(tx_dict) for tx_dict in block_dict['transactions']],
+            timestamp=block_dict['timestamp'],
+            nonce=block_dict['nonce'],
+            bits=block_dict.get('bits', 0),
+            version=block_dict.get('version', LEGACY_BLOCK_VERSION)
+        )
+    
+    def __setattr__(self, name, value):
+        if self._sealed and name in self.ENCODED_FIELDS:
+            raise AttributeError(f"Block {self.index} is sealed; use update() to change {name}")
+        object.__setattr__(self, name, value)
+    
+    def __getstate__(self):
+        # Cached encodings are rebuilt on demand rather than sent over the wire
+        state = self.__dict__.copy()
+        state['_encodings'] = {}
+        return state
+    
+    def seal(self):
+        """
+        Make the block and its transactions immutable and cache their encodings.
+        
+        Returns:
+            Block: self, for chaining
+        """
+        for tx in self.transactions:
+            tx.seal()
+        object.__setattr__(self, '_sealed', True)
+        return self
+    
+    @property
+    def sealed(self):
+        """Whether the block is sealed."""
+        return self._sealed
+    
+    def update(self, **fields):
+        """
+        Change fields of a (possibly sealed) block, dropping its cached encodings.
+        
+        The merkle root and hash are not recalculated; pass them explicitly if
+        they should change.
+        
+        Args:
+            **fields: New values of fields in ENCODED_FIELDS
+        """
+        unknown = set(fields) - self.ENCODED_FIELDS
+        if unknown:
+            raise AttributeError(f"Cannot update unknown block fields: {sorted(unknown)}")
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_encodings', {})
+    
+    def _cached(self, key, build):
+        """Return an encoding, built once per sealed block (every time before sealing)."""
+        if not self._sealed:
+            return build()
+        value = self._encodings.get(key)
+        if value is None:
+            value = self._encodings[key] = build()
+        return value
+    
+    def header_bytes(self):
+        """
+        Serialize the block header into its fixed binary layout.
+        
+        Returns:
+            bytes: The packed block header
+        """
+        return self._cached('header', self._pack_header)
+    
+    def _pack_header(self):
+        return BLOCK_HEADER.pack(
+            self.version,
+            self.index,
+            bytes.fromhex(self.previous_hash),
+            bytes.fromhex(self.merkle_root),
+            self.timestamp,
+            self.bits,
+            self.nonce
+        )
+    
     def calculate_hash(self):
         """
         Calculate the hash of this block.
         
         Returns:
-            str: SHA-256 hash of block data
+            str: SHA-256 hash of the block header (or of the full block JSON
+                for legacy blocks)
         """
-        block_string = json.dumps(self.to_dict(include_hash=False), sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        if self.version == LEGACY_BLOCK_VERSION:
+            block_string = json.dumps(self._legacy_dict(), sort_keys=True)
+            return hashlib.sha256(block_string.encode()).hexdigest()
+        
+        return hashlib.sha256(self.header_bytes()).hexdigest()
     
     def calculate_merkle_root(self):
         """
-        Calculate the Merkle root of the transactions.
+        Calculate the Merkle root of the transactions from scratch.
         
         Returns:
             str: Merkle root hash of all transactions
         """
+        if self.version >= MERKLE_TREE_VERSION:
+            return MerkleTree(tx.tx_id for tx in self.transactions).root_hex
+        
         if not self.transactions:
             return hashlib.sha256("".encode()).hexdigest()
         
@@ -68,33 +209,124 @@ class Block:
         
         return tx_hashes[0] if tx_hashes else ""
     
+    def has_valid_merkle_root(self):
+        """
+        Check that the merkle root commits to the transactions, each listed once.
+        
+        An odd node is paired with itself, so [a, b, c] and [a, b, c, c] have
+        the same root; a repeated transaction ID is rejected for that reason.
+        
+        Returns:
+            bool: True if the merkle root matches and no transaction repeats
+        """
+        if len({tx.tx_id for tx in self.transactions}) != len(self.transactions):
+            return False
+        return self.merkle_root == self.calculate_merkle_root()
+    
+    def add_transaction(self, transaction):
+        """
+        Append a transaction, updating the merkle root and block hash.
+        
+        Args:
+            transaction: The Transaction object to append
+        """
+        self.transactions.append(transaction)
+        if self._sealed:
+            transaction.seal()
+        if self.merkle_tree is not None:
+            self.merkle_tree.append(transaction.tx_id)
+            self.update(merkle_root=self.merkle_tree.root_hex)
+        else:
+            self.update(merkle_root=self.calculate_merkle_root())
+        self.update(hash=self.calculate_hash())
+    
+    def replace_transaction(self, index, transaction):
+        """
+        Replace the transaction at a position (e.g. an updated reward transaction).
+        
+        Args:
+            index: Position of the transaction in the block
+            transaction: The new Transaction object
+        """
+        self.transactions[index] = transaction
+        if self._sealed:
+            transaction.seal()
+        if self.merkle_tree is not None:
+            self.merkle_tree.replace(index, transaction.tx_id)
+            self.update(merkle_root=self.merkle_tree.root_hex)
+        else:
+            self.update(merkle_root=self.calculate_merkle_root())
+        self.update(hash=self.calculate_hash())
+    
+    def get_proof(self, tx_id):
+        """
+        Build a Merkle inclusion proof for one of this block's transactions.
+        
+        Args:
+            tx_id: ID of the transaction
+        
+        Returns:
+            list or None: Proof usable with verify_proof, None if not in this block
+        """
+        if self.merkle_tree is None:
+            return None
+        return self.merkle_tree.get_proof(tx_id)
+    
+    def verify_transaction_proof(self, tx_id, proof):
+        """
+        Check a Merkle inclusion proof against this block's merkle root.
+        
+        Args:
+            tx_id: ID of the transaction
+            proof: Proof as returned by get_proof
+        
+        Returns:
+            bool: True if the transaction is committed to by this block
+        """
+        return verify_proof(tx_id, proof, self.merkle_root)
+    
     def to_dict(self, include_hash=True):
         """
         Convert block to dictionary format.
         
         Args:
             include_hash: Whether to include block hash in the dictionary
-            
+        
         Returns:
             dict: Dictionary representation of the block
         """
-        block_dict = {
+        # Deep, so changes to nested transactions can't reach the cache
+        block_dict = copy.deepcopy(self._cached('dict', self._build_dict))
+        if include_hash:
+            block_dict['hash'] = self.hash
+        return block_dict
+    
+    def _build_dict(self):
+        return {
+            'version': self.version,
             'index': self.index,
             'previous_hash': self.previous_hash,
             'transactions': [tx.to_dict() for tx in self.transactions],
             'timestamp': self.timestamp,
             'nonce': self.nonce,
+            'bits': self.bits,
+            'merkle_root': self.merkle_root
+        }
+    
+    def _legacy_dict(self):
+        """Return the fields hashed by version 1 blocks."""
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'transactions': [tx.to_legacy_dict() for tx in self.transactions],
+            'timestamp': self.timestamp,
+            'nonce': self.nonce,
             'merkle_root': self.merkle_root
         }
-        
-        if include_hash:
-            block_dict['hash'] = self.hash
-            
-        return block_dict
     
     def to_json(self):
         """Convert block to JSON format."""
-        return json.dumps(self.to_dict(), sort_keys=True)
+        return self._cached('json', lambda: json.dumps(self.to_dict(), sort_keys=True))
     
     def __repr__(self):
         """Debug-friendly string representation."""
@@ -110,7 +342,7 @@ class Block:
 
 if __name__ == "__main__":
     from .transaction import Transaction  # make sure this path is correct
-
+    
     # Create a couple of dummy transactions
     tx1 = Transaction("Alice", "Bob", 5)
     tx2 = Transaction("Bob", "Charlie", 2)
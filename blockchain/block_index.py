@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from blockchain.block import LEGACY_BLOCK_VERSION
+from mining.proof_of_work import is_valid_proof, bits_to_target
+
+# Blocks kept while waiting for their parent to arrive
+DEFAULT_MAX_ORPHAN_BLOCKS = 100
+
+class BlockIndexEntry:
+    """A known block with its position in the block tree."""
+    __slots__ = ('block', 'height', 'chain_work')
+    
+    def __init__(self, block, height, chain_work):
+        """
+        Initialize an entry.
+        
+        Args:
+            block: The Block
+            height: Number of blocks between it and the genesis block
+            chain_work: Total proof-of-work of the branch ending at this block
+        """
+        self.block = block
+        self.height = height
+        self.chain_work = chain_work
+    
+    @property
+    def hash(self):
+        return self.block.hash
+    
+    @property
+    def previous_hash(self):
+        return self.block.previous_hash
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"BlockIndexEntry(height={self.height}, hash={self.hash[:10]}..., work={self.chain_work})"
+
+
+class BlockIndex:
+    """
+    Every valid block the node has seen, keyed by hash, whichever branch it is on.
+    
+    The active chain stays a list in Blockchain.chain (O(1) by height); this
+    index adds O(1) lookup by hash for side branches as well, each entry
+    carrying its height and cumulative work so competing tips can be
+    compared without walking them. Blocks whose parent is not known yet
+    wait in a bounded orphan pool, oldest evicted first; only blocks carrying
+    real proof of work get in, so cheap blocks can't flush it.
+    """
+    
+    def __init__(self, max_orphans=DEFAULT_MAX_ORPHAN_BLOCKS):
+        """
+        Initialize an empty index.
+        
+        Args:
+            max_orphans: Number of parentless blocks to hold on to
+        """
+        self.entries = {}
+        self.max_orphans = max_orphans
+        # {hash: block} in arrival order, and {parent hash: [hash]} to find them
+        self.orphans = OrderedDict()
+        self._orphans_by_parent = {}
+    
+    def add(self, block, work):
+        """
+        Index a block whose parent is already indexed (or a genesis block).
+        
+        Args:
+            block: The Block to add
+            work: Proof-of-work of the block alone
+        
+        Returns:
+            BlockIndexEntry: The new entry (or the existing one for a known block)
+        """
+        entry = self.entries.get(block.hash)
+        if entry is not None:
+            return entry
+        parent = self.entries.get(block.previous_hash)
+        if parent is None:
+            entry = BlockIndexEntry(block, 0, work)
+        else:
+            entry = BlockIndexEntry(block, parent.height + 1, parent.chain_work + work)
+        self.entries[block.hash] = entry
+        return entry
+    
+    def add_checkpoint(self, block, height, chain_work):
+        """
+        Index a block whose ancestors are not indexed yet, such as the tip of a UTXO snapshot.
+        
+        Args:
+            block: The Block
+            height: Its height in the chain
+            chain_work: Total proof-of-work of the chain ending at it
+        
+        Returns:
+            BlockIndexEntry: The new entry
+        """
+        entry = BlockIndexEntry(block, height, chain_work)
+        self.entries[block.hash] = entry
+        return entry
+    
+    def remove(self, block_hash):
+        """Forget a block, e.g. one that failed validation when connected."""
+        self.entries.pop(block_hash, None)
+    
+    def get(self, block_hash):
+        """Return the entry of a block, or None if unknown."""
+        return self.entries.get(block_hash)
+    
+    def add_orphan(self, block, max_target, difficulty):
+        """
+        Hold a block whose parent is unknown, evicting the oldest orphan if full.
+        
+        Its expected target can't be known without the parent, so the block is
+        checked against the target it claims, which must not be easier than
+        max_target.
+        
+        Args:
+            block: The Block to hold
+            max_target: Easiest target the chain could require of it
+            difficulty: Leading zeros required of legacy blocks, which carry no target
+        
+        Returns:
+            bool: True if the block is held, False if its proof of work is invalid or too weak
+        """
+        if block.hash in self.orphans:
+            return True
+        if block.version != LEGACY_BLOCK_VERSION and bits_to_target(block.bits) > max_target:
+            return False
+        if not is_valid_proof(block, difficulty, bits=block.bits):
+            return False
+        self.orphans[block.hash] = block
+        self._orphans_by_parent.setdefault(block.previous_hash, []).append(block.hash)
+        while len(self.orphans) > self.max_orphans:
+            _, evicted = self.orphans.popitem(last=False)
+            self._forget_orphan(evicted)
+        return True
+    
+    def take_orphans(self, parent_hash):
+        """
+        Remove and return the orphans waiting for a block.
+        
+        Args:
+            parent_hash: Hash of the block that just arrived
+        
+        Returns:
+            list: Blocks whose parent it is, in arrival order
+        """
+        hashes = self._orphans_by_parent.pop(parent_hash, [])
+        return [self.orphans.pop(block_hash) for block_hash in hashes]
+    
+    def _forget_orphan(self, block):
+        siblings = self._orphans_by_parent.get(block.previous_hash)
+        if siblings:
+            siblings.remove(block.hash)
+            if not siblings:
+                del self._orphans_by_parent[block.previous_hash]
+    
+    def __contains__(self, block_hash):
+        return block_hash in self.entries
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"BlockIndex(blocks={len(self.entries)}, orphans={len(self.orphans)})"
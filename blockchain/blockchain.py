@@ -1,25 +1,107 @@
 import time
 import json
-from .block import Block
+import threading
+from .block import Block, LEGACY_BLOCK_VERSION, BLOCK_HEADER_SIZE
 from .transaction import Transaction
-from mining.proof_of_work import proof_of_work, is_valid_proof
-from blockchain.utxo import UTXOSet
+from .concurrency import ReadWriteLock
+from mining.proof_of_work import (proof_of_work, is_valid_proof, bits_to_target,
+                                  target_to_bits, difficulty_to_bits, block_work, MAX_TARGET)
+from blockchain.utxo import UTXO, UTXOSet
+from blockchain.spent_index import SpentOutpointIndex
+from blockchain.address_index import AddressIndex
+from blockchain.undo import BlockUndo
+from blockchain.block_index import BlockIndex, DEFAULT_MAX_ORPHAN_BLOCKS
+from blockchain.verification import BatchVerifier, SignatureCache, DEFAULT_SIGNATURE_CACHE_ENTRIES
+from blockchain.mempool import Mempool, DEFAULT_MAX_MEMPOOL_BYTES, DEFAULT_MEMPOOL_EXPIRY
+from mining.cancellation import CancellationToken
+from mining.block_template import BlockTemplateBuilder, DEFAULT_MAX_BLOCK_BYTES
+from storage.utxo_store import UTXOStore, DEFAULT_UTXO_CACHE_SIZE
+from storage.utxo_snapshot import UTXOSnapshot, content_hash, DEFAULT_SNAPSHOT_CHUNK_SIZE
+
+# Retarget the proof-of-work every this many blocks
+RETARGET_INTERVAL = 10
+# Desired time between blocks (seconds)
+TARGET_BLOCK_TIME = 10
+# Limit each retarget to a factor of 4 in either direction
+MAX_RETARGET_FACTOR = 4
+# Coins created by each block, on top of the fees it collects
+BLOCK_REWARD = 5.0
+# Block space kept free for the header and the reward transaction (bytes)
+COINBASE_RESERVED_BYTES = 1000
+# A block must be timestamped after the median of this many blocks before it
+MEDIAN_TIME_SPAN = 11
+# ... and at most this far (seconds) ahead of the local clock
+MAX_FUTURE_BLOCK_TIME = 2 * 60 * 60
 
 class Blockchain:
-    def __init__(self, difficulty=4, miner_address=None):
+    def __init__(self, difficulty=4, miner_address=None, mining_workers=1,
+                 retarget_interval=RETARGET_INTERVAL, target_block_time=TARGET_BLOCK_TIME,
+                 max_block_bytes=DEFAULT_MAX_BLOCK_BYTES, max_mempool_bytes=DEFAULT_MAX_MEMPOOL_BYTES,
+                 mempool_expiry=DEFAULT_MEMPOOL_EXPIRY, verification_workers=1,
+                 signature_cache_entries=DEFAULT_SIGNATURE_CACHE_ENTRIES, utxo_db=None,
+                 utxo_cache_size=DEFAULT_UTXO_CACHE_SIZE, max_orphan_blocks=DEFAULT_MAX_ORPHAN_BLOCKS):
         """
         Initialize a new blockchain.
         
         Args:
-            difficulty: Mining difficulty (number of zeros needed in hash prefix)
+            difficulty: Initial mining difficulty (number of zeros needed in hash prefix)
+            miner_address: Address receiving the genesis reward (optional)
+            mining_workers: Default number of proof-of-work processes (None uses every core)
+            retarget_interval: Number of blocks between target adjustments
+            target_block_time: Desired time between blocks in seconds
+            max_block_bytes: Serialized size budget of a block
+            max_mempool_bytes: Memory budget of the pending transaction pool
+            mempool_expiry: Age in seconds after which pending transactions are dropped
+            verification_workers: Processes used for batch signature checks (None uses every core)
+            signature_cache_entries: Successful signature checks remembered across
+                mempool admission and block validation
+            utxo_db: SQLite file keeping the UTXO set and the chain on disk (optional;
+                an existing file is reloaded instead of creating a genesis block)
+            utxo_cache_size: Outpoints kept in memory when utxo_db is used
+            max_orphan_blocks: Received blocks held while their parent is unknown
         """
-        self.utxo_set = UTXOSet()
+        # Guards the chain and the UTXO set; the mempool has its own lock.
+        # Always take chain_lock before mempool.lock.
+        self.chain_lock = ReadWriteLock()
+        # Serializes block connection and disconnection; reentrant so a reorg can
+        # hold it across all the blocks it swaps
+        self._connect_mutex = threading.RLock()
+        self.utxo_set = UTXOStore(utxo_db, utxo_cache_size) if utxo_db else UTXOSet()
+        # Which pending transaction spends each outpoint
+        self.spent_index = SpentOutpointIndex()
+        # Confirmed transactions of each address, for history queries
+        self.address_index = AddressIndex()
         self.chain = []
-        self.unconfirmed_transactions = []
+        # Undo entry of each block, aligned with self.chain (None where unknown)
+        self.undo_logs = []
+        # Every valid block seen, on the active chain or a side branch, by hash
+        self.block_index = BlockIndex(max_orphan_blocks)
+        self.mempool = Mempool(max_bytes=max_mempool_bytes, expiry=mempool_expiry)
+        self.signature_cache = SignatureCache(signature_cache_entries)
+        self.verifier = BatchVerifier(verification_workers, cache=self.signature_cache)
         self.difficulty = difficulty
+        self.initial_bits = difficulty_to_bits(difficulty)
+        self.retarget_interval = retarget_interval
+        self.target_block_time = target_block_time
+        self.mining_workers = mining_workers
+        self.max_block_bytes = max_block_bytes
+        self.template_builder = BlockTemplateBuilder(
+            max_block_bytes - BLOCK_HEADER_SIZE - COINBASE_RESERVED_BYTES
+        )
+        # The builder follows every mempool addition and removal
+        self.mempool.add_listener(self.template_builder)
+        # Cancellation tokens of proof-of-work searches currently running
+        self._mining_tokens = set()
         self.last_known_hash = None
+        # Background check of the history below a loaded UTXO snapshot:
+        # None (no snapshot), "running", "valid" or "invalid"; an invalid
+        # snapshot's state is kept for inspection but nothing is added to it
+        self.snapshot_validation = None
+        self._history_thread = None
         # self.utxo_set = {} # Dictionary to track unspent transaction outputs
-        if miner_address:
+        if utxo_db and self._load_stored_chain():
+            pass
+        elif miner_address:
             self.create_genesis_block(miner_address)
     
     # def create_genesis_block(self):
@@ -38,101 +120,1035 @@ class Blockchain:
         reward_tx = Transaction(sender="0", receiver=miner_address, amount=50, timestamp=time.time())
         reward_tx.tx_id = reward_tx._calculate_tx_id()
         reward_tx.signature = "GENESIS"
-        genesis_block = Block(index=0, previous_hash="0"*64, transactions=[reward_tx], timestamp=time.time())
+        genesis_block = Block(index=0, previous_hash="0"*64, transactions=[reward_tx], timestamp=time.time(),
+                              bits=self.initial_bits).seal()
+        undo = BlockUndo()
         self.chain.append(genesis_block)
-        self.utxo_set.update_utxos(reward_tx)
+        self.undo_logs.append(undo)
+        self.block_index.add(genesis_block, block_work(self._block_bits(genesis_block)))
+        self.address_index.connect_block(genesis_block, 0)
+        self.utxo_set.update_utxos(reward_tx, undo)
+        self.utxo_set.flush(genesis_block, 0, undo)
         return genesis_block
+    
+    def _load_stored_chain(self):
+        """
+        Reload the chain kept next to an on-disk UTXO set.
+        
+        The UTXO set itself is already up to date on disk; only the in-memory
+        indexes are rebuilt from the blocks.
+        
+        Returns:
+            bool: True if a stored chain was loaded
+        """
+        for block_dict, undo_dict in self.utxo_set.load_blocks():
+            block = Block.from_dict(block_dict)
+            if block.hash != block_dict['hash']:
+                raise ValueError(f"Stored block {block.index} does not match its hash")
+            self.chain.append(block.seal())
+            self.undo_logs.append(BlockUndo.from_dict(undo_dict) if undo_dict else None)
+            self.block_index.add(block, block_work(self._block_bits(block)))
+            self.address_index.connect_block(block, len(self.chain) - 1)
+        if not self.chain:
+            return False
+        self.last_known_hash = self.chain[-1].hash
+        print(f"Loaded {len(self.chain)} blocks and {len(self.utxo_set)} UTXOs from {self.utxo_set.db_file}")
+        return True
+    
+    def export_snapshot(self, file_name, chunk_size=DEFAULT_SNAPSHOT_CHUNK_SIZE):
+        """
+        Dump the UTXO set at the current tip to a binary snapshot.
+        
+        Args:
+            file_name: File to write
+            chunk_size: UTXOs per compressed chunk
+        
+        Returns:
+            str: Content hash of the snapshot, for nodes to check it against
+        """
+        with self.chain_lock.read_lock():
+            height = len(self.chain) - 1
+            tip = self.chain[-1]
+            chain_work = self.block_index.get(tip.hash).chain_work
+            digest = UTXOSnapshot.write(self.utxo_set.iter_sorted(), file_name, height, tip.hash,
+                                        chain_work, chunk_size)
+        print(f"Wrote snapshot of {len(self.utxo_set)} UTXOs at height {height} to {file_name}")
+        return digest
+    
+    def load_snapshot(self, file_name, blocks, expected_hash=None):
+        """
+        Bootstrap an empty blockchain from a UTXO snapshot instead of replaying the chain.
+        
+        The UTXO set is bulk-loaded from the snapshot, so balance queries and
+        mining work as soon as this returns, after time proportional to the
+        size of the set. The blocks up to the snapshot height are then checked
+        and replayed in a background thread (see snapshot_validation), which
+        also fills in the address history index. If that
+        replay fails, the blockchain stops accepting transactions and blocks.
+        
+        Args:
+            file_name: Snapshot written by export_snapshot()
+            blocks: Blocks of the chain up to at least the snapshot height (e.g. from a peer)
+            expected_hash: Content hash the snapshot must have, from a trusted source (optional)
+        
+        Returns:
+            bool: True if the snapshot was loaded
+        """
+        try:
+            header = UTXOSnapshot.read_header(file_name)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read snapshot: {e}")
+            return False
+        height = header['height']
+        if expected_hash is not None and header['content_hash'] != expected_hash:
+            print(f"Snapshot {file_name} has content hash {header['content_hash']}, expected {expected_hash}")
+            return False
+        if len(blocks) <= height or blocks[height].hash != header['block_hash']:
+            print(f"Snapshot {file_name} is for a block not in the given chain at height {height}")
+            return False
+        
+        with self._connect_mutex, self.chain_lock.write_lock():
+            if self.chain or len(self.utxo_set):
+                print("Only an empty blockchain can be bootstrapped from a snapshot")
+                return False
+            try:
+                self.utxo_set.bulk_load(UTXOSnapshot.read(file_name))
+            except ValueError as e:
+                print(f"Rejected snapshot: {e}")
+                return False
+            
+            tip = blocks[height].seal()
+            self.chain = list(blocks[:height + 1])
+            # Blocks below the snapshot can't be disconnected
+            self.undo_logs = [None] * (height + 1)
+            self.block_index.add_checkpoint(tip, height, header['chain_work'])
+            self.last_known_hash = tip.hash
+            self.snapshot_validation = "running"
+        
+        print(f"Loaded {len(self.utxo_set)} UTXOs at height {height} from {file_name}; "
+              f"validating history in the background")
+        self._history_thread = threading.Thread(target=self._validate_history, args=(header,))
+        self._history_thread.daemon = True
+        self._history_thread.start()
+        return True
+    
+    def _validate_history(self, header):
+        """
+        Replay the chain below a loaded snapshot and compare the result with it (runs in a thread).
+        
+        Each block is checked as is_chain_valid() does, plus its signatures,
+        and applied to a scratch UTXO set. The snapshot is confirmed if the
+        replayed set has its content hash and the chain its cumulative work.
+        
+        Args:
+            header: Header of the loaded snapshot
+        """
+        height = header['height']
+        with self.chain_lock.read_lock():
+            blocks = self.chain[:height + 1]
+        
+        replayed = UTXOSet()
+        chain_work = 0
+        problem = None
+        for i, block in enumerate(blocks):
+            if i > 0 and block.previous_hash != blocks[i - 1].hash:
+                problem = f"block {i} doesn't link to the previous block"
+            elif block.hash != block.calculate_hash() or not block.has_valid_merkle_root():
+                problem = f"invalid hash or merkle root in block {i}"
+            elif i > 0 and not is_valid_proof(block, self.difficulty, bits=self.get_next_bits(i)):
+                problem = f"invalid proof of work in block {i}"
+            elif i > 0 and not self._has_valid_reward(block):
+                problem = f"invalid block reward in block {i}"
+            elif not all(tx.has_valid_id() for tx in block.transactions):
+                problem = f"transaction ID not matching its contents in block {i}"
+            elif i > 0 and not self.verify_block_signatures(block):
+                problem = f"invalid transaction signature in block {i}"
+            elif not all(replayed.update_utxos(tx) for tx in block.transactions):
+                problem = f"block {i} spends unavailable funds"
+            if problem:
+                break
+            
+            chain_work += block_work(self._block_bits(block))
+            # Fill in what the snapshot skipped
+            with self.chain_lock.write_lock(), self.mempool.lock:
+                block.seal()
+                if i < height:
+                    self.block_index.add(block, block_work(self._block_bits(block)))
+                self.address_index.connect_block(block, i)
+        
+        if problem is None and chain_work != header['chain_work']:
+            problem = "cumulative work differs from the snapshot"
+        if problem is None and content_hash(replayed.iter_sorted()) != header['content_hash']:
+            problem = "replayed UTXO set differs from the snapshot"
+        if problem:
+            print(f"⚠️ Snapshot history is invalid: {problem}")
+            self.snapshot_validation = "invalid"
+            return
+        
+        self.utxo_set.store_blocks(blocks)
+        self.snapshot_validation = "valid"
+        print(f"Validated the {len(blocks)} blocks below the snapshot")
+    
+    def _rejects_updates(self):
+        """Check whether the state came from a snapshot whose history failed validation."""
+        if self.snapshot_validation == "invalid":
+            print("Rejected: the UTXO snapshot this chain was loaded from is invalid")
+            return True
+        return False
+    
+    def wait_for_history_validation(self, timeout=None):
+        """
+        Block until the background check of a loaded snapshot finishes.
+        
+        Args:
+            timeout: Seconds to wait at most (None waits forever)
+        
+        Returns:
+            str or None: The value of snapshot_validation
+        """
+        if self._history_thread is not None:
+            self._history_thread.join(timeout)
+        return self.snapshot_validation
 
+    @property
+    def unconfirmed_transactions(self):
+        """Pending transactions (the Mempool; iterable in arrival order)."""
+        return self.mempool
+    
     def get_latest_block(self):
         """Get the most recent block in the chain."""
-        return self.chain[-1]
+        with self.chain_lock.read_lock():
+            return self.chain[-1]
     
-    def add_transaction(self, transaction):
+    def add_transaction(self, transaction, check_signature=True, added_at=None):
         """
         Add a transaction to the pool of unconfirmed transactions.
         
         Args:
             transaction: The Transaction object to add
+            check_signature: Verify the signature (False if the caller already did)
+            added_at: Time it first entered a mempool (defaults to now)
             
         Returns:
             bool: True if transaction is valid and added, False otherwise
         """
-        # Verify transaction signature
-        if not transaction.verify_signature():
+        if self._rejects_updates():
+            return False
+        
+        # Submitted transactions are final; their encodings are cached from here on
+        transaction.seal()
+        
+        # Verify transaction signature (cached, so block validation won't repeat it)
+        if check_signature and not self.verify_transactions([transaction])[0]:
             print(f"Invalid transaction signature: {transaction.tx_id}")
             return False
         
-        # Check if sender has enough balance (UTXO)
-        sender_balance = self.get_balance(transaction.sender)
-        if sender_balance < transaction.amount:
-            print(f"Insufficient balance: {transaction.sender} has {sender_balance}, needs {transaction.amount}")
+        if not transaction.has_valid_id():
+            print(f"Transaction ID {transaction.tx_id} does not match its contents")
+            return False
+        if not transaction.is_well_formed():
+            print(f"Malformed amounts or inputs in transaction {transaction.tx_id}")
             return False
         
-        # Add to unconfirmed transactions pool
-        self.unconfirmed_transactions.append(transaction)
-        return True
+        # The chain and the mempool must not change between the checks and the admission
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            # Every explicit input must be an output the sender owns, confirmed or pending
+            missing = self.get_missing_inputs(transaction)
+            if missing:
+                print(f"Unknown inputs in transaction {transaction.tx_id}: {missing}")
+                return False
+            
+            # ... and together they must cover the outputs and the fee
+            if transaction.inputs is not None:
+                input_total = self.get_input_total(transaction)
+                output_total = sum(amount for _, amount in transaction.outputs)
+                if input_total < output_total + transaction.fee:
+                    print(f"Inputs of {transaction.tx_id} are worth {input_total}, "
+                          f"outputs and fee need {output_total + transaction.fee}")
+                    return False
+            
+            if self.is_double_spending(transaction):
+                print(f"Double spend rejected: {transaction.tx_id}")
+                return False
+            
+            # Implicit inputs come out of the confirmed balance; explicit ones were valued above
+            sender_balance = self.get_balance(transaction.sender)
+            if transaction.inputs is None and sender_balance < transaction.total_cost():
+                print(f"Insufficient balance: {transaction.sender} has {sender_balance}, needs {transaction.total_cost()}")
+                return False
+            
+            return self.accept_transaction(transaction, added_at)
+    
+    def add_transactions(self, transactions):
+        """
+        Add a batch of transactions, verifying their signatures together.
+        
+        Args:
+            transactions: List of Transaction objects
+            
+        Returns:
+            list: One bool per transaction, True if it was added
+        """
+        results = []
+        for transaction, signature_ok in zip(transactions, self.verify_transactions(transactions)):
+            if not signature_ok:
+                print(f"Invalid transaction signature: {transaction.tx_id}")
+                results.append(False)
+            else:
+                results.append(self.add_transaction(transaction, check_signature=False))
+        return results
+    
+    def verify_transactions(self, transactions):
+        """
+        Verify the signatures of many transactions in one batch.
+        
+        Args:
+            transactions: List of Transaction objects
+            
+        Returns:
+            list: One bool per transaction, in the same order
+        """
+        return self.verifier.verify(transactions)
+    
+    def verify_block_signatures(self, block):
+        """
+        Verify the signatures of every non-reward transaction in a block as one batch.
+        
+        Args:
+            block: The Block to check
+            
+        Returns:
+            bool: True if all signatures are valid
+        """
+        transactions = [tx for tx in block.transactions if not tx.is_coinbase()]
+        return all(self.verify_transactions(transactions))
+    
+    def accept_transaction(self, transaction, added_at=None):
+        """
+        Add an already validated transaction to the pool of unconfirmed transactions.
+        
+        Args:
+            transaction: The validated Transaction object
+            added_at: Time it first entered a mempool (defaults to now)
+            
+        Returns:
+            bool: True if added, False if one of its inputs was spent in the meantime
+        """
+        transaction.seal()
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            if transaction in self.mempool:
+                return False
+            
+            # Under memory pressure only transactions paying more than what was evicted get in
+            min_fee_rate = self.mempool.get_min_fee_rate()
+            if transaction.fee_rate() < min_fee_rate:
+                print(f"Fee rate too low: {transaction.tx_id} pays {transaction.fee_rate():.8f}, "
+                      f"mempool minimum is {min_fee_rate:.8f}")
+                return False
+            
+            if not self.spent_index.add_pending(transaction):
+                return False
+            
+            # Add to unconfirmed transactions pool
+            self.mempool.add(transaction, added_at)
+            self._forget_pending(self.mempool.trim_to_size() + self.mempool.expire())
+            if transaction not in self.mempool:
+                return False  # It was the cheapest entry and got evicted straight away
+            
+            self.notify_mempool_changed(transaction)
+            return True
+    
+    def _forget_pending(self, transactions):
+        """Release the inputs of transactions dropped from the mempool unconfirmed."""
+        for tx in transactions:
+            self.spent_index.remove_pending(tx)
+    
+    def expire_mempool(self):
+        """
+        Drop pending transactions older than the mempool expiry age.
+        
+        Returns:
+            int: Number of transactions dropped
+        """
+        with self.mempool.lock:
+            expired = self.mempool.expire()
+            self._forget_pending(expired)
+        return len(expired)
+    
+    def get_missing_inputs(self, transaction):
+        """
+        Find explicit inputs that are not unspent outputs owned by the sender.
+        
+        Outputs of pending transactions count as unspent, so a transaction can
+        spend one that is still in the mempool; the block template then places
+        it after its parent.
+        
+        Args:
+            transaction: The Transaction object to check
+            
+        Returns:
+            list: Offending (tx_id, output_index) outpoints (empty for implicit inputs)
+        """
+        if transaction.inputs is None:
+            return []
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            missing = []
+            for outpoint in transaction.inputs:
+                utxo = self._find_output(*outpoint)
+                owned = utxo is not None and utxo.owner_address == transaction.sender
+                if not owned and self.spent_index.spender(outpoint) is None:
+                    missing.append(outpoint)
+            return missing
+    
+    def _find_output(self, tx_id, output_index):
+        """
+        Look up an unspent confirmed output, or an output of a pending transaction.
+        
+        Args:
+            tx_id: Transaction ID of the output
+            output_index: Index of the output in that transaction
+        
+        Returns:
+            UTXO or None: The output, None if neither the chain nor the mempool has it
+        """
+        utxo = self.utxo_set.get_utxo(tx_id, output_index)
+        if utxo is not None:
+            return utxo
+        parent = self.mempool.get(tx_id)
+        if parent is None or not 0 <= output_index < len(parent.outputs):
+            return None
+        address, amount = parent.outputs[output_index]
+        return UTXO(tx_id, output_index, amount, address)
     
-    def mine_block(self, miner_address):
+    def get_input_total(self, transaction):
+        """
+        Sum the values of the explicit inputs of a transaction.
+        
+        Args:
+            transaction: The Transaction object to check
+        
+        Returns:
+            float: Total value of the inputs that are unspent or pending outputs
+                (0.0 for implicit inputs)
+        """
+        if transaction.inputs is None:
+            return 0.0
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            total = 0.0
+            for tx_id, output_index in transaction.inputs:
+                utxo = self._find_output(tx_id, output_index)
+                if utxo is not None:
+                    total += utxo.amount
+            return total
+    
+    def get_spendable_utxos(self, address):
+        """
+        Get the confirmed outputs of an address not spent by any pending transaction.
+        
+        Args:
+            address: The wallet address
+            
+        Returns:
+            list: UTXO objects in the order they were created
+        """
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            return [utxo for utxo in self.utxo_set.get_utxos(address)
+                    if not self.spent_index.is_spent((utxo.transaction_id, utxo.output_index))]
+    
+    def is_double_spending(self, transaction):
+        """
+        Check whether a transaction spends funds already spent by another
+        pending or confirmed transaction.
+        
+        Transactions with explicit inputs cost one index lookup per input;
+        an input that is neither unspent nor a pending output was spent by a
+        confirmed transaction (or never existed). Without explicit inputs, the sender's pending spending plus this
+        transaction is compared with the sender's balance.
+        
+        Args:
+            transaction: The Transaction object to check
+            
+        Returns:
+            bool: True if the transaction conflicts with another one
+        """
+        if transaction.is_coinbase():
+            return False
+        
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            if transaction.inputs is not None:
+                return (bool(self.spent_index.find_conflicts(transaction))
+                        or any(self._find_output(*outpoint) is None for outpoint in transaction.inputs))
+            
+            pending_cost = sum(tx.total_cost() for tx in self.mempool.get_by_sender(transaction.sender)
+                               if tx.tx_id != transaction.tx_id)
+            return pending_cost + transaction.total_cost() > self.get_balance(transaction.sender)
+    
+    def notify_mempool_changed(self, transaction=None):
+        """
+        Cancel running searches that a new pending transaction would improve,
+        so miners rebuild their template with the new mempool contents.
+        
+        Args:
+            transaction: The newly added transaction (None: treat as fee-less)
+        """
+        fee_rate = transaction.fee_rate() if transaction else 0.0
+        for token in list(self._mining_tokens):
+            if token.refresh_fee_rate is not None and fee_rate > token.refresh_fee_rate:
+                token.cancel("mempool")
+    
+    def _cancel_mining(self, reason):
+        """
+        Cancel every running proof-of-work search.
+        
+        Args:
+            reason: Why the running templates became stale
+        """
+        for token in list(self._mining_tokens):
+            token.cancel(reason)
+    
+    def mine_block(self, miner_address, workers=None, cancel_token=None):
         """
         Mine a new block with unconfirmed transactions.
         
         Args:
             miner_address: Address of the miner (for block reward)
+            workers: Number of proof-of-work processes (defaults to self.mining_workers)
+            cancel_token: CancellationToken signalled when the template becomes stale
+                (a new tip is connected or the mempool changes); optional
             
         Returns:
             Block or None: The mined block if successful, None otherwise
         """
-        if not self.unconfirmed_transactions:
+        if self._rejects_updates():
+            return None
+        if workers is None:
+            workers = self.mining_workers
+        if cancel_token is None:
+            cancel_token = CancellationToken()
+        
+        # Build the template and register the token in one step, so any block
+        # connected afterwards is guaranteed to cancel this search
+        with self.chain_lock.read_lock(), self.mempool.lock:
+            template = self._create_block_template(miner_address)
+            if template is None:
+                return None
+            new_block, selected = template
+            
+            # A template holding the whole mempool is improved by any new transaction;
+            # a full one only by a transaction paying more than its cheapest entry
+            if self.template_builder.last_template_complete:
+                cancel_token.refresh_fee_rate = -1.0
+            else:
+                cancel_token.refresh_fee_rate = min(tx.fee_rate() for tx in selected)
+            self._mining_tokens.add(cancel_token)
+        
+        # Apply proof of work
+        cancel_token.started_at = time.time()
+        try:
+            proof_result = proof_of_work(new_block, workers=workers, cancel_token=cancel_token)
+        finally:
+            self._mining_tokens.discard(cancel_token)
+        if not proof_result:
+            return None
+        
+        # If mining successful, update the block with proof of work result
+        new_block.nonce = proof_result['nonce']
+        new_block.hash = proof_result['hash']
+        
+        # A competing block may have been connected while we were mining
+        if not self.connect_block(new_block):
+            print(f"Discarding stale block {new_block.index}: chain tip changed")
+            return None
+        return new_block
+    
+    def _create_block_template(self, miner_address):
+        """
+        Assemble an unmined block from the best-paying pending transactions.
+        
+        Args:
+            miner_address: Address of the miner (for block reward)
+            
+        Returns:
+            tuple or None: (Block, selected transactions), None if nothing to mine
+        """
+        if not self.mempool:
+            return None
+        
+        # Pick the best-paying transactions that fit in the block, keeping
+        # those that still apply in order against the current UTXO set
+        view = self.utxo_set.view()
+        selected = [tx for tx in self.template_builder.build() if view.update_utxos(tx)]
+        if not selected:
             return None
         
-        # Create mining reward transaction
+        # Create mining reward transaction (block reward plus collected fees)
         reward_tx = Transaction(
             sender="0",  # "0" signifies system/mining reward
             receiver=miner_address,
-            amount=5.0,  # Block reward of 5 coins
+            amount=BLOCK_REWARD + sum(tx.fee for tx in selected),
             timestamp=time.time()
         )
        
         reward_tx.signature = "COINBASE"
         reward_tx.tx_id = reward_tx._calculate_tx_id()
         # Add reward to beginning of block transactions
-       
-
-        block_transactions = [reward_tx] + self.unconfirmed_transactions[:10]  # Limit of 10 transactions per block
+        block_transactions = [reward_tx] + selected
         
         last_block = self.get_latest_block()
         new_block = Block(
             index=last_block.index + 1,
             previous_hash=last_block.hash,
-            transactions=block_transactions
+            transactions=block_transactions,
+            bits=self.get_next_bits()
         )
+        return new_block, selected
+    
+    def _has_valid_reward(self, block):
+        """
+        Check that a block has exactly one reward transaction, first, claiming
+        at most BLOCK_REWARD plus the fees of the other transactions.
         
-        # Apply proof of work
-        proof_result = proof_of_work(new_block, self.difficulty)
-        if not proof_result:
-            return None
+        Args:
+            block: The Block to check
         
-        # If mining successful, update the block with proof of work result
-        new_block.nonce = proof_result['nonce']
-        new_block.hash = proof_result['hash']
+        Returns:
+            bool: True if the reward is valid
+        """
+        if not block.transactions or not block.transactions[0].is_coinbase():
+            return False
+        if any(tx.is_coinbase() for tx in block.transactions[1:]):
+            return False
+        reward = block.transactions[0]
+        if not reward.is_well_formed():
+            return False
+        return reward.amount <= BLOCK_REWARD + sum(tx.fee for tx in block.transactions[1:])
+    
+    def _has_valid_header(self, block, height, tip_hash=None):
+        """
+        Check that a block has the height, timestamp and proof of work the chain expects of it.
         
-        # Add block to chain
-        self.chain.append(new_block)
-        self.last_known_hash = new_block.hash
-        # Update UTXO set with the processed transactions
-        for tx in block_transactions:
-            result = self.utxo_set.update_utxos(tx)
-            print(f"🔄 update_utxos(tx_id={tx.tx_id}) => {result}")
-
-        # Remove processed transactions from unconfirmed pool
-        for tx in block_transactions[1:]:  # Skip the reward transaction
-            if tx in self.unconfirmed_transactions:
-                self.unconfirmed_transactions.remove(tx)
-        # only for checking purposes
+        Retargeting reads block timestamps, so they are bounded on both sides:
+        after the median time of the previous MEDIAN_TIME_SPAN blocks, and no
+        more than MAX_FUTURE_BLOCK_TIME ahead of the local clock.
+        
+        Args:
+            block: The Block to check
+            height: Height the block takes on top of its parent
+            tip_hash: Hash of its parent when it extends a side branch (defaults to the active chain)
+        
+        Returns:
+            bool: True if the index, timestamp, target and proof of work are valid
+        """
+        if block.index != height:
+            print(f"Block {block.index} has the wrong height for its parent")
+            return False
+        if height > 0 and block.timestamp <= self.get_median_time_past(height, tip_hash):
+            print(f"Block {block.index} is timestamped before the median of the blocks before it")
+            return False
+        if block.timestamp > time.time() + MAX_FUTURE_BLOCK_TIME:
+            print(f"Block {block.index} is timestamped too far in the future")
+            return False
+        if not is_valid_proof(block, self.difficulty, bits=self.get_next_bits(height, tip_hash)):
+            print(f"Invalid proof of work in block {block.index}")
+            return False
+        return True
+    
+    def connect_block(self, block, check_signatures=False):
+        """
+        Append a block to the chain, apply it to the UTXO set and signal miners
+        working on the previous tip.
         
+        The checks run under the read lock, so balance queries continue while
+        they do; the transactions are applied to a UTXOView of the tip, so a
+        block spending missing outputs is rejected without touching the live
+        set. Appending the block, committing the view and evicting from the
+        mempool then happen together under the write lock. The UTXOs the block
+        spends and the outputs it creates are recorded in its undo entry, so
+        disconnect_block() can reverse it.
+        
+        Args:
+            block: The Block to connect
+            check_signatures: Batch-verify the transaction signatures first (for
+                blocks from peers; templates only hold already verified transactions)
+            
+        Returns:
+            bool: True if connected, False if it doesn't extend the current tip
+                or fails a check (height, proof of work, merkle root, reward,
+                transaction IDs, signatures or spent outputs)
+        """
+        with self._connect_mutex:
+            with self.chain_lock.read_lock():
+                if block.previous_hash != self.chain[-1].hash:
+                    return False
+                if not self._has_valid_header(block, len(self.chain)):
+                    return False
+                if not block.has_valid_merkle_root():
+                    print(f"Invalid merkle root in block {block.index}")
+                    return False
+                if not self._has_valid_reward(block):
+                    print(f"Invalid block reward in block {block.index}")
+                    return False
+                forged = next((tx for tx in block.transactions if not tx.has_valid_id()), None)
+                if forged is not None:
+                    print(f"Transaction ID {forged.tx_id} in block {block.index} does not match its contents")
+                    return False
+                if check_signatures and not self.verify_block_signatures(block):
+                    print(f"Invalid transaction signature in block {block.index}")
+                    return False
+            
+                # Only this method and disconnect_block() change the set, and
+                # _connect_mutex keeps them out until the view is committed
+                view = self.utxo_set.view()
+                for tx in block.transactions:
+                    if not view.update_utxos(tx):
+                        print(f"Transaction {tx.tx_id} in block {block.index} spends unavailable funds")
+                        return False
+            
+            with self.chain_lock.write_lock(), self.mempool.lock:
+                # Add block to chain; connected blocks are immutable
+                undo = BlockUndo()
+                self.chain.append(block.seal())
+                self.undo_logs.append(undo)
+                self.block_index.add(block, block_work(self._block_bits(block)))
+                self.address_index.connect_block(block, len(self.chain) - 1)
+                self.last_known_hash = block.hash
+                # Update UTXO set with the processed transactions
+                view.commit(undo)
+                # Pending claims on anything the block spent are void, including
+                # outputs its implicit-input transactions picked
+                spent = list(undo.spent)
+                spent.extend(outpoint for tx in block.transactions if tx.inputs is not None
+                             for outpoint in tx.inputs)
+                conflicting_ids = self.spent_index.confirm(spent) - {tx.tx_id for tx in block.transactions}
+                # One write per block for an on-disk UTXO set
+                self.utxo_set.flush(block, len(self.chain) - 1, undo)
 
-        return new_block
+                # Remove processed transactions from unconfirmed pool (skip the reward transaction)
+                self.mempool.remove_many(tx.tx_id for tx in block.transactions[1:])
+                
+                # Pending transactions spending the same outputs can never confirm now,
+                # and neither can anything spending their outputs
+                for tx_id in conflicting_ids:
+                    conflicting = self.mempool.remove_with_descendants(tx_id)
+                    for tx in conflicting:
+                        print(f"Evicting conflicting transaction {tx.tx_id}")
+                    self._forget_pending(conflicting)
+        
+        # Any template built on the previous tip is now stale
+        self._cancel_mining("new_tip")
+        return True
+    
+    
+    def disconnect_block(self):
+        """
+        Take the tip block off the chain and roll the UTXO set back to before it.
+        
+        Uses the block's undo entry, so the cost is proportional to the size of
+        the block rather than of the chain. The block's transactions are not
+        returned to the mempool; reorganize() does that for the ones the new
+        branch leaves out.
+        
+        Returns:
+            Block or None: The disconnected block, None if the tip is the genesis
+                block or has no undo entry
+        """
+        with self._connect_mutex:
+            with self.chain_lock.write_lock(), self.mempool.lock:
+                if len(self.chain) <= 1:
+                    return None
+                undo = self.undo_logs[-1]
+                if undo is None:
+                    print(f"No undo entry for block {self.chain[-1].index}")
+                    return None
+                
+                block = self.chain.pop()
+                self.undo_logs.pop()
+                height = len(self.chain)
+                undo.apply(self.utxo_set)
+                self.address_index.disconnect_block(block, height)
+                # Drops the stored block along with the rolled back UTXOs
+                self.utxo_set.flush(None, height)
+                self.last_known_hash = self.chain[-1].hash
+        
+        # Templates built on the disconnected block are stale
+        self._cancel_mining("new_tip")
+        return block
+    
+    def reorganize(self, fork_height, new_blocks, check_signatures=True):
+        """
+        Switch to a competing branch that forks off the chain after a given height.
+        
+        Blocks above the fork are disconnected through their undo entries and
+        the new branch is connected in their place. If a block of the new
+        branch is rejected, the original branch and mempool are restored, and
+        that block and the ones after it are dropped from the block index.
+        Transactions of the abandoned blocks that the new branch doesn't
+        confirm go back to the mempool if they are still valid.
+        
+        Args:
+            fork_height: Height of the last block shared by both branches
+            new_blocks: Blocks of the competing branch, in order, starting at fork_height + 1
+            check_signatures: Batch-verify the transaction signatures of the new blocks
+        
+        Returns:
+            bool: True if the new branch is now the chain
+        """
+        with self._connect_mutex:
+            if not 0 <= fork_height < len(self.chain):
+                return False
+            
+            abandoned = []
+            while len(self.chain) - 1 > fork_height:
+                block = self.disconnect_block()
+                if block is None:
+                    # Can't go further back; put back what was taken off
+                    for old_block in reversed(abandoned):
+                        self.connect_block(old_block)
+                    return False
+                abandoned.append(block)
+            abandoned.reverse()
+            
+            # Connecting the new branch confirms or evicts pending transactions
+            with self.mempool.lock:
+                pending = [(entry.transaction, entry.added_at) for entry in self.mempool.entries.values()]
+            
+            for i, block in enumerate(new_blocks):
+                if not self.connect_block(block, check_signatures=check_signatures):
+                    print(f"Reorg to block {block.index} failed; restoring the previous branch")
+                    for _ in range(i):
+                        self.disconnect_block()
+                    for old_block in abandoned:
+                        self.connect_block(old_block)
+                    # Nothing built on the rejected block can become the chain either
+                    for failed_block in new_blocks[i:]:
+                        self.block_index.remove(failed_block.hash)
+                    self._restore_pending(pending, abandoned)
+                    return False
+            
+            # Transactions only confirmed on the abandoned branch become pending again
+            confirmed = {tx.tx_id for block in new_blocks for tx in block.transactions}
+            for block in abandoned:
+                for tx in block.transactions[1:]:
+                    if tx.tx_id not in confirmed:
+                        self.add_transaction(tx, check_signature=False)
+        
+        print(f"Reorganized: {len(abandoned)} block(s) replaced by {len(new_blocks)} "
+              f"at height {fork_height + 1}")
+        return True
+    
+    def _restore_pending(self, pending, restored_blocks):
+        """
+        Put back the pending transactions a rejected reorg removed from the mempool.
+        
+        Args:
+            pending: (Transaction, added_at) pairs in the mempool before the reorg, in arrival order
+            restored_blocks: Blocks reconnected after the reorg failed
+        """
+        confirmed = {tx.tx_id for block in restored_blocks for tx in block.transactions}
+        for tx, added_at in pending:
+            if tx not in self.mempool and tx.tx_id not in confirmed:
+                self.add_transaction(tx, check_signature=False, added_at=added_at)
+    
+    def add_received_block(self, block):
+        """
+        Accept a block from a peer, whichever branch it extends.
+        
+        A block whose parent is unknown waits in the orphan pool. Otherwise it
+        is checked and indexed; if its branch then has more cumulative work
+        than the active chain, the chain switches to it (connecting it on top
+        of the tip, or reorganizing if it is on a side branch). Orphans
+        waiting for it are then processed the same way.
+        
+        Args:
+            block: The Block, or its dictionary as received from the network
+        
+        Returns:
+            bool: True if the block was valid and stored (on the active chain or a side branch)
+        """
+        if self._rejects_updates():
+            return False
+        if isinstance(block, dict):
+            block_dict = block
+            block = Block.from_dict(block_dict)
+            if block.hash != block_dict.get('hash'):
+                print(f"Received block {block.index} does not match its hash")
+                return False
+        
+        with self._connect_mutex:
+            if block.hash in self.block_index or block.hash in self.block_index.orphans:
+                return False
+            if block.previous_hash not in self.block_index:
+                # Orphans are expected a few blocks ahead of the tip, within one retarget of its target
+                max_target = min(bits_to_target(self.get_next_bits()) * MAX_RETARGET_FACTOR, MAX_TARGET)
+                if not self.block_index.add_orphan(block, max_target, self.difficulty):
+                    print(f"Invalid proof of work in orphan block {block.index}")
+                    return False
+                print(f"Holding orphan block {block.index} until its parent arrives")
+                return False
+            
+            accepted = self._accept_block(block)
+            # Orphans waiting for this block, and then for those, can be placed now
+            pending = self.block_index.take_orphans(block.hash) if accepted else []
+            while pending:
+                orphan = pending.pop(0)
+                if self._accept_block(orphan):
+                    pending.extend(self.block_index.take_orphans(orphan.hash))
+        return accepted
+    
+    def _accept_block(self, block):
+        """
+        Check and index a block whose parent is indexed, switching to its branch if it has more work.
+        
+        Args:
+            block: The Block
+        
+        Returns:
+            bool: True if the block is valid and indexed
+        """
+        parent = self.block_index.get(block.previous_hash)
+        # Side branch blocks are indexed without being connected, so check them here too
+        if not self._has_valid_header(block, parent.height + 1, parent.hash):
+            return False
+        if not block.has_valid_merkle_root():
+            print(f"Invalid merkle root in block {block.index}")
+            return False
+        
+        entry = self.block_index.add(block, block_work(self._block_bits(block)))
+        tip = self.block_index.get(self.chain[-1].hash)
+        if entry.chain_work <= tip.chain_work:
+            # Equal work keeps the tip seen first
+            print(f"Stored block {block.index} on a side branch")
+            return True
+        
+        if block.previous_hash == tip.hash:
+            connected = self.connect_block(block, check_signatures=True)
+        else:
+            fork_height, branch = self._branch_from_fork(entry)
+            connected = self.reorganize(fork_height, branch)
+        if not connected:
+            self.block_index.remove(block.hash)
+        return connected
+    
+    def _on_active_chain(self, entry):
+        """Check whether an indexed block is part of the active chain."""
+        return entry.height < len(self.chain) and self.chain[entry.height].hash == entry.hash
+    
+    def _branch_from_fork(self, entry):
+        """
+        Find where the branch ending at an indexed block leaves the active chain.
+        
+        Args:
+            entry: BlockIndexEntry of the branch tip
+        
+        Returns:
+            tuple: (height of the last shared block, blocks of the branch after it in order)
+        """
+        branch = []
+        while not self._on_active_chain(entry):
+            branch.append(entry.block)
+            entry = self.block_index.get(entry.previous_hash)
+        branch.reverse()
+        return entry.height, branch
+    
+    def _block_at(self, height, tip_hash=None):
+        """Block at a height of the active chain, or of the branch ending at tip_hash."""
+        if tip_hash is None:
+            return self.chain[height]
+        entry = self.block_index.get(tip_hash)
+        while entry.height > height and not self._on_active_chain(entry):
+            entry = self.block_index.get(entry.previous_hash)
+        if self._on_active_chain(entry):
+            return self.chain[height]
+        return entry.block
+    
+    def get_block_by_hash(self, block_hash):
+        """
+        Look up any indexed block, on the active chain or a side branch.
+        
+        Args:
+            block_hash: Hex block hash
+        
+        Returns:
+            Block or None: The block, None if unknown
+        """
+        entry = self.block_index.get(block_hash)
+        return entry.block if entry is not None else None
+    
+    def get_block_by_height(self, height):
+        """
+        Look up the block at a height of the active chain.
+        
+        Args:
+            height: Position in the chain
+        
+        Returns:
+            Block or None: The block, None if the chain is shorter
+        """
+        with self.chain_lock.read_lock():
+            return self.chain[height] if 0 <= height < len(self.chain) else None
+    
+    def _block_bits(self, block):
+        """Compact target of a block; legacy blocks count as the initial target."""
+        return block.bits if block.version != LEGACY_BLOCK_VERSION else self.initial_bits
+    
+    def get_next_bits(self, height=None, tip_hash=None):
+        """
+        Calculate the compact target required for the block at a given height.
+        
+        Every `retarget_interval` blocks the target is scaled by the ratio of
+        the observed time span of the last interval to the desired one, so
+        block production converges on `target_block_time`.
+        
+        Args:
+            height: Height of the block being validated or mined (defaults to the next block)
+            tip_hash: Hash of its parent when it extends a side branch (defaults to the active chain)
+            
+        Returns:
+            int: Compact target encoding ("bits")
+        """
+        if height is None:
+            height = len(self.chain)
+        
+        if height == 0:
+            return self.initial_bits
+        
+        previous_bits = self._block_bits(self._block_at(height - 1, tip_hash))
+        if height % self.retarget_interval != 0:
+            return previous_bits
+        
+        # Time taken by the last interval (retarget_interval - 1 block gaps)
+        first_block = self._block_at(height - self.retarget_interval, tip_hash)
+        last_block = self._block_at(height - 1, tip_hash)
+        expected_timespan = self.target_block_time * (self.retarget_interval - 1)
+        actual_timespan = last_block.timestamp - first_block.timestamp
+        
+        # Clamp the adjustment so a few odd timestamps can't swing it wildly
+        actual_timespan = max(actual_timespan, expected_timespan / MAX_RETARGET_FACTOR)
+        actual_timespan = min(actual_timespan, expected_timespan * MAX_RETARGET_FACTOR)
+        
+        # Integer arithmetic on milliseconds keeps the result deterministic
+        new_target = (bits_to_target(previous_bits) * int(actual_timespan * 1000)
+                      // int(expected_timespan * 1000))
+        new_target = min(new_target, MAX_TARGET)
+        
+        return target_to_bits(new_target)
     
+    def get_median_time_past(self, height=None, tip_hash=None):
+        """
+        Median timestamp of the MEDIAN_TIME_SPAN blocks below a given height.
+        
+        Args:
+            height: Height of the block being validated (defaults to the next block)
+            tip_hash: Hash of its parent when it extends a side branch (defaults to the active chain)
+        
+        Returns:
+            float: The median timestamp (of fewer blocks near the genesis block)
+        """
+        if height is None:
+            height = len(self.chain)
+        timestamps = sorted(self._block_at(h, tip_hash).timestamp
+                            for h in range(max(0, height - MEDIAN_TIME_SPAN), height))
+        return timestamps[len(timestamps) // 2]
     
     def get_balance(self, address):
         """
@@ -144,7 +1160,26 @@ class Blockchain:
         Returns:
             float: The balance of the address
         """
-        return self.utxo_set.get_balance(address)
+        with self.chain_lock.read_lock():
+            return self.utxo_set.get_balance(address)
+    
+    def get_address_history(self, address, start_time=None, end_time=None, offset=0, limit=None):
+        """
+        Get the confirmed transactions sent or received by an address, newest first.
+        
+        Args:
+            address: The wallet address
+            start_time: Earliest transaction timestamp to include (optional)
+            end_time: Latest transaction timestamp to include (optional)
+            offset: Number of transactions to skip (for paging)
+            limit: Maximum number of transactions to return (None returns all)
+            
+        Returns:
+            list: (block height, Transaction) tuples
+        """
+        with self.chain_lock.read_lock():
+            positions = self.address_index.query(address, start_time, end_time, offset, limit)
+            return [(height, self.chain[height].transactions[position]) for height, position in positions]
 
         # if address not in self.utxo_set:
         #     return 0.0
@@ -160,32 +1195,38 @@ class Blockchain:
         Returns:
             bool: True if the chain is valid, False otherwise
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
+        with self.chain_lock.read_lock():
+            for i in range(1, len(self.chain)):
+                current_block = self.chain[i]
+                previous_block = self.chain[i - 1]
+                
+                # Check if the current block's hash is correct
+                if current_block.hash != current_block.calculate_hash():
+                    print(f"Invalid hash in block {i}")
+                    return False
+                
+                # The header only commits to the transactions through the merkle root
+                if not current_block.has_valid_merkle_root():
+                    print(f"Invalid merkle root in block {i}")
+                    return False
+                
+                # Check if this block points to the previous block's hash
+                if current_block.previous_hash != previous_block.hash:
+                    print(f"Block {i} doesn't link to previous block")
+                    return False
+                
+                # Check if the block's proof of work is valid and uses the expected target
+                if not is_valid_proof(current_block, self.difficulty, bits=self.get_next_bits(i)):
+                    print(f"Invalid proof of work in block {i}")
+                    return False
             
-            # Check if the current block's hash is correct
-            if current_block.hash != current_block.calculate_hash():
-                print(f"Invalid hash in block {i}")
-                return False
-            
-            # Check if this block points to the previous block's hash
-            if current_block.previous_hash != previous_block.hash:
-                print(f"Block {i} doesn't link to previous block")
-                return False
-            
-            # Check if the block's proof of work is valid
-            if not is_valid_proof(current_block, self.difficulty):
-                print(f"Invalid proof of work in block {i}")
-                return False
         
         return True
     
     def to_json(self):
         """Convert the blockchain to JSON format."""
-        chain_data = []
-        for block in self.chain:
-            chain_data.append(block.to_dict())
+        with self.chain_lock.read_lock():
+            chain_data = [block.to_dict() for block in self.chain]
         
         blockchain_dict = {
             'chain': chain_data,
@@ -221,4 +1262,4 @@ class Blockchain:
         """Debug-friendly string representation."""
         return (f"Blockchain(blocks={len(self.chain)}, "
                 f"difficulty={self.difficulty}, "
-                f"unconfirmed_tx={len(self.unconfirmed_transactions)})")
\ No newline at end of file
+                f"unconfirmed_tx={len(self.mempool)})")
\ No newline at end of file
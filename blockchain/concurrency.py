@@ -0,0 +1,107 @@
+import threading
+import functools
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """
+    Lock letting many readers in at once, or a single writer.
+
+    Waiting writers block new readers, so a stream of balance queries can't
+    starve block connection. Both sides are reentrant for the owning thread,
+    and the writer may also take the read side. Upgrading a read lock to a
+    write lock is not supported and raises RuntimeError, since two readers
+    doing so would deadlock.
+    """
+
+    def __init__(self):
+        """Initialize an unlocked lock."""
+        self._cond = threading.Condition(threading.Lock())
+        # {thread ident: read depth}
+        self._readers = {}
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        """Acquire the lock for reading, waiting for any writer to finish."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self):
+        """Release one level of read locking held by this thread."""
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+            else:
+                del self._readers[me]
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Acquire the lock exclusively, waiting for readers and other writers."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """Release one level of write locking held by this thread."""
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Write lock released by a thread that does not hold it")
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_lock(self):
+        """Context manager holding the lock for reading."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_lock(self):
+        """Context manager holding the lock exclusively."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return (f"ReadWriteLock(readers={len(self._readers)}, "
+                f"writer={'yes' if self._writer is not None else 'no'}, "
+                f"writers_waiting={self._writers_waiting})")
+
+
+def synchronized(method):
+    """Run a method while holding the `lock` attribute of its instance."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
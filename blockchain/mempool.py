@@ -0,0 +1,445 @@
+import sys
+import heapq
+import itertools
+import threading
+import time
+from .concurrency import synchronized
+
+# Memory the pending transactions and their index entries may use (bytes)
+DEFAULT_MAX_MEMPOOL_BYTES = 100 * 1024 * 1024
+# Pending transactions are dropped after this long (seconds)
+DEFAULT_MEMPOOL_EXPIRY = 14 * 24 * 3600
+# Time for the rolling minimum fee rate to halve once pressure is gone (seconds)
+ROLLING_FEE_HALFLIFE = 12 * 3600
+# Step added to the fee rate of an evicted entry to get the new minimum (fee per byte)
+INCREMENTAL_FEE_RATE = 0.00001
+# Index bookkeeping per entry: slots in the id, sender and children dicts plus the heap tuple
+ENTRY_INDEX_OVERHEAD = 256
+
+def _deep_sizeof(obj, seen):
+    """Size of an object and everything it references, counting shared objects once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(key, seen) + _deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _deep_sizeof(obj.__dict__, seen)
+    return size
+
+class MempoolEntry:
+    """A pending transaction together with the data the pool indexes it by."""
+    
+    __slots__ = ('transaction', 'tx_id', 'size', 'fee_rate', 'sequence', 'added_at', 'memory')
+    
+    def __init__(self, transaction, sequence, added_at=None):
+        # Build the encodings a sealed transaction caches for relaying, block
+        # serialization and signature checks now, so they are counted below
+        transaction.seal()
+        transaction.to_json()
+        transaction.transaction_data()
+        self.transaction = transaction
+        self.tx_id = transaction.tx_id
+        self.size = transaction.size()
+        self.fee_rate = transaction.fee / self.size
+        self.sequence = sequence
+        self.added_at = added_at if added_at is not None else time.time()
+        self.memory = (_deep_sizeof(transaction, set()) + sys.getsizeof(self)
+                       + ENTRY_INDEX_OVERHEAD)
+
+
+class Mempool:
+    """
+    Pool of unconfirmed transactions.
+    
+    Transactions are indexed by ID, by sender and by arrival order, and a
+    min-heap orders them by fee rate. Admission, lookup and removal are O(1),
+    or O(log n) for the heap. Listeners (such as the block template builder)
+    are told about every addition and removal, so they never have to diff the
+    whole pool. Every public method holds the pool's own lock; callers that
+    need several calls to be atomic can hold `lock` around them.
+    
+    The memory used by each entry is accounted for. Past the byte budget the
+    cheapest entries are evicted together with their descendants, and the
+    minimum fee rate for admission rises above what was evicted. It decays
+    again once the pressure is gone.
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_MAX_MEMPOOL_BYTES, expiry=DEFAULT_MEMPOOL_EXPIRY,
+                 fee_halflife=ROLLING_FEE_HALFLIFE):
+        """
+        Initialize an empty mempool.
+        
+        Args:
+            max_bytes: Memory budget for pending transactions and their index entries
+            expiry: Age in seconds after which a pending transaction is dropped
+            fee_halflife: Seconds for the rolling minimum fee rate to halve
+        """
+        self.max_bytes = max_bytes
+        self.expiry = expiry
+        self.fee_halflife = fee_halflife
+        self.lock = threading.RLock()
+        # {tx_id: MempoolEntry}, kept in arrival order
+        self.entries = {}
+        # {sender: {tx_id: None}}, each kept in arrival order
+        self.by_sender = {}
+        # {tx_id: set of pending tx_ids spending its outputs}
+        self.children = {}
+        # (fee_rate, sequence, tx_id) min-heap; removed entries are skipped lazily
+        self._fee_heap = []
+        self._sequence = itertools.count()
+        self._listeners = []
+        self.total_memory = 0
+        self.total_bytes = 0
+        self._rolling_min_fee_rate = 0.0
+        self._last_fee_update = time.time()
+        self.evicted_count = 0
+        self.expired_count = 0
+    
+    @synchronized
+    def add_listener(self, listener):
+        """
+        Register an object to be told about additions and removals.
+        
+        Args:
+            listener: Object with add_transaction(transaction) and
+                remove_transaction(tx_id) methods
+        """
+        self._listeners.append(listener)
+        for entry in self.entries.values():
+            listener.add_transaction(entry.transaction)
+    
+    @synchronized
+    def add(self, transaction, added_at=None):
+        """
+        Add a transaction to the pool.
+        
+        Args:
+            transaction: The Transaction to add
+            added_at: Time it first entered a mempool, for expiry (defaults to now;
+                set when restoring a saved mempool)
+        
+        Returns:
+            bool: True if added, False if it was already pending
+        """
+        if transaction.tx_id in self.entries:
+            return False
+        
+        entry = MempoolEntry(transaction, next(self._sequence), added_at)
+        self.entries[entry.tx_id] = entry
+        self.by_sender.setdefault(transaction.sender, {})[entry.tx_id] = None
+        for parent_id in self._parent_ids(transaction):
+            self.children.setdefault(parent_id, set()).add(entry.tx_id)
+        self.total_memory += entry.memory
+        self.total_bytes += entry.size
+        heapq.heappush(self._fee_heap, (entry.fee_rate, entry.sequence, entry.tx_id))
+        
+        for listener in self._listeners:
+            listener.add_transaction(transaction)
+        return True
+    
+    @synchronized
+    def remove(self, tx_id):
+        """
+        Remove a transaction from the pool.
+        
+        Args:
+            tx_id: ID of the transaction to remove
+        
+        Returns:
+            Transaction or None: The removed transaction, None if it was not pending
+        """
+        entry = self.entries.pop(tx_id, None)
+        if entry is None:
+            return None
+        
+        sender = entry.transaction.sender
+        sender_txs = self.by_sender[sender]
+        del sender_txs[tx_id]
+        if not sender_txs:
+            del self.by_sender[sender]
+        
+        self.children.pop(tx_id, None)
+        for parent_id in self._parent_ids(entry.transaction):
+            siblings = self.children.get(parent_id)
+            if siblings is not None:
+                siblings.discard(tx_id)
+                if not siblings:
+                    del self.children[parent_id]
+        self.total_memory -= entry.memory
+        self.total_bytes -= entry.size
+        
+        # Drop stale heap entries once they outnumber the live ones
+        if len(self._fee_heap) > 2 * len(self.entries) + 64:
+            self._fee_heap = [item for item in self._fee_heap if item[2] in self.entries]
+            heapq.heapify(self._fee_heap)
+        
+        for listener in self._listeners:
+            listener.remove_transaction(tx_id)
+        return entry.transaction
+    
+    @synchronized
+    def remove_many(self, tx_ids):
+        """
+        Remove several transactions at once (e.g. those confirmed by a block).
+        
+        Args:
+            tx_ids: Iterable of transaction IDs; unknown IDs are ignored
+        
+        Returns:
+            list: The removed Transaction objects
+        """
+        removed = []
+        for tx_id in tx_ids:
+            transaction = self.remove(tx_id)
+            if transaction is not None:
+                removed.append(transaction)
+        return removed
+    
+    def _parent_ids(self, transaction):
+        """IDs of pending transactions whose outputs a transaction spends."""
+        if getattr(transaction, 'inputs', None) is None:
+            return set()
+        return {tx_id for tx_id, _ in transaction.inputs if tx_id in self.entries}
+    
+    @synchronized
+    def get_descendants(self, tx_id):
+        """
+        Collect the pending transactions that spend outputs of a transaction,
+        directly or through other pending transactions.
+        
+        Args:
+            tx_id: ID of the ancestor transaction
+        
+        Returns:
+            list: Descendant tx_ids, each after its own parents
+        """
+        descendants = []
+        seen = {tx_id}
+        stack = [tx_id]
+        while stack:
+            for child_id in self.children.get(stack.pop(), ()):
+                if child_id not in seen:
+                    seen.add(child_id)
+                    descendants.append(child_id)
+                    stack.append(child_id)
+        return descendants
+    
+    @synchronized
+    def remove_with_descendants(self, tx_id):
+        """
+        Remove a transaction and every pending transaction depending on it.
+        
+        Args:
+            tx_id: ID of the transaction to remove
+        
+        Returns:
+            list: The removed Transaction objects
+        """
+        return self.remove_many([tx_id] + self.get_descendants(tx_id))
+    
+    @synchronized
+    def get_min_fee_rate(self):
+        """
+        Get the fee rate a transaction must pay to be admitted.
+        
+        After an eviction this is just above the evicted fee rate. It halves
+        every fee_halflife seconds, faster while the pool is far below its budget.
+        
+        Returns:
+            float: Minimum fee per serialized byte
+        """
+        if self._rolling_min_fee_rate == 0.0:
+            return 0.0
+        
+        now = time.time()
+        halflife = self.fee_halflife
+        if self.total_memory < self.max_bytes / 4:
+            halflife /= 4
+        elif self.total_memory < self.max_bytes / 2:
+            halflife /= 2
+        
+        self._rolling_min_fee_rate *= 0.5 ** ((now - self._last_fee_update) / halflife)
+        self._last_fee_update = now
+        if self._rolling_min_fee_rate < INCREMENTAL_FEE_RATE / 2:
+            self._rolling_min_fee_rate = 0.0
+        return self._rolling_min_fee_rate
+    
+    @synchronized
+    def trim_to_size(self):
+        """
+        Evict the lowest fee-rate entries, with their descendants, until the
+        pool fits its memory budget, raising the rolling minimum fee rate.
+        
+        Returns:
+            list: The evicted Transaction objects
+        """
+        evicted = []
+        while self.total_memory > self.max_bytes:
+            entry = self.lowest_fee_entry()
+            if entry is None:
+                break
+            
+            self.get_min_fee_rate()  # Apply the decay up to now before raising it
+            self._rolling_min_fee_rate = max(self._rolling_min_fee_rate,
+                                             entry.fee_rate + INCREMENTAL_FEE_RATE)
+            self._last_fee_update = time.time()
+            evicted.extend(self.remove_with_descendants(entry.tx_id))
+        
+        self.evicted_count += len(evicted)
+        return evicted
+    
+    @synchronized
+    def expire(self, now=None):
+        """
+        Drop transactions older than the expiry age, with their descendants.
+        
+        Args:
+            now: Current time (defaults to time.time())
+        
+        Returns:
+            list: The expired Transaction objects
+        """
+        cutoff = (now if now is not None else time.time()) - self.expiry
+        expired = []
+        while self.entries:
+            # Entries are in arrival order, so the oldest is first
+            oldest = next(iter(self.entries.values()))
+            if oldest.added_at > cutoff:
+                break
+            expired.extend(self.remove_with_descendants(oldest.tx_id))
+        
+        self.expired_count += len(expired)
+        return expired
+    
+    @synchronized
+    def get_stats(self):
+        """
+        Get mempool size and pressure statistics.
+        
+        Returns:
+            dict: Transaction count, serialized bytes, memory used and budget,
+                minimum fee rate and eviction/expiry counters
+        """
+        return {
+            'transactions': len(self.entries),
+            'bytes': self.total_bytes,
+            'memory': self.total_memory,
+            'max_memory': self.max_bytes,
+            'min_fee_rate': self.get_min_fee_rate(),
+            'evicted': self.evicted_count,
+            'expired': self.expired_count,
+        }
+    
+    @synchronized
+    def get(self, tx_id):
+        """Get a pending transaction by ID, or None."""
+        entry = self.entries.get(tx_id)
+        return entry.transaction if entry else None
+    
+    @synchronized
+    def get_by_sender(self, sender):
+        """
+        Get the pending transactions of a sender.
+        
+        Args:
+            sender: Address of the sender
+        
+        Returns:
+            list: The sender's Transaction objects in arrival order
+        """
+        return [self.entries[tx_id].transaction for tx_id in self.by_sender.get(sender, ())]
+    
+    @synchronized
+    def lowest_fee_entry(self):
+        """
+        Get the pending entry paying the lowest fee rate.
+        
+        Returns:
+            MempoolEntry or None: The cheapest entry (oldest first on ties), None if empty
+        """
+        heap = self._fee_heap
+        while heap:
+            entry = self.entries.get(heap[0][2])
+            if entry is not None and entry.sequence == heap[0][1]:
+                return entry
+            heapq.heappop(heap)
+        return None
+    
+    @synchronized
+    def copy(self):
+        """Return the pending transactions as a list in arrival order."""
+        return list(self)
+    
+    @synchronized
+    def __contains__(self, item):
+        tx_id = item if isinstance(item, str) else item.tx_id
+        return tx_id in self.entries
+    
+    @synchronized
+    def __iter__(self):
+        return (entry.transaction for entry in list(self.entries.values()))
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return (f"Mempool(transactions={len(self.entries)}, "
+                f"memory={self.total_memory}/{self.max_bytes})")
+
+
+def benchmark_mempool(count=100000):
+    """
+    Time admission, lookup, per-sender queries and bulk removal on a large pool.
+    
+    Args:
+        count: Number of pending transactions
+    
+    Returns:
+        dict: Operations per second for each operation
+    """
+    from blockchain.transaction import Transaction
+    
+    transactions = [Transaction(f"sender{i % 1000}", f"receiver{i}", 1.0, fee=(i % 97) / 10)
+                    for i in range(count)]
+    mempool = Mempool()
+    
+    start_time = time.perf_counter()
+    for tx in transactions:
+        mempool.add(tx)
+    add_time = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    for tx in transactions:
+        mempool.get(tx.tx_id)
+    get_time = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    for i in range(1000):
+        mempool.get_by_sender(f"sender{i}")
+    sender_time = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    mempool.remove_many(tx.tx_id for tx in transactions[::2])
+    remove_time = time.perf_counter() - start_time
+    
+    return {
+        'transactions': count,
+        'add_ops': count / add_time,
+        'get_ops': count / get_time,
+        'sender_queries': 1000 / sender_time,
+        'remove_ops': (count // 2) / remove_time
+    }
+
+
+if __name__ == "__main__":
+    stats = benchmark_mempool()
+    print(f"Pending transactions: {stats['transactions']:,}")
+    print(f"add:            {stats['add_ops']:,.0f} ops/s")
+    print(f"get:            {stats['get_ops']:,.0f} ops/s")
+    print(f"get_by_sender:  {stats['sender_queries']:,.0f} queries/s (100 txs each)")
+    print(f"remove_many:    {stats['remove_ops']:,.0f} ops/s")
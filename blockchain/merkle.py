@@ -0,0 +1,177 @@
+import hashlib
+
+# Merkle root of a block without transactions
+EMPTY_MERKLE_ROOT = hashlib.sha256(b"").digest()
+# Prefixes keeping leaf and internal node hashes apart, so an internal node
+# can never be passed off as a transaction ID in a proof
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+def _hash_leaf(tx_id):
+    """Hash a raw transaction ID into its leaf digest."""
+    return hashlib.sha256(LEAF_PREFIX + tx_id).digest()
+
+def _hash_pair(left, right):
+    """Hash two raw child digests into their parent digest."""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+class MerkleTree:
+    """
+    Merkle tree over transaction IDs that keeps every level in memory.
+    
+    Nodes are raw 32-byte SHA-256 digests; leaves hash the transaction ID
+    and internal nodes their children, each behind its own prefix byte. A
+    node without a right sibling is paired with itself. Appending or replacing a leaf only recomputes the
+    O(log n) nodes on its path to the root.
+    """
+    
+    def __init__(self, tx_ids=()):
+        """
+        Build a tree from transaction IDs.
+        
+        Args:
+            tx_ids: Iterable of hex encoded transaction IDs
+        """
+        self.levels = [[]]
+        self.tx_ids = []
+        self.positions = {}
+        for tx_id in tx_ids:
+            self._add_leaf(tx_id)
+        self._build_levels()
+    
+    def _add_leaf(self, tx_id):
+        """Add a leaf without updating the upper levels."""
+        self.positions.setdefault(tx_id, len(self.levels[0]))
+        self.tx_ids.append(tx_id)
+        self.levels[0].append(_hash_leaf(bytes.fromhex(tx_id)))
+    
+    def _build_levels(self):
+        """Compute every level above the leaves from scratch."""
+        del self.levels[1:]
+        nodes = self.levels[0]
+        while len(nodes) > 1:
+            nodes = [_hash_pair(nodes[i], nodes[i + 1] if i + 1 < len(nodes) else nodes[i])
+                     for i in range(0, len(nodes), 2)]
+            self.levels.append(nodes)
+    
+    def _update_path(self, index):
+        """Recompute the parents of leaf `index` up to the root."""
+        level = 0
+        while len(self.levels[level]) > 1:
+            nodes = self.levels[level]
+            parent = index // 2
+            left = nodes[2 * parent]
+            right = nodes[2 * parent + 1] if 2 * parent + 1 < len(nodes) else left
+            
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            upper = self.levels[level + 1]
+            if parent < len(upper):
+                upper[parent] = _hash_pair(left, right)
+            else:
+                upper.append(_hash_pair(left, right))
+            
+            index = parent
+            level += 1
+    
+    def append(self, tx_id):
+        """
+        Append a transaction ID as a new leaf.
+        
+        Args:
+            tx_id: Hex encoded transaction ID
+        """
+        self._add_leaf(tx_id)
+        self._update_path(len(self.levels[0]) - 1)
+    
+    def replace(self, index, tx_id):
+        """
+        Replace the leaf at a position.
+        
+        Args:
+            index: Position of the leaf to replace
+            tx_id: Hex encoded transaction ID of the new leaf
+        """
+        old_tx_id = self.tx_ids[index]
+        if self.positions.get(old_tx_id) == index:
+            del self.positions[old_tx_id]
+        self.positions.setdefault(tx_id, index)
+        
+        self.tx_ids[index] = tx_id
+        self.levels[0][index] = _hash_leaf(bytes.fromhex(tx_id))
+        self._update_path(index)
+    
+    @property
+    def root(self):
+        """Raw digest of the Merkle root."""
+        if not self.levels[0]:
+            return EMPTY_MERKLE_ROOT
+        return self.levels[-1][0]
+    
+    @property
+    def root_hex(self):
+        """Hex encoded Merkle root."""
+        return self.root.hex()
+    
+    def get_proof(self, tx_id):
+        """
+        Build an inclusion proof for a transaction.
+        
+        Args:
+            tx_id: Hex encoded transaction ID
+        
+        Returns:
+            list or None: (sibling hash, side) pairs from the leaf up, where side
+                is 'left' or 'right'; None if the transaction is not in the tree
+        """
+        index = self.positions.get(tx_id)
+        if index is None:
+            return None
+        
+        proof = []
+        for nodes in self.levels[:-1]:
+            if index % 2 == 0:
+                sibling = nodes[index + 1] if index + 1 < len(nodes) else nodes[index]
+                proof.append((sibling.hex(), 'right'))
+            else:
+                proof.append((nodes[index - 1].hex(), 'left'))
+            index //= 2
+        
+        return proof
+    
+    def __len__(self):
+        return len(self.levels[0])
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"MerkleTree(leaves={len(self)}, root={self.root_hex[:10]}...)"
+
+def verify_proof(tx_id, proof, merkle_root):
+    """
+    Check that a transaction is committed to by a Merkle root.
+    
+    Args:
+        tx_id: Hex encoded transaction ID
+        proof: Proof as returned by MerkleTree.get_proof
+        merkle_root: Hex encoded Merkle root (e.g. from a block header)
+    
+    Returns:
+        bool: True if the proof links the transaction to the root
+    """
+    if proof is None:
+        return False
+    
+    try:
+        node = _hash_leaf(bytes.fromhex(tx_id))
+        for sibling_hex, side in proof:
+            sibling = bytes.fromhex(sibling_hex)
+            if side == 'right':
+                node = _hash_pair(node, sibling)
+            elif side == 'left':
+                node = _hash_pair(sibling, node)
+            else:
+                return False
+    except (TypeError, ValueError):
+        return False
+    
+    return node.hex() == merkle_root
@@ -0,0 +1,108 @@
+class SpentOutpointIndex:
+    """
+    Records which pending transaction spends each outpoint.
+    
+    Outpoints are (tx_id, output_index) tuples. Checking a transaction for
+    conflicts with the mempool is one dictionary lookup per input, however
+    large the mempool grows. Confirmed spends are not kept here: a spent
+    outpoint is simply no longer in the UTXO set, so memory stays
+    proportional to the mempool rather than to the chain.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        # {outpoint: tx_id} for inputs of pending transactions
+        self.mempool = {}
+    
+    def add_pending(self, transaction):
+        """
+        Record the inputs of a transaction entering the mempool.
+        
+        Args:
+            transaction: Transaction with explicit inputs
+        
+        Returns:
+            bool: True if recorded, False if an input is already spent by another transaction
+        """
+        if transaction.inputs is None:
+            return True
+        if self.find_conflicts(transaction):
+            return False
+        
+        for outpoint in transaction.inputs:
+            self.mempool[outpoint] = transaction.tx_id
+        return True
+    
+    def remove_pending(self, transaction):
+        """
+        Forget the inputs of a transaction leaving the mempool unconfirmed.
+        
+        Args:
+            transaction: The removed transaction
+        """
+        if transaction.inputs is None:
+            return
+        for outpoint in transaction.inputs:
+            if self.mempool.get(outpoint) == transaction.tx_id:
+                del self.mempool[outpoint]
+    
+    def confirm(self, outpoints):
+        """
+        Release the pending claims on outpoints spent by a connected block.
+        
+        Args:
+            outpoints: (tx_id, output_index) tuples the block spent, whether its
+                transactions named them as inputs or picked them implicitly
+        
+        Returns:
+            set: IDs of the pending transactions that had claimed one of them
+        """
+        spenders = set()
+        for outpoint in outpoints:
+            spender = self.mempool.pop(outpoint, None)
+            if spender is not None:
+                spenders.add(spender)
+        return spenders
+    
+    def spender(self, outpoint):
+        """
+        Find the pending transaction spending an outpoint.
+        
+        Args:
+            outpoint: (tx_id, output_index) tuple
+        
+        Returns:
+            str or None: ID of the spending transaction, None if no pending transaction spends it
+        """
+        return self.mempool.get(outpoint)
+    
+    def is_spent(self, outpoint):
+        """Check whether a pending transaction spends an outpoint."""
+        return outpoint in self.mempool
+    
+    def find_conflicts(self, transaction):
+        """
+        Find the inputs of a transaction that another pending transaction already spends.
+        
+        Args:
+            transaction: Transaction with explicit inputs
+        
+        Returns:
+            list: (outpoint, spending tx_id) for each conflict
+        """
+        conflicts = []
+        if transaction.inputs is None:
+            return conflicts
+        
+        for outpoint in transaction.inputs:
+            spender = self.mempool.get(outpoint)
+            if spender is not None and spender != transaction.tx_id:
+                conflicts.append((outpoint, spender))
+        return conflicts
+    
+    def __len__(self):
+        return len(self.mempool)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"SpentOutpointIndex(pending={len(self.mempool)})"
@@ -1,12 +1,19 @@
 import time
+import math
 import hashlib
+import copy
 import json
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.exceptions import InvalidSignature
+from wallet.key import (serialize_public_key, public_key_registry, key_scheme, sign_data, verify_data,
+                        SCHEME_RSA_PSS, SIGNATURE_SCHEMES)
 
 class Transaction:
-    def __init__(self, sender, receiver, amount, timestamp=None, signature=None, tx_id=None):
+    # Fields covered by the cached encodings. Once sealed, they can only be
+    # changed through update() (or sign_transaction), which drops the caches.
+    ENCODED_FIELDS = frozenset({'sender', 'receiver', 'amount', 'fee', 'timestamp', 'signature',
+                                'public_key', 'scheme', 'inputs', 'outputs', 'tx_id'})
+    
+    def __init__(self, sender, receiver, amount, timestamp=None, signature=None, tx_id=None, fee=0.0,
+                 inputs=None, outputs=None, public_key=None, scheme=None):
         """
         Initialize a new transaction.
         
@@ -17,21 +24,178 @@ class Transaction:
             timestamp: Time of transaction (defaults to current time)
             signature: Digital signature for authentication (optional)
             tx_id: Unique transaction identifier (optional)
+            fee: Fee paid by the sender to the miner (defaults to 0)
+            inputs: Outpoints (tx_id, output_index) spent by this transaction
+                (None: the UTXO set picks the sender's outputs when confirming)
+            outputs: (address, amount) pairs created by this transaction; output 0
+                pays the receiver (defaults to a single payment output)
+            public_key: PEM encoded public key of the sender (optional)
+            scheme: Signature scheme tag (set when signing; untagged signatures are RSA-PSS)
         """
+        object.__setattr__(self, '_sealed', False)
+        object.__setattr__(self, '_encodings', {})
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
+        self.fee = fee
         self.timestamp = timestamp if timestamp else time.time()
         self.signature = signature
+        self.public_key = public_key
+        self.scheme = scheme
+        self.inputs = None
+        self.outputs = [(receiver, amount)]
+        if inputs is not None:
+            self.inputs = [(tx_id_, int(index)) for tx_id_, index in inputs]
+            if outputs is not None:
+                self.outputs = [(address, value) for address, value in outputs]
         self.tx_id = tx_id if tx_id else self._calculate_tx_id()
     
+    @classmethod
+    def from_dict(cls, tx_dict):
+        """
+        Rebuild a transaction from its dictionary representation.
+        
+        Args:
+            tx_dict: Dictionary as produced by to_dict (or to_legacy_dict)
+        
+        Returns:
+            Transaction: The rebuilt transaction
+        """
+        return cls(
+            sender=tx_dict['sender'],
+            receiver=tx_dict['receiver'],
+            amount=tx_dict['amount'],
+            timestamp=tx_dict['timestamp'],
+            signature=tx_dict['signature'],
+            tx_id=tx_dict['tx_id'],
+            fee=tx_dict.get('fee', 0.0),
+            inputs=tx_dict.get('inputs'),
+            outputs=tx_dict.get('outputs'),
+            public_key=tx_dict.get('public_key'),
+            scheme=tx_dict.get('scheme')
+        ).seal()
+    
+    def __setattr__(self, name, value):
+        if self._sealed and name in self.ENCODED_FIELDS:
+            raise AttributeError(f"Transaction {self.tx_id} is sealed; use update() to change {name}")
+        object.__setattr__(self, name, value)
+    
+    def __getstate__(self):
+        # Cached encodings are rebuilt on demand rather than sent over the wire
+        state = self.__dict__.copy()
+        state['_encodings'] = {}
+        return state
+    
+    def seal(self):
+        """
+        Make the transaction immutable and cache its encodings from now on.
+        
+        Returns:
+            Transaction: self, for chaining
+        """
+        object.__setattr__(self, '_sealed', True)
+        return self
+    
+    @property
+    def sealed(self):
+        """Whether the transaction is sealed."""
+        return self._sealed
+    
+    def update(self, **fields):
+        """
+        Change fields of a (possibly sealed) transaction, dropping its cached encodings.
+        
+        The tx_id is not recalculated; pass it explicitly if it should change.
+        
+        Args:
+            **fields: New values of fields in ENCODED_FIELDS
+        """
+        unknown = set(fields) - self.ENCODED_FIELDS
+        if unknown:
+            raise AttributeError(f"Cannot update unknown transaction fields: {sorted(unknown)}")
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_encodings', {})
+    
+    def _cached(self, key, build):
+        """Return an encoding, built once per sealed transaction (every time before sealing)."""
+        if not self._sealed:
+            return build()
+        value = self._encodings.get(key)
+        if value is None:
+            value = self._encodings[key] = build()
+        return value
+    
     def _calculate_tx_id(self):
         """Calculate a unique transaction ID based on transaction data."""
         tx_contents = f"{self.sender}{self.receiver}{self.amount}{self.timestamp}"
+        if self.fee:
+            tx_contents += f"{self.fee}"
+        if self.inputs is not None:
+            tx_contents += "".join(f"{tx_id}:{index}" for tx_id, index in self.inputs)
+            tx_contents += "".join(f"{address}:{value}" for address, value in self.outputs)
         return hashlib.sha256(tx_contents.encode()).hexdigest()
     
+    def has_valid_id(self):
+        """Check that the tx_id is the hash of the transaction's contents."""
+        return self.tx_id == self._calculate_tx_id()
+    
+    def is_coinbase(self):
+        """Check whether this is a block reward transaction."""
+        return str(self.sender) == "0"
+    
+    def is_well_formed(self):
+        """
+        Check the amounts and inputs of a transaction, independently of any UTXO set.
+        
+        Every output must be a positive finite number, the fee must not be
+        negative, output 0 must pay the receiver the stated amount, and no
+        input may be listed twice. Rewards are checked against their block instead.
+        
+        Returns:
+            bool: True if the transaction is well formed
+        """
+        def is_number(value):
+            return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        
+        if not is_number(self.fee) or self.fee < 0 or not self.outputs:
+            return False
+        if not all(is_number(amount) and amount > 0 for _, amount in self.outputs):
+            return False
+        if self.inputs is not None and len(set(self.inputs)) != len(self.inputs):
+            return False
+        return tuple(self.outputs[0]) == (self.receiver, self.amount)
+    
+    def total_cost(self):
+        """Return the amount debited from the sender (amount plus fee)."""
+        return self.amount + self.fee
+    
+    def size(self):
+        """Return the serialized size of the transaction in bytes."""
+        return len(self.to_json())
+    
+    def fee_rate(self):
+        """Return the fee paid per serialized byte."""
+        return self.fee / self.size()
+    
     def to_dict(self):
-        """Return a dictionary representation of the transaction."""
+        """Return a dictionary representation of the transaction (a copy the caller may change)."""
+        return copy.deepcopy(self._cached('dict', self._build_dict))
+    
+    def _build_dict(self):
+        tx_dict = self.to_legacy_dict()
+        tx_dict['fee'] = self.fee
+        if self.inputs is not None:
+            tx_dict['inputs'] = [list(outpoint) for outpoint in self.inputs]
+            tx_dict['outputs'] = [list(output) for output in self.outputs]
+        if self.public_key:
+            tx_dict['public_key'] = self.public_key
+        if self.scheme:
+            tx_dict['scheme'] = self.scheme
+        return tx_dict
+    
+    def to_legacy_dict(self):
+        """Return the fields serialized before fees existed (used by legacy blocks)."""
         return {
             'sender': self.sender,
             'receiver': self.receiver,
@@ -43,17 +207,34 @@ class Transaction:
     
     def to_json(self):
         """Convert transaction to JSON format."""
-        return json.dumps(self.to_dict(), sort_keys=True)
+        return self._cached('json', lambda: json.dumps(self._cached('dict', self._build_dict), sort_keys=True))
     
     def transaction_data(self):
         """Return the transaction data that needs to be signed."""
-        return json.dumps({
+        return self._cached('data', self._build_transaction_data)
+    
+    def _build_transaction_data(self):
+        data = {
             'sender': self.sender,
             'receiver': self.receiver,
             'amount': self.amount,
             'timestamp': self.timestamp,
             'tx_id': self.tx_id
-        }, sort_keys=True).encode()
+        }
+        # Fee-less transactions keep the original signing payload
+        if self.fee:
+            data['fee'] = self.fee
+        if self.inputs is not None:
+            data['inputs'] = [list(outpoint) for outpoint in self.inputs]
+            data['outputs'] = [list(output) for output in self.outputs]
+        # RSA-PSS keeps the original payload; other schemes sign their tag too
+        if self.scheme and self.scheme != SCHEME_RSA_PSS:
+            data['scheme'] = self.scheme
+        return json.dumps(data, sort_keys=True).encode()
+    
+    def signature_scheme(self):
+        """Return the scheme the signature uses (untagged transactions are RSA-PSS)."""
+        return self.scheme or SCHEME_RSA_PSS
     
     def sign_transaction(self, private_key):
         """
@@ -61,56 +242,54 @@ class Transaction:
         
         Args:
             private_key: The private key of the sender
-            
+        
         Returns:
             bool: True if signing was successful
         """
         if not self.sender:
             raise ValueError("Cannot sign transactions with no sender")
         
+        # Ship the public key so other nodes can verify without a key directory
+        if not self.public_key:
+            self.update(public_key=serialize_public_key(private_key.public_key()))
+        if self.scheme != key_scheme(private_key):
+            self.update(scheme=key_scheme(private_key))
+        
         # Sign the transaction data with the private key
-        signature = private_key.sign(
-            self.transaction_data(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        
-        self.signature = signature.hex()
+        signature = sign_data(private_key, self.transaction_data())
+        
+        self.update(signature=signature.hex())
+        # Signed transactions are final
+        self.seal()
         return True
     
-    def verify_signature(self, public_key):
+    def verify_signature(self, public_key=None):
         """
         Verify the signature of this transaction using the sender's public key.
         
         Args:
-            public_key: The public key object of the sender
-            
+            public_key: The public key object of the sender (defaults to the key
+                carried by the transaction, which must hash to the sender address)
+        
         Returns:
             bool: True if the signature is valid
         """
-        if not self.signature:
+        if not self.signature or self.signature_scheme() not in SIGNATURE_SCHEMES:
             return False
         
         try:
+            if public_key is None:
+                if not self.public_key:
+                    return False
+                public_key = public_key_registry.resolve(self.sender, self.public_key)
+                if public_key is None:
+                    return False
+            
             # Convert hex signature back to bytes
             signature_bytes = bytes.fromhex(self.signature)
             
-            # Verify the signature
-            public_key.verify(
-                signature_bytes,
-                self.transaction_data(),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except InvalidSignature:
-            return False
+            # Verify the signature with the scheme it is tagged with
+            return verify_data(public_key, signature_bytes, self.transaction_data(), self.signature_scheme())
         except Exception as e:
             print(f"Verification error: {e}")
             return False
@@ -121,10 +300,70 @@ class Transaction:
                 f"sender={self.sender[:10]}..., "
                 f"receiver={self.receiver[:10]}..., "
                 f"amount={self.amount}, "
+                f"fee={self.fee}, "
                 f"signed={'Yes' if self.signature else 'No'})")
 
 
 
+def benchmark_encodings(count=2000):
+    """
+    Measure the cost of the encodings one transaction goes through, unsealed vs sealed.
+    
+    Each transaction is encoded the way it is on its way through a node: its
+    signing payload when signed and verified on admission and in a block, its
+    size and fee rate in the mempool and the block template, its JSON when
+    relayed and saved, and its dictionary in the block. Memory is the sum,
+    over those calls, of what each one allocates (tracemalloc peak above the
+    level before the call), which includes the caches a sealed transaction
+    keeps.
+    
+    Args:
+        count: Number of transactions
+    
+    Returns:
+        dict: {'unsealed'|'sealed': (microseconds, bytes allocated) per transaction}
+    """
+    import tracemalloc
+    
+    lifecycle = ([Transaction.transaction_data] * 3 + [Transaction.size] * 2 +
+                 [Transaction.fee_rate] * 3 + [Transaction.to_json] * 2 + [Transaction.to_dict])
+    
+    def make(sealed):
+        transactions = []
+        for i in range(count):
+            tx = Transaction(f"CRYsender{i}", f"CRYreceiver{i}", 1.5, fee=0.01, signature="cd" * 128,
+                             inputs=[("ab" * 32, 0)], outputs=[(f"CRYreceiver{i}", 1.5)])
+            transactions.append(tx.seal() if sealed else tx)
+        return transactions
+    
+    stats = {}
+    for mode in ('unsealed', 'sealed'):
+        transactions = make(mode == 'sealed')
+        start_time = time.perf_counter()
+        for tx in transactions:
+            for step in lifecycle:
+                step(tx)
+        elapsed = time.perf_counter() - start_time
+        
+        allocated = 0
+        transactions = make(mode == 'sealed')
+        tracemalloc.start()
+        for tx in transactions:
+            for step in lifecycle:
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                step(tx)
+                allocated += tracemalloc.get_traced_memory()[1] - current
+        tracemalloc.stop()
+        stats[mode] = (elapsed / count * 1e6, allocated / count)
+    return stats
+
+
+if __name__ == "__main__":
+    for mode, (micros, allocated) in benchmark_encodings().items():
+        print(f"{mode:9} {micros:7.1f} us/tx  {allocated:8,.0f} bytes allocated/tx")
+
+
 # if __name__ == "__main__":
 #     tx = Transaction("Alice", "Bob", 10)
 #     transaction_data = tx.transaction_data()
@@ -0,0 +1,79 @@
+from .utxo import UTXO
+
+class BlockUndo:
+    """
+    Undo entry of a connected block: its net effect on the UTXO set.
+    
+    Records the UTXOs the block spent and the outpoints it created. An output
+    created and spent inside the same block cancels out, so disconnecting
+    the block is just removing what it created and restoring what it spent,
+    in O(block size).
+    """
+    __slots__ = ('spent', 'created')
+    
+    def __init__(self, spent=None, created=None):
+        """
+        Initialize an undo entry.
+        
+        Args:
+            spent: {outpoint: UTXO} of outputs the block spent
+            created: {outpoint: None} of outputs the block created (a dict keeps their order)
+        """
+        self.spent = spent if spent is not None else {}
+        self.created = created if created is not None else {}
+    
+    def record_add(self, utxo):
+        """Record an output created by the block."""
+        self.created[(utxo.transaction_id, utxo.output_index)] = None
+    
+    def record_spend(self, utxo):
+        """Record an output spent by the block."""
+        outpoint = (utxo.transaction_id, utxo.output_index)
+        if outpoint in self.created:
+            del self.created[outpoint]  # Created and spent within the block
+        else:
+            self.spent[outpoint] = utxo
+    
+    def apply(self, utxo_set):
+        """
+        Roll the UTXO set back to before the block.
+        
+        Args:
+            utxo_set: The UTXOSet the block was connected to
+        """
+        for tx_id, output_index in reversed(list(self.created)):
+            utxo_set.spend_utxo(tx_id, output_index)
+        for utxo in self.spent.values():
+            utxo_set.add_utxo(utxo)
+    
+    def to_dict(self):
+        """Convert the undo entry to a dictionary (for storage)."""
+        return {
+            'spent': [utxo.to_dict() for utxo in self.spent.values()],
+            'created': [list(outpoint) for outpoint in self.created]
+        }
+    
+    @classmethod
+    def from_dict(cls, undo_dict):
+        """
+        Rebuild an undo entry from its dictionary representation.
+        
+        Args:
+            undo_dict: Dictionary as produced by to_dict
+        
+        Returns:
+            BlockUndo: The rebuilt entry
+        """
+        spent = {}
+        for utxo_dict in undo_dict['spent']:
+            utxo = UTXO(**utxo_dict)
+            spent[(utxo.transaction_id, utxo.output_index)] = utxo
+        created = {(tx_id, output_index): None for tx_id, output_index in undo_dict['created']}
+        return cls(spent, created)
+    
+    def __len__(self):
+        return len(self.spent) + len(self.created)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"BlockUndo(spent={len(self.spent)}, created={len(self.created)})"
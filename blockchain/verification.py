@@ -0,0 +1,309 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from wallet.key import public_key_registry, verify_data
+from .concurrency import synchronized
+
+# Signature checks sent to a worker process at a time
+VERIFY_CHUNK_SIZE = 64
+# Successful verifications remembered by the signature cache
+DEFAULT_SIGNATURE_CACHE_ENTRIES = 100000
+
+def signature_job(transaction):
+    """
+    Extract what a signature check needs, encoding the signed payload once.
+    
+    Args:
+        transaction: The Transaction to check
+    
+    Returns:
+        tuple or None: (payload, signature bytes, public key PEM, sender, scheme), None
+            if the transaction carries no signature or public key
+    """
+    if not transaction.signature or not transaction.public_key:
+        return None
+    try:
+        signature_bytes = bytes.fromhex(transaction.signature)
+    except ValueError:
+        return None
+    return (transaction.transaction_data(), signature_bytes, transaction.public_key, transaction.sender,
+            transaction.signature_scheme())
+
+def _verify_chunk(jobs):
+    """
+    Check a chunk of signature jobs (runs in a worker process).
+    
+    Keys are resolved through the process's public key registry, which
+    persists across chunks, so a sender with many transactions only pays
+    for PEM parsing once per process.
+    
+    Args:
+        jobs: List of jobs from signature_job (None entries fail)
+    
+    Returns:
+        list: One bool per job
+    """
+    results = []
+    for job in jobs:
+        if job is None:
+            results.append(False)
+            continue
+        
+        payload, signature_bytes, public_key_pem, sender, scheme = job
+        try:
+            public_key = public_key_registry.resolve(sender, public_key_pem)
+            if public_key is None:
+                results.append(False)  # Key doesn't belong to the sender
+                continue
+            
+            results.append(verify_data(public_key, signature_bytes, payload, scheme))
+        except Exception as e:
+            print(f"Verification error: {e}")
+            results.append(False)
+    return results
+
+
+def signature_cache_key(transaction, job):
+    """
+    Cache key of a signature check: (tx_id, signature hash, public key fingerprint).
+    
+    The signature hash also covers the signed payload. The tx_id is supplied
+    by whoever sent the transaction and is not recomputed, so a tampered
+    transaction reusing a known tx_id and signature must not hit the cache.
+    
+    Args:
+        transaction: The Transaction being checked
+        job: Its job from signature_job
+    
+    Returns:
+        tuple: Hashable cache key
+    """
+    payload, signature_bytes, public_key_pem, _, _ = job
+    signature_hash = hashlib.sha256(signature_bytes + payload).digest()
+    key_fingerprint = hashlib.sha256(public_key_pem.encode()).digest()[:16]
+    return (transaction.tx_id, signature_hash, key_fingerprint)
+
+
+class SignatureCache:
+    """
+    Bounded LRU cache of signature checks that succeeded.
+    
+    Shared by mempool admission and block validation, so a transaction
+    verified on entry to the mempool is not verified again when it shows up
+    in a block. Only successes are stored, so a cache miss never rejects
+    anything.
+    """
+    
+    def __init__(self, max_entries=DEFAULT_SIGNATURE_CACHE_ENTRIES):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_entries: Number of verified signatures to remember
+        """
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self._entries = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _entry_size(key):
+        """Memory held by one cached key (tuple, its items and the dict node)."""
+        return sys.getsizeof(key) + sum(sys.getsizeof(item) for item in key) + 100
+    
+    @synchronized
+    def contains(self, key):
+        """
+        Check whether a signature check is known to have succeeded, counting a hit or miss.
+        
+        Args:
+            key: Key from signature_cache_key
+        
+        Returns:
+            bool: True on a hit
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+    
+    @synchronized
+    def add(self, key):
+        """
+        Remember a successful signature check, evicting the least recently used one if full.
+        
+        Args:
+            key: Key from signature_cache_key
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = None
+        self.bytes_used += self._entry_size(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self.bytes_used -= self._entry_size(old_key)
+            self.evictions += 1
+    
+    @synchronized
+    def get_stats(self):
+        """
+        Get cache metrics.
+        
+        Returns:
+            dict: Entries, hits, misses, hit rate, evictions and bytes used
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'bytes': self.bytes_used,
+        }
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"SignatureCache(entries={len(self._entries)}/{self.max_entries}, hits={self.hits})"
+
+
+class BatchVerifier:
+    """
+    Verifies the signatures of many transactions at once.
+    
+    Signing payloads are encoded once in the calling process. The signature checks
+    are then split into chunks and spread over a pool of worker processes,
+    which is created on first use and reused afterwards. With a single worker
+    everything runs in the calling process. Signatures found in the cache are
+    not checked again, and new successes are added to it.
+    """
+    
+    def __init__(self, workers=1, chunk_size=VERIFY_CHUNK_SIZE, cache=None):
+        """
+        Initialize a verifier.
+        
+        Args:
+            workers: Number of verification processes (None uses every core)
+            chunk_size: Transactions per chunk sent to a worker
+            cache: SignatureCache shared with other verification paths (optional)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self._pool = None
+    
+    def verify(self, transactions):
+        """
+        Verify the signatures of a list of transactions.
+        
+        Each transaction's carried public key must hash to its sender address,
+        as with Transaction.verify_signature().
+        
+        Args:
+            transactions: List of Transaction objects
+        
+        Returns:
+            list: One bool per transaction, in the same order
+        """
+        jobs = [signature_job(tx) for tx in transactions]
+        if self.cache is None:
+            return self._verify_jobs(jobs)
+        
+        # Only signatures not verified before go to the workers
+        results = [False] * len(jobs)
+        keys = [None] * len(jobs)
+        pending = []
+        for i, (tx, job) in enumerate(zip(transactions, jobs)):
+            if job is None:
+                continue
+            keys[i] = signature_cache_key(tx, job)
+            if self.cache.contains(keys[i]):
+                results[i] = True
+            else:
+                pending.append(i)
+        
+        for i, ok in zip(pending, self._verify_jobs([jobs[i] for i in pending])):
+            results[i] = ok
+            if ok:
+                self.cache.add(keys[i])
+        return results
+    
+    def _verify_jobs(self, jobs):
+        """Check signature jobs in-process or across the pool."""
+        if self.workers == 1 or len(jobs) <= self.chunk_size:
+            return _verify_chunk(jobs)
+        
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        chunks = [jobs[i:i + self.chunk_size] for i in range(0, len(jobs), self.chunk_size)]
+        results = []
+        for chunk_results in self._pool.map(_verify_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+    
+    def close(self):
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"BatchVerifier(workers={self.workers}, chunk_size={self.chunk_size})"
+
+
+def benchmark_verification(count=512, max_workers=None):
+    """
+    Measure signature verification throughput one by one and in batches on 1..N cores.
+    
+    Args:
+        count: Number of signed transactions to verify
+        max_workers: Largest pool size to try (defaults to every core)
+    
+    Returns:
+        dict: Transactions per second for the per-transaction loop and for each pool size
+    """
+    from wallet.wallet import Wallet
+    from blockchain.transaction import Transaction
+    
+    senders = [Wallet() for _ in range(8)]
+    transactions = []
+    for i in range(count):
+        wallet = senders[i % len(senders)]
+        tx = Transaction(wallet.address, f"receiver{i}", 1.0, fee=0.01)
+        wallet.sign_transaction(tx)
+        transactions.append(tx)
+    
+    start_time = time.perf_counter()
+    assert all(tx.verify_signature() for tx in transactions)
+    stats = {'single': count / (time.perf_counter() - start_time), 'batch': {}}
+    
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        verifier = BatchVerifier(workers)
+        verifier.verify(transactions[:verifier.chunk_size * workers])  # Start the pool
+        start_time = time.perf_counter()
+        assert all(verifier.verify(transactions))
+        stats['batch'][workers] = count / (time.perf_counter() - start_time)
+        verifier.close()
+    return stats
+
+
+if __name__ == "__main__":
+    stats = benchmark_verification()
+    print(f"verify_signature loop: {stats['single']:,.0f} tx/s")
+    for workers, rate in stats['batch'].items():
+        print(f"Batch, {workers} process(es): {rate:,.0f} tx/s")
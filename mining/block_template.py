@@ -0,0 +1,188 @@
+import bisect
+import itertools
+
+# Default budget for the transactions of a block (serialized bytes)
+DEFAULT_MAX_BLOCK_BYTES = 1000000
+
+class TemplateEntry:
+    """A pending transaction tracked by the template builder."""
+    
+    __slots__ = ('transaction', 'tx_id', 'size', 'fee_rate', 'sequence', 'parents', 'children')
+    
+    def __init__(self, transaction, sequence):
+        self.transaction = transaction
+        self.tx_id = transaction.tx_id
+        self.size = transaction.size()
+        self.fee_rate = transaction.fee / self.size
+        self.sequence = sequence
+        self.parents = set()
+        self.children = set()
+    
+    @property
+    def sort_key(self):
+        """Highest fee rate first, then arrival order."""
+        return (-self.fee_rate, self.sequence, self.tx_id)
+
+
+class BlockTemplateBuilder:
+    """
+    Selects transactions for a new block by fee rate within a byte budget.
+    
+    Pending transactions are kept in a list ordered by fee rate, maintained
+    with binary insertion as the mempool changes, so building a template is a
+    single walk over that order rather than a re-sort of the whole mempool.
+    A transaction that depends on other pending transactions is only included
+    after all of them.
+    """
+    
+    def __init__(self, max_block_bytes=DEFAULT_MAX_BLOCK_BYTES):
+        """
+        Initialize an empty builder.
+        
+        Args:
+            max_block_bytes: Byte budget for the selected transactions
+        """
+        self.max_block_bytes = max_block_bytes
+        self.entries = {}
+        self._order = []
+        self._by_receiver = {}
+        self._sequence = itertools.count()
+        self.last_template_bytes = 0
+        self.last_template_complete = True
+    
+    def _find_parents(self, transaction):
+        """
+        Find pending transactions this one may depend on.
+        
+        With explicit inputs the parents are the pending transactions whose
+        outputs it spends. Without them, any earlier pending payment to the
+        sender may be funding this transaction, so it is treated as a parent.
+        """
+        if getattr(transaction, 'inputs', None) is not None:
+            return {tx_id for tx_id, _ in transaction.inputs if tx_id in self.entries}
+        return set(self._by_receiver.get(transaction.sender, ()))
+    
+    def add_transaction(self, transaction):
+        """
+        Start tracking a pending transaction.
+        
+        Args:
+            transaction: The Transaction to add
+        
+        Returns:
+            bool: True if added, False if it was already tracked
+        """
+        if transaction.tx_id in self.entries:
+            return False
+        
+        entry = TemplateEntry(transaction, next(self._sequence))
+        entry.parents = self._find_parents(transaction)
+        for parent_id in entry.parents:
+            self.entries[parent_id].children.add(entry.tx_id)
+        
+        self.entries[entry.tx_id] = entry
+        self._by_receiver.setdefault(transaction.receiver, set()).add(entry.tx_id)
+        bisect.insort(self._order, entry.sort_key)
+        return True
+    
+    def remove_transaction(self, tx_id):
+        """
+        Stop tracking a transaction (confirmed, evicted or replaced).
+        
+        Args:
+            tx_id: ID of the transaction to remove
+        
+        Returns:
+            bool: True if the transaction was tracked
+        """
+        entry = self.entries.pop(tx_id, None)
+        if entry is None:
+            return False
+        
+        index = bisect.bisect_left(self._order, entry.sort_key)
+        del self._order[index]
+        
+        receivers = self._by_receiver[entry.transaction.receiver]
+        receivers.discard(tx_id)
+        if not receivers:
+            del self._by_receiver[entry.transaction.receiver]
+        
+        for parent_id in entry.parents:
+            if parent_id in self.entries:
+                self.entries[parent_id].children.discard(tx_id)
+        for child_id in entry.children:
+            if child_id in self.entries:
+                self.entries[child_id].parents.discard(tx_id)
+        return True
+    
+    def sync(self, transactions):
+        """
+        Reconcile the builder with the current list of pending transactions.
+        
+        Only the differences are applied, so unchanged entries keep their place.
+        
+        Args:
+            transactions: Iterable of pending Transaction objects in arrival order
+        """
+        pending = {tx.tx_id: tx for tx in transactions}
+        
+        for tx_id in [tx_id for tx_id in self.entries if tx_id not in pending]:
+            self.remove_transaction(tx_id)
+        
+        for tx_id, tx in pending.items():
+            if tx_id not in self.entries:
+                self.add_transaction(tx)
+    
+    def build(self, max_bytes=None):
+        """
+        Select transactions for a block template.
+        
+        Args:
+            max_bytes: Byte budget (defaults to max_block_bytes)
+        
+        Returns:
+            list: Selected Transaction objects, parents before children
+        """
+        budget = self.max_block_bytes if max_bytes is None else max_bytes
+        selected = []
+        included = set()
+        waiting = {}
+        used = 0
+        
+        def include(entry):
+            nonlocal used
+            stack = [entry]
+            while stack:
+                entry = stack.pop()
+                if used + entry.size > budget:
+                    continue
+                used += entry.size
+                selected.append(entry.transaction)
+                included.add(entry.tx_id)
+                
+                # Children with a higher fee rate were deferred until now
+                ready = [waiting.pop(child_id) for child_id in entry.children & waiting.keys()
+                         if waiting[child_id].parents <= included]
+                ready.sort(key=lambda child: child.sort_key, reverse=True)
+                stack.extend(ready)
+        
+        for _, _, tx_id in self._order:
+            if used >= budget:
+                break
+            entry = self.entries[tx_id]
+            if entry.parents <= included:
+                include(entry)
+            else:
+                waiting[tx_id] = entry
+        
+        self.last_template_bytes = used
+        self.last_template_complete = len(selected) == len(self.entries)
+        return selected
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return (f"BlockTemplateBuilder(pending={len(self.entries)}, "
+                f"max_block_bytes={self.max_block_bytes})")
@@ -0,0 +1,53 @@
+import time
+import multiprocessing
+
+class CancellationToken:
+    """
+    Signals a running proof-of-work search that its block template is stale.
+    
+    Backed by a multiprocessing Event so the same token can be checked by the
+    mining thread and by parallel mining worker processes.
+    """
+    
+    def __init__(self, refresh_fee_rate=None):
+        """
+        Initialize a new, uncancelled token.
+        
+        Args:
+            refresh_fee_rate: New mempool transactions paying more than this fee
+                rate cancel the search (None: mempool changes never cancel it)
+        """
+        self.event = multiprocessing.Event()
+        self.refresh_fee_rate = refresh_fee_rate
+        self.reason = None
+        self.cancelled_at = None
+        # Set when the search on the finished template begins
+        self.started_at = None
+        self.hashes_done = 0
+    
+    def cancel(self, reason="cancelled"):
+        """
+        Cancel the search using this token.
+        
+        Args:
+            reason: Why the template became stale (e.g. "new_tip", "mempool")
+        
+        Returns:
+            bool: True if this call cancelled the token, False if it already was
+        """
+        if self.event.is_set():
+            return False
+        
+        self.reason = reason
+        self.cancelled_at = time.time()
+        self.event.set()
+        return True
+    
+    def is_cancelled(self):
+        """Check whether the token has been cancelled."""
+        return self.event.is_set()
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        status = f"cancelled({self.reason})" if self.is_cancelled() else "active"
+        return f"CancellationToken(status={status}, hashes={self.hashes_done})"
@@ -2,8 +2,10 @@
 
 import time
 import threading
+from collections import deque
 from blockchain.blockchain import Blockchain
 from .proof_of_work import proof_of_work
+from .cancellation import CancellationToken
 from notifications.alert_system import AlertSystem
 from blockchain.utxo import UTXOSet
 # import sys
@@ -11,7 +13,7 @@ from blockchain.utxo import UTXOSet
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 class Miner:
-    def __init__(self, miner_id, blockchain, alert_system=None):
+    def __init__(self, miner_id, blockchain, alert_system=None, workers=1):
         """
         Initialize a miner for cryptocurrency.
         
@@ -19,12 +21,26 @@ class Miner:
             miner_id: Unique identifier for this miner (wallet address)
             blockchain: Reference to the blockchain
             alert_system: Reference to the alert system (optional)
+            workers: Number of proof-of-work processes (None uses every core)
         """
         self.miner_id = miner_id
         self.blockchain = blockchain
         self.alert_system = alert_system
+        self.workers = workers
         self.is_mining = False
         self.mining_thread = None
+        self.current_token = None
+        
+        # Cost of stale templates: hashes spent on abandoned blocks and the
+        # delay between a cancellation and mining the rebuilt template
+        self.metrics = {
+            'blocks_mined': 0,
+            'templates_cancelled': 0,
+            'wasted_hashes': 0,
+            'cancel_reasons': {},
+        }
+        self.restart_latencies = deque(maxlen=1000)
+        self._cancelled_token = None
         
     def start_mining(self):
         """Start the mining process in a separate thread."""
@@ -41,6 +57,8 @@ class Miner:
     def stop_mining(self):
         """Stop the mining process."""
         self.is_mining = False
+        if self.current_token:
+            self.current_token.cancel("stopped")
         if self.mining_thread:
             self.mining_thread.join(timeout=1)
             print(f"Miner {self.miner_id} stopped mining.")
@@ -48,18 +66,25 @@ class Miner:
     def _mine_continuously(self):
         """Continuously mine blocks until stopped."""
         while self.is_mining:
-            if len(self.blockchain.unconfirmed_transactions) > 0:
+            if len(self.blockchain.mempool) > 0:
                 # Validate transactions before mining
                 valid_txs = self.validate_transactions()
                 
                 if valid_txs:
                     # Mine a new block
                     print(f"Miner {self.miner_id} mining block with {len(valid_txs)} transactions...")
-                    new_block = self.mine()
+                    token = CancellationToken()
+                    new_block = self.mine(cancel_token=token)
+                    self._record_restart(token)
                     
                     if new_block:
+                        self.metrics['blocks_mined'] += 1
                         print(f"Miner {self.miner_id} successfully mined block {new_block.index}!")
                         # Optional: Could broadcast the block here
+                    elif token.is_cancelled():
+                        # Template went stale: rebuild it straight away
+                        self._record_cancellation(token)
+                        print(f"Miner {self.miner_id} restarting: template stale ({token.reason}).")
                     else:
                         print(f"Miner {self.miner_id} failed to mine block.")
                 else:
@@ -68,15 +93,61 @@ class Miner:
                 # No transactions to mine, wait a bit
                 time.sleep(2)
     
-    def mine(self):
+    def mine(self, cancel_token=None):
         """
         Mine a single block.
         
+        Args:
+            cancel_token: CancellationToken used to abandon the block when it
+                becomes stale (optional)
+        
         Returns:
             Block or None: The mined block if successful, None otherwise
         """
-        # Use the blockchain's mining method
-        return self.blockchain.mine_block(self.miner_id)
+        self.current_token = cancel_token
+        try:
+            # Use the blockchain's mining method
+            return self.blockchain.mine_block(self.miner_id, workers=self.workers,
+                                              cancel_token=cancel_token)
+        finally:
+            self.current_token = None
+    
+    def _record_cancellation(self, token):
+        """Account for the work lost on a cancelled template."""
+        self.metrics['templates_cancelled'] += 1
+        self.metrics['wasted_hashes'] += token.hashes_done
+        reasons = self.metrics['cancel_reasons']
+        reasons[token.reason] = reasons.get(token.reason, 0) + 1
+        self._cancelled_token = token
+    
+    def _record_restart(self, token):
+        """
+        Measure how long it took to start mining again after a cancellation.
+        
+        Runs once the next search is over, so the interval covers rebuilding
+        the template up to the moment its proof-of-work search started.
+        
+        Args:
+            token: CancellationToken of the search that followed the cancellation
+        """
+        if self._cancelled_token is None or token.started_at is None:
+            return
+        self.restart_latencies.append(token.started_at - self._cancelled_token.cancelled_at)
+        self._cancelled_token = None
+    
+    def get_metrics(self):
+        """
+        Get stale-template mining metrics.
+        
+        Returns:
+            dict: Blocks mined, cancelled templates, wasted hashes and restart latency (ms)
+        """
+        latencies = list(self.restart_latencies)
+        metrics = dict(self.metrics)
+        metrics['cancel_reasons'] = dict(self.metrics['cancel_reasons'])
+        metrics['restart_latency_avg_ms'] = 1000 * sum(latencies) / len(latencies) if latencies else 0.0
+        metrics['restart_latency_max_ms'] = 1000 * max(latencies) if latencies else 0.0
+        return metrics
     
     def validate_transactions(self):
         """
@@ -85,14 +156,21 @@ class Miner:
         Returns:
             list: List of valid transactions
         """
+        # Make a copy of unconfirmed transactions to avoid modification during iteration
+        transactions_to_validate = self.blockchain.mempool.copy()
+        
+        # Check the whole batch against one consistent chain state
+        with self.blockchain.chain_lock.read_lock():
+            return self._validate_batch(transactions_to_validate)
+    
+    def _validate_batch(self, transactions_to_validate):
+        """Split a batch of pending transactions into valid and suspicious ones."""
         valid_transactions = []
         suspicious_transactions = []
         
-        # Make a copy of unconfirmed transactions to avoid modification during iteration
-        transactions_to_validate = self.blockchain.unconfirmed_transactions.copy()
-        
-        # Track addresses and amounts to detect double-spend attempts
-        spending_tracker = {}
+        # Apply the batch in order to a throwaway view of the UTXO set, so each
+        # transaction is checked against the outputs the ones before it left
+        view = self.blockchain.utxo_set.view()
         
         for tx in transactions_to_validate:
             # Skip mining rewards
@@ -100,32 +178,28 @@ class Miner:
                 valid_transactions.append(tx)
                 continue
             
-            # Get sender's balance
-            sender_balance = self.blockchain.get_balance(tx.sender)
-            
-            # Track spending by this sender in this batch
-            if tx.sender in spending_tracker:
-                spending_tracker[tx.sender] += tx.amount
-            else:
-                spending_tracker[tx.sender] = tx.amount
-            
-            # Check if this transaction would cause overspending
-            if spending_tracker[tx.sender] > sender_balance:
-                print(f"Potential double-spend detected for {tx.sender}")
-                suspicious_transactions.append(tx)
-                
-                # Alert if alert system is available
-                if self.alert_system:
-                    self.alert_system.send_alert(
-                        "DOUBLE_SPEND",
-                        f"Potential double-spend detected for {tx.sender}",
-                        {"tx_id": tx.tx_id, "sender": tx.sender, "amount": tx.amount}
-                    )
-            else:
+            # Fails if an input is missing or was spent earlier in the batch, or
+            # if what the sender has left doesn't cover the amount plus fee
+            if view.update_utxos(tx):
                 valid_transactions.append(tx)
+            else:
+                self._report_double_spend(tx, suspicious_transactions)
         
         return valid_transactions
     
+    def _report_double_spend(self, tx, suspicious_transactions):
+        """Record a suspected double-spend and raise an alert if possible."""
+        print(f"Potential double-spend detected for {tx.sender}")
+        suspicious_transactions.append(tx)
+        
+        # Alert if alert system is available
+        if self.alert_system:
+            self.alert_system.send_alert(
+                "DOUBLE_SPEND",
+                f"Potential double-spend detected for {tx.sender}",
+                {"tx_id": tx.tx_id, "sender": tx.sender, "amount": tx.amount}
+            )
+    
     def __repr__(self):
         """Debug-friendly string representation."""
         status = "mining" if self.is_mining else "idle"
@@ -1,24 +1,205 @@
 import hashlib
+import multiprocessing
+import os
+import struct
 import time
+from blockchain.block import LEGACY_BLOCK_VERSION
 
-def proof_of_work(block, difficulty=4):
+MAX_NONCE = 2**32  # 4 billion
+NONCE_FORMAT = struct.Struct('<I')
+
+# Number of nonces hashed per Python-level iteration of the mining loop
+MINING_BATCH_SIZE = 4096
+PROGRESS_INTERVAL = 1000000
+
+# Parallel mining hands out the nonce space in chunks of this size
+PARALLEL_CHUNK_SIZE = 65536
+# Shared "no solution yet" marker, larger than any valid nonce
+NO_SOLUTION = MAX_NONCE
+# How often the parent process checks for interruption while workers run (seconds)
+WORKER_POLL_INTERVAL = 0.01
+
+# Easiest target any block may use, in compact form (as on Bitcoin's regtest)
+POW_LIMIT_BITS = 0x207fffff
+
+def bits_to_target(bits):
     """
-    Perform Proof of Work algorithm to find a valid hash.
+    Expand a compact "bits" encoding into the full integer target.
+    
+    The top byte is the size of the target in bytes and the low three bytes
+    are its most significant digits.
+    
+    Args:
+        bits: Compact target encoding
+    
+    Returns:
+        int: The target a block hash must not exceed
+    """
+    exponent = bits >> 24
+    mantissa = bits & 0x007fffff
+    if exponent <= 3:
+        return mantissa >> (8 * (3 - exponent))
+    return mantissa << (8 * (exponent - 3))
+
+def target_to_bits(target):
+    """
+    Encode an integer target in compact "bits" form (rounding down).
+    
+    Args:
+        target: The full integer target
+    
+    Returns:
+        int: Compact target encoding
+    """
+    size = (target.bit_length() + 7) // 8
+    if size <= 3:
+        mantissa = target << (8 * (3 - size))
+    else:
+        mantissa = target >> (8 * (size - 3))
+    
+    # The top mantissa bit is a sign bit, so keep it clear
+    if mantissa & 0x00800000:
+        mantissa >>= 8
+        size += 1
+    
+    return (size << 24) | mantissa
+
+def difficulty_to_bits(difficulty):
+    """
+    Convert a leading-zeros difficulty into compact "bits".
     
     Args:
-        block: The Block object to mine
         difficulty: Number of leading zeros required in hash
+    
+    Returns:
+        int: Compact target encoding of the same (or slightly harder) target
+    """
+    return target_to_bits(16 ** (64 - difficulty) - 1)
+
+MAX_TARGET = bits_to_target(POW_LIMIT_BITS)
+
+def meets_target(block_hash, bits):
+    """
+    Check a hex block hash against a compact target.
+    
+    Args:
+        block_hash: Hex encoded block hash
+        bits: Compact target encoding
+    
+    Returns:
+        bool: True if the hash, read as an integer, does not exceed the target
+    """
+    return int(block_hash, 16) <= bits_to_target(bits)
+
+def block_work(bits):
+    """
+    Expected number of hashes needed to find a block at a compact target.
+    
+    Chains are compared by the sum of this over their blocks, so a branch
+    with fewer but harder blocks can outweigh a longer easy one.
+    
+    Args:
+        bits: Compact target encoding
+    
+    Returns:
+        int: Work represented by one block at this target
+    """
+    return (1 << 256) // (bits_to_target(bits) + 1)
+
+class MidstateMiner:
+    """
+    Proof-of-Work engine that hashes the constant header prefix once and
+    clones that SHA-256 state for every nonce, so only the 4-byte nonce
+    suffix is fed to the hash per attempt.
+    """
+    
+    def __init__(self, block, batch_size=MINING_BATCH_SIZE):
+        """
+        Prepare the midstate for a block.
+        
+        Args:
+            block: The Block object to mine (must use the binary header)
+            batch_size: Nonces checked per Python-level iteration
+        """
+        header = block.header_bytes()
+        max_digest = bits_to_target(block.bits).to_bytes(32, 'big')
+        self._setup(header[:-NONCE_FORMAT.size], max_digest, batch_size)
+    
+    @classmethod
+    def from_prefix(cls, prefix, max_digest, batch_size=MINING_BATCH_SIZE):
+        """
+        Build an engine from an already serialized header prefix.
+        
+        Args:
+            prefix: Header bytes preceding the nonce
+            max_digest: Largest acceptable digest (32 bytes, big-endian)
+            batch_size: Nonces checked per Python-level iteration
+            
+        Returns:
+            MidstateMiner: The prepared engine
+        """
+        engine = cls.__new__(cls)
+        engine._setup(prefix, max_digest, batch_size)
+        return engine
+    
+    def _setup(self, prefix, max_digest, batch_size):
+        """Hash the constant prefix once and keep the resulting state."""
+        self.prefix = prefix
+        self.midstate = hashlib.sha256(prefix)
+        self.max_digest = max_digest
+        self.batch_size = batch_size
+        self.hashes_done = 0
+    
+    def scan(self, start, stop, should_stop=None):
+        """
+        Search the nonce range [start, stop) for the lowest valid nonce.
+        
+        Args:
+            start: First nonce to try
+            stop: End of the range (exclusive)
+            should_stop: Optional callable polled once per batch
         
+        Returns:
+            dict or None: Dictionary with nonce and hash if found, None otherwise
+        """
+        midstate_copy = self.midstate.copy
+        pack = NONCE_FORMAT.pack
+        max_digest = self.max_digest
+        
+        def digest(nonce):
+            h = midstate_copy()
+            h.update(pack(nonce))
+            return h.digest()
+        
+        for batch_start in range(start, stop, self.batch_size):
+            if should_stop and should_stop():
+                return None
+            
+            batch = range(batch_start, min(batch_start + self.batch_size, stop))
+            digests = list(map(digest, batch))
+            self.hashes_done += len(digests)
+            
+            # Valid hashes are rare, so test the whole batch at C speed first
+            if min(digests) <= max_digest:
+                for nonce, block_digest in zip(batch, digests):
+                    if block_digest <= max_digest:
+                        return {
+                            'nonce': nonce,
+                            'hash': block_digest.hex()
+                        }
+        
+        return None
+
+def _legacy_search(block, difficulty, should_stop, start_time):
+    """
+    Nonce search for legacy (JSON-hashed) blocks, one full hash per nonce.
+    
     Returns:
-        dict or None: Dictionary with nonce and hash if successful, None if interrupted
+        tuple: (result dict or None, number of hashes computed)
     """
     target = '0' * difficulty
-    max_nonce = 2**32  # 4 billion
     
-    print(f"Mining block {block.index} with difficulty {difficulty}...")
-    start_time = time.time()
-    
-    for nonce in range(max_nonce):
+    for nonce in range(MAX_NONCE):
         # Update block's nonce
         block.nonce = nonce
         
@@ -27,42 +208,269 @@ def proof_of_work(block, difficulty=4):
         
         # Check if hash meets difficulty requirement
         if block_hash.startswith(target):
-            end_time = time.time()
-            mining_time = end_time - start_time
-            print(f"Block mined in {mining_time:.2f} seconds! Nonce: {nonce}, Hash: {block_hash}")
-            
             return {
                 'nonce': nonce,
                 'hash': block_hash
-            }
+            }, nonce + 1
         
         # Print progress every million attempts
-        if nonce % 1000000 == 0 and nonce > 0:
+        if nonce % PROGRESS_INTERVAL == 0 and nonce > 0:
             elapsed = time.time() - start_time
             print(f"Still mining... {nonce:,} hashes checked ({nonce/elapsed:.2f} h/s)")
         
-        # Check if mining should be interrupted (could expand for better control)
-        if nonce % 10000 == 0 and hasattr(block, 'interrupt_mining') and block.interrupt_mining:
-            print("Mining interrupted!")
-            return None
+        # Check if mining should be interrupted
+        if nonce % MINING_BATCH_SIZE == 0 and should_stop():
+            return None, nonce + 1
+    
+    return None, MAX_NONCE
+
+def _search_worker(prefix, max_digest, stop, offset, stride, found, stop_event, hashes):
+    """
+    Worker process for parallel mining.
+    
+    Scans every stride-th chunk of the nonce space starting at chunk `offset`.
+    Chunks are visited in increasing order and a chunk is only abandoned once
+    a lower nonce has been found, so the shared result is always the lowest
+    valid nonce, exactly as the single-process search would return.
+    
+    Args:
+        prefix: Header bytes preceding the nonce
+        max_digest: Largest acceptable digest
+        stop: End of the nonce range (exclusive)
+        offset: Index of the first chunk handled by this worker
+        stride: Number of workers sharing the nonce space
+        found: Shared value holding the lowest nonce found so far
+        stop_event: Shared event set when mining is interrupted
+        hashes: Shared counter of hashes computed by all workers
+    """
+    engine = MidstateMiner.from_prefix(prefix, max_digest)
+    
+    try:
+        for chunk_start in range(offset * PARALLEL_CHUNK_SIZE, stop, stride * PARALLEL_CHUNK_SIZE):
+            should_stop = lambda: stop_event.is_set() or found.value < chunk_start
+            if should_stop():
+                return
+            
+            chunk_stop = min(chunk_start + PARALLEL_CHUNK_SIZE, stop)
+            result = engine.scan(chunk_start, chunk_stop, should_stop)
+            if result:
+                with found.get_lock():
+                    if result['nonce'] < found.value:
+                        found.value = result['nonce']
+                return
+    finally:
+        with hashes.get_lock():
+            hashes.value += engine.hashes_done
+
+def _parallel_search(block, workers, max_nonce, should_stop):
+    """
+    Split the nonce space across worker processes.
+    
+    Args:
+        block: The Block object to mine
+        workers: Number of worker processes
+        max_nonce: End of the nonce range (exclusive)
+        should_stop: Callable polled while the workers run
+        
+    Returns:
+        tuple: (result dict or None, number of hashes computed)
+    """
+    prefix = block.header_bytes()[:-NONCE_FORMAT.size]
+    max_digest = bits_to_target(block.bits).to_bytes(32, 'big')
+    found = multiprocessing.Value('Q', NO_SOLUTION)
+    hashes = multiprocessing.Value('Q', 0)
+    stop_event = multiprocessing.Event()
+    
+    processes = [
+        multiprocessing.Process(
+            target=_search_worker,
+            args=(prefix, max_digest, max_nonce, offset, workers, found, stop_event, hashes),
+            daemon=True
+        )
+        for offset in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    for process in processes:
+        while process.is_alive():
+            process.join(WORKER_POLL_INTERVAL)
+            if should_stop():
+                stop_event.set()
+    
+    if stop_event.is_set() or found.value == NO_SOLUTION:
+        return None, hashes.value
+    
+    nonce = found.value
+    block_hash = hashlib.sha256(prefix + NONCE_FORMAT.pack(nonce)).hexdigest()
+    return {
+        'nonce': nonce,
+        'hash': block_hash
+    }, hashes.value
+
+def _serial_search(block, max_nonce, should_stop, start_time):
+    """
+    Single-process midstate search, printing progress every million attempts.
+    
+    Returns:
+        tuple: (result dict or None, number of hashes computed)
+    """
+    engine = MidstateMiner(block)
+    
+    for segment_start in range(0, max_nonce, PROGRESS_INTERVAL):
+        # Print progress every million attempts
+        if segment_start > 0:
+            elapsed = time.time() - start_time
+            print(f"Still mining... {segment_start:,} hashes checked ({segment_start/elapsed:.2f} h/s)")
+        
+        segment_stop = min(segment_start + PROGRESS_INTERVAL, max_nonce)
+        result = engine.scan(segment_start, segment_stop, should_stop)
+        if result or should_stop():
+            return result, engine.hashes_done
+    
+    return None, engine.hashes_done
+
+def proof_of_work(block, difficulty=4, workers=1, max_nonce=MAX_NONCE, cancel_token=None):
+    """
+    Perform Proof of Work algorithm to find a valid hash.
+    
+    Versioned blocks are mined against the target encoded in their `bits`
+    header field; `difficulty` (leading zeros) only applies to legacy blocks.
+    
+    When the whole nonce range is exhausted the block timestamp is rolled
+    forward by one second and the search restarts, in both the single and
+    the multi-process mode, so both modes return the same result.
+    
+    Args:
+        block: The Block object to mine
+        difficulty: Number of leading zeros required in hash (legacy blocks)
+        workers: Number of worker processes (None uses every CPU core)
+        max_nonce: Size of the nonce range searched per timestamp
+        cancel_token: CancellationToken checked once per batch of nonces; the
+            number of hashes computed is recorded on it (optional)
+        
+    Returns:
+        dict or None: Dictionary with nonce and hash if successful, None if interrupted
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    start_time = time.time()
+    should_stop = cancel_token.is_cancelled if cancel_token else (lambda: False)
+    total_hashes = 0
+    
+    if block.version == LEGACY_BLOCK_VERSION:
+        print(f"Mining block {block.index} with difficulty {difficulty}...")
+        result, total_hashes = _legacy_search(block, difficulty, should_stop, start_time)
+    else:
+        print(f"Mining block {block.index} with target bits {block.bits:#010x}...")
+        while True:
+            if workers > 1:
+                result, hashes = _parallel_search(block, workers, max_nonce, should_stop)
+            else:
+                result, hashes = _serial_search(block, max_nonce, should_stop, start_time)
+            total_hashes += hashes
+            
+            if result or should_stop():
+                break
+            
+            # Nonce range exhausted: roll the timestamp to get a fresh header
+            block.timestamp += 1
+            print(f"Nonce range exhausted, rolling timestamp to {block.timestamp}")
+    
+    if cancel_token:
+        cancel_token.hashes_done = total_hashes
     
-    print("Reached maximum nonce value without finding valid hash")
+    if result:
+        block.nonce = result['nonce']
+        mining_time = time.time() - start_time
+        print(f"Block mined in {mining_time:.2f} seconds! Nonce: {result['nonce']}, Hash: {result['hash']}")
+        return result
+    
+    if should_stop():
+        print(f"Mining interrupted ({cancel_token.reason}) after {total_hashes:,} hashes")
+    else:
+        print("Reached maximum nonce value without finding valid hash")
     return None
 
-def is_valid_proof(block, difficulty=4):
+def is_valid_proof(block, difficulty=4, bits=None):
     """
     Check if a block's hash meets the proof-of-work difficulty requirement.
     
     Args:
         block: The Block object to check
-        difficulty: Number of leading zeros required in hash
-        
+        difficulty: Number of leading zeros required in hash (legacy blocks)
+        bits: Compact target the block is expected to commit to (optional)
+    
     Returns:
         bool: True if the block's hash meets the difficulty requirement
     """
-    # The block hash should start with 'difficulty' number of zeros
-    target = '0' * difficulty
+    # Check if the hash was calculated correctly
+    if block.hash != block.calculate_hash():
+        return False
+    
+    # Legacy (JSON-hashed) blocks carry no target: the block hash should
+    # start with 'difficulty' number of zeros
+    if block.version == LEGACY_BLOCK_VERSION:
+        return block.hash.startswith('0' * difficulty)
+    
+    # Versioned blocks commit to their target in the header, so it must
+    # match what the chain expects
+    if bits is not None and block.bits != bits:
+        return False
+    
+    return meets_target(block.hash, block.bits)
+
+def benchmark_hashrate(block):
+    """
+    Compare the per-nonce header hashing loop with the midstate engine.
+    
+    Both searches run on the same block at the same target and must
+    agree on the resulting nonce and hash.
+    
+    Args:
+        block: The Block object to mine
+    
+    Returns:
+        dict: Hashes per second for each method and the speedup
+    """
+    target = bits_to_target(block.bits)
+    
+    start_time = time.perf_counter()
+    for nonce in range(MAX_NONCE):
+        block.nonce = nonce
+        block_hash = block.calculate_hash()
+        if int(block_hash, 16) <= target:
+            break
+    loop_time = time.perf_counter() - start_time
+    loop_result = {'nonce': nonce, 'hash': block_hash}
+    
+    block.nonce = 0
+    start_time = time.perf_counter()
+    midstate_result = MidstateMiner(block).scan(0, MAX_NONCE)
+    midstate_time = time.perf_counter() - start_time
+    
+    if midstate_result != loop_result:
+        raise AssertionError("Midstate engine disagrees with the per-nonce loop")
+    
+    hashes = loop_result['nonce'] + 1
+    return {
+        'hashes': hashes,
+        'loop_hps': hashes / loop_time,
+        'midstate_hps': hashes / midstate_time,
+        'speedup': loop_time / midstate_time
+    }
+
+
+if __name__ == "__main__":
+    from blockchain.block import Block
+    from blockchain.transaction import Transaction
+    
+    transactions = [Transaction(f"sender{i}", f"receiver{i}", i) for i in range(100)]
+    block = Block(index=1, previous_hash="0" * 64, transactions=transactions, bits=difficulty_to_bits(5))
     
-    # Check if the hash was calculated correctly and meets the difficulty
-    return (block.hash == block.calculate_hash() and 
-            block.hash.startswith(target))
\ No newline at end of file
+    stats = benchmark_hashrate(block)
+    print(f"Hashes until solution: {stats['hashes']:,}")
+    print(f"Per-nonce loop:  {stats['loop_hps']:,.0f} h/s")
+    print(f"Midstate engine: {stats['midstate_hps']:,.0f} h/s")
+    print(f"Speedup:         {stats['speedup']:.2f}x")
@@ -4,14 +4,19 @@ import logging
 from typing import List, Dict, Any, Optional
 
 from wallet.wallet import Wallet
+from wallet.key import public_key_registry, DEFAULT_SIGNATURE_SCHEME
+from wallet.key_pool import KeyPool
 from blockchain.blockchain import Blockchain
 from blockchain.transaction import Transaction
 from .peer_to_peer import PeerToPeer
 from notifications.alert_system import AlertSystem
 from mining.miner import Miner
-from mining.proof_of_work import is_valid_proof
+from storage.mempool_file import MempoolFile
 # from blockchain.UTXOSet import is_unspent
 
+# Pending transactions read and signature-checked together when reloading the mempool
+MEMPOOL_LOAD_BATCH = 256
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,21 +30,31 @@ class Node:
     and connects to other nodes in the network.
     """
 
-    def __init__(self, node_id: str, ml_model_path: Optional[str] = None):
+    def __init__(self, node_id: str, ml_model_path: Optional[str] = None,
+                 mempool_file: Optional[str] = None, signature_scheme: str = DEFAULT_SIGNATURE_SCHEME,
+                 key_pool: Optional[KeyPool] = None, utxo_db: Optional[str] = None):
         """
         Initialize a node with a unique identifier.
         
         Args:
             node_id: Unique identifier for this node
             ml_model_path: Path to the trained ML model for fraud detection
+            mempool_file: Where pending transactions are saved on stop and
+                reloaded on start (defaults to mempool_<node_id>.dat)
+            signature_scheme: Signature scheme of the node's wallet
+                (rsa-pss, ecdsa-secp256k1 or ed25519)
+            key_pool: Pre-generated keys to take the wallet's key from, so many
+                nodes can be created without waiting on key generation
+            utxo_db: SQLite file keeping the UTXO set and chain across restarts
+                (optional; in memory only by default)
         """
         self.node_id = node_id
         self.logger = logging.getLogger(f"Node-{node_id}")
         self.logger.info(f"Initializing node {node_id}")
         
         # Core components
-        self.wallet = Wallet() # debuging purpose
-        self.blockchain = Blockchain(miner_address=self.wallet.address)
+        self.wallet = Wallet(scheme=signature_scheme, key_pool=key_pool) # debuging purpose
+        self.blockchain = Blockchain(miner_address=self.wallet.address, utxo_db=utxo_db)
         # self.wallet = self.wallet = Wallet(blockchain=self.blockchain) # debuging purpose
         self.wallet.blockchain = self.blockchain
         self.network = PeerToPeer(host="127.0.0.1", port=5000, blockchain=self.blockchain)
@@ -48,6 +63,7 @@ class Node:
         
         # Transaction pool
         # self.pending_transactions = []
+        self.mempool_file = mempool_file or f"mempool_{node_id}.dat"
         
         # Load ML model if path is provided
         self.ml_model = None
@@ -87,6 +103,9 @@ class Node:
         self.is_running = True
         self.logger.info(f"Node {self.node_id} started")
         
+        # Restore pending transactions saved by the last run before serving templates
+        self.load_mempool()
+        
         # Start network communication
         self.network.start_server()
         
@@ -114,48 +133,107 @@ class Node:
         if self.is_mining:
             self.miner.stop_mining()
             self.is_mining = False
+        
+        # Keep pending transactions for the next start
+        self.save_mempool()
+        self.blockchain.verifier.close()
+        self.blockchain.utxo_set.close()
 
-    def create_transaction(self, receiver: str, amount: float) -> Optional[Transaction]:
+    def save_mempool(self) -> int:
+        """
+        Write the pending transactions to the mempool file.
+        
+        Returns:
+            Number of transactions saved
+        """
+        mempool = self.blockchain.mempool
+        with mempool.lock:
+            entries = [(entry.transaction, entry.added_at) for entry in mempool.entries.values()]
+        
+        try:
+            count = MempoolFile.save(entries, self.mempool_file)
+        except OSError as e:
+            self.logger.error(f"Failed to save mempool to {self.mempool_file}: {e}")
+            return 0
+        self.logger.info(f"Saved {count} pending transactions to {self.mempool_file}")
+        return count
+
+    def load_mempool(self) -> int:
+        """
+        Stream pending transactions back from the mempool file and re-validate them.
+        
+        Signatures are checked a batch at a time; the other checks (inputs,
+        double spends, balance, fee floor, expiry) run on admission.
+        
+        Returns:
+            Number of transactions restored
+        """
+        restored = 0
+        batch = []
+        for transaction, added_at in MempoolFile.load(self.mempool_file):
+            batch.append((transaction, added_at))
+            if len(batch) >= MEMPOOL_LOAD_BATCH:
+                restored += self._restore_batch(batch)
+                batch = []
+        if batch:
+            restored += self._restore_batch(batch)
+        
+        if restored:
+            self.logger.info(f"Restored {restored} pending transactions from {self.mempool_file}")
+        return restored
+
+    def _restore_batch(self, batch: List[Any]) -> int:
+        """Verify the signatures of a batch of saved transactions and re-admit the valid ones."""
+        restored = 0
+        expiry_cutoff = time.time() - self.blockchain.mempool.expiry
+        valid = self.blockchain.verify_transactions([tx for tx, _ in batch])
+        for (transaction, added_at), signature_ok in zip(batch, valid):
+            if not signature_ok or added_at < expiry_cutoff:
+                continue
+            if self.blockchain.add_transaction(transaction, check_signature=False, added_at=added_at):
+                restored += 1
+        return restored
+
+    def create_transaction(self, receiver: str, amount: float, fee: float = 0.0) -> Optional[Transaction]:
         """
         Create a new transaction from this node's wallet.
         
         Args:
             receiver: Address of the receiver
             amount: Amount to transfer
+            fee: Fee offered to the miner
             
         Returns:
             The created transaction if successful, None otherwise
         """
         # Check if user has sufficient balance
-        if self.wallet.get_balance() < amount:
-            self.logger.warning(f"Insufficient balance for transaction: {amount}")
+        if self.wallet.get_balance() < amount + fee:
+            self.logger.warning(f"Insufficient balance for transaction: {amount} (fee {fee})")
             return None
             
-        # Create and sign transaction
-        transaction = Transaction(
-            sender=self.wallet.address,
-            receiver=receiver,
-            amount=amount,
-            timestamp=time.time()
-        )
-        
-        # Sign transaction with private key
-        transaction.sign_transaction(self.wallet.private_key)
+        # Create and sign transaction spending specific outputs of the wallet
+        try:
+            transaction = self.wallet.create_transaction(receiver, amount, fee)
+        except ValueError as e:
+            self.logger.warning(f"Cannot create transaction: {e}")
+            return None
         
         # Add to pending transactions and broadcast
-        self.blockchain.unconfirmed_transactions.append(transaction)
-        # self.blockchain.add_transaction(transaction=transaction) # change for debuging purposes
+        if not self.blockchain.add_transaction(transaction):
+            self.logger.warning(f"Transaction rejected by the local pool: {transaction.tx_id}")
+            return None
         self.network.broadcast_transaction(transaction)
         
         self.logger.info(f"Created and broadcast transaction: {transaction.tx_id}")
         return transaction
 
-    def receive_transaction(self, transaction: Transaction) -> bool:
+    def receive_transaction(self, transaction: Transaction, check_signature: bool = True) -> bool:
         """
         Process a transaction received from the network.
         
         Args:
             transaction: The received transaction
+            check_signature: Verify the signature (False if already batch-verified)
             
         Returns:
             True if transaction is valid and accepted, False otherwise
@@ -163,17 +241,13 @@ class Node:
         self.logger.info(f"Received transaction: {transaction.tx_id}")
         
         # Check if transaction is already in pending pool
-        for tx in self.blockchain.unconfirmed_transactions:
-            if tx.tx_id == transaction.tx_id:
-                self.logger.debug(f"Transaction {transaction.tx_id} already in pending pool")
-                return False
+        if transaction.tx_id in self.blockchain.mempool:
+            self.logger.debug(f"Transaction {transaction.tx_id} already in pending pool")
+            return False
         
-        # Check if transaction is valid
-        if not self.validate_and_add_tx(transaction):
+        # Validate and add it to the pending pool in one step
+        if not self.validate_and_add_tx(transaction, check_signature=check_signature):
             return False
-            
-        # Add to pending transactions
-        self.blockchain.unconfirmed_transactions.append(transaction)
         
         # Analyze transaction for potential fraud
         if self.ml_model:
@@ -181,27 +255,46 @@ class Node:
             
         return True
 
-    def validate_and_add_tx(self, transaction: Transaction) -> bool:
+    def receive_transactions(self, transactions: List[Transaction]) -> List[bool]:
+        """
+        Process a batch of transactions received from the network, verifying
+        all their signatures in one batch first.
+        
+        Args:
+            transactions: The received transactions
+            
+        Returns:
+            One flag per transaction, True if it was accepted
+        """
+        signatures_ok = self.blockchain.verify_transactions(transactions)
+        results = []
+        for transaction, signature_ok in zip(transactions, signatures_ok):
+            if not signature_ok:
+                self.logger.warning(f"Invalid signature for transaction: {transaction.tx_id}")
+                results.append(False)
+            else:
+                results.append(self.receive_transaction(transaction, check_signature=False))
+        return results
+
+    def validate_and_add_tx(self, transaction: Transaction, check_signature: bool = True) -> bool:
         """
         Validate a transaction and add it to the pool if valid.
         
+        Blockchain.add_transaction() runs every check and the admission under
+        the chain and mempool locks, so a block or a competing transaction
+        cannot change the outcome between the two.
+        
         Args:
             transaction: Transaction to validate
+            check_signature: Verify the signature (False if already batch-verified)
             
         Returns:
-            True if transaction is valid, False otherwise
+            True if transaction is valid and added, False otherwise
         """
-        # Check signature
-        if not transaction.verify_signature():
-            self.logger.warning(f"Invalid signature for transaction: {transaction.tx_id}")
-            return False
-            
-        # Check if sender has sufficient balance
-        sender_balance = self.blockchain.get_balance(transaction.sender)
-        if sender_balance < transaction.amount:
-            self.logger.warning(f"Insufficient balance for transaction: {transaction.tx_id}")
-            return False
-            
+        if self.blockchain.add_transaction(transaction, check_signature=check_signature):
+            return True
+        self.logger.warning(f"Transaction rejected: {transaction.tx_id}")
+        
         # Check for double spending
         if self.blockchain.is_double_spending(transaction):
             self.logger.warning(f"Double spending detected for transaction: {transaction.tx_id}")
@@ -218,9 +311,7 @@ class Node:
                 "timestamp": time.time()
             })
             
-            return False
-            
-        return True
+        return False
 
     def receive_block(self, block: Dict[str, Any]) -> bool:
         """
@@ -234,32 +325,16 @@ class Node:
         """
         self.logger.info(f"Received block with index: {block['index']}")
         
-        # Validate block
-        if not is_valid_proof(block, self.blockchain.difficulty):
-            self.logger.warning(f"Received invalid block: {block['index']}")
-            return False
-            
-        # Add to blockchain
+        # The blockchain checks the proof of work, files side branches and orphans,
+        # and evicts confirmed transactions from the mempool when the block connects
         added = self.blockchain.add_received_block(block)
         if added:
-            # Remove confirmed transactions from pending pool
-            self._remove_confirmed_transactions(block['transactions'])
             self.logger.info(f"Added block {block['index']} to blockchain")
             return True
         else:
             self.logger.warning(f"Failed to add block {block['index']} to blockchain")
             return False
 
-    def _remove_confirmed_transactions(self, confirmed_txs: List[Dict[str, Any]]) -> None:
-        """
-        Remove transactions that have been confirmed in a block from pending pool.
-        
-        Args:
-            confirmed_txs: List of confirmed transaction dictionaries
-        """
-        confirmed_tx_ids = [tx['tx_id'] for tx in confirmed_txs]
-        self.blockchain.unconfirmed_transactions = [tx for tx in self.blockchain.unconfirmed_transactions if tx.tx_id not in confirmed_tx_ids]
-
     def start_mining(self) -> None:
         """Start mining process in a separate thread"""
         if self.is_mining:
@@ -288,23 +363,18 @@ class Node:
         """Mining process that runs in a separate thread"""
         while self.is_mining and self.is_running:
             # Check if there are enough pending transactions
-            if len(self.blockchain.unconfirmed_transactions) < 1:
+            if len(self.blockchain.mempool) < 1:
                 time.sleep(5)  # Wait for more transactions
                 continue
                 
-            # Select a batch of pending transactions
-            tx_batch = self.blockchain.unconfirmed_transactions[:10]  # Limit batch size
-            
-            # Mine a new block
-            block = self.miner.mine(tx_batch)
+            # Mine a new block; the blockchain builds the template by fee rate
+            # and removes the confirmed transactions from the pending pool
+            block = self.miner.mine()
             
             # If mining was successful, broadcast the block
             if block:
                 self.logger.info(f"Successfully mined block: {block.index}")
-                self.network.broadcast_block(block.to_dict())
-                
-                # Remove confirmed transactions from pending pool
-                self._remove_confirmed_transactions([tx.to_dict() for tx in tx_batch])
+                self.network.broadcast_block(block)
 
     def check_transaction_fraud(self, transaction: Transaction) -> None:
         """
@@ -331,9 +401,8 @@ class Node:
             fraud_score += 0.3
             
         # If sender has made multiple transactions in a short time
-        recent_txs = [tx for tx in self.blockchain.unconfirmed_transactions
-                     if tx.sender == transaction.sender and 
-                     time.time() - tx.timestamp < 300]  # Last 5 minutes
+        recent_txs = [tx for tx in self.blockchain.mempool.get_by_sender(transaction.sender)
+                     if time.time() - tx.timestamp < 300]  # Last 5 minutes
         if len(recent_txs) > 5:  # Example threshold
             fraud_score += 0.3
             
@@ -377,9 +446,8 @@ class Node:
         sender_balance = self.blockchain.get_balance(transaction.sender)
         
         # Count recent transactions by sender (last hour)
-        recent_txs = [tx for tx in self.blockchain.unconfirmed_transactions 
-                     if tx.sender == transaction.sender and 
-                     time.time() - tx.timestamp < 3600]
+        recent_txs = [tx for tx in self.blockchain.mempool.get_by_sender(transaction.sender)
+                     if time.time() - tx.timestamp < 3600]
         
         # Calculate average transaction amount if possible
         avg_amount = 0
@@ -431,8 +499,10 @@ class Node:
             "wallet_address": self.wallet.address,
             "balance": self.wallet.get_balance(),
             "blockchain_length": len(self.blockchain.chain),
-            "pending_transactions": len(self.blockchain.unconfirmed_transactions),
+            "pending_transactions": len(self.blockchain.mempool),
             "connected_peers": len(self.network.peer_list),
+            "signature_cache": self.blockchain.signature_cache.get_stats(),
+            "public_key_registry": public_key_registry.get_stats(),
             "is_mining": self.is_mining
         }
 
@@ -454,10 +524,18 @@ class Node:
                         "Blockchain reorganization detected - potential 51% attack"
                     )
                 
-                # Check for unusually high transaction volume
-                tx_count = len(self.blockchain.unconfirmed_transactions)
+                # Drop pending transactions that have waited too long
+                expired = self.blockchain.expire_mempool()
+                if expired:
+                    self.logger.info(f"Expired {expired} pending transactions")
+                
+                # Check for unusually high transaction volume (the mempool evicts past its budget)
+                tx_count = len(self.blockchain.mempool)
                 if tx_count > 100:  # Example threshold
-                    self.logger.warning(f"High transaction volume detected: {tx_count}")
+                    stats = self.blockchain.mempool.get_stats()
+                    self.logger.warning(f"High transaction volume detected: {tx_count} "
+                                        f"({stats['memory']}/{stats['max_memory']} bytes, "
+                                        f"min fee rate {stats['min_fee_rate']:.8f})")
                     self.alert_system.send_alert(
                         self.node_id,
                         f"Unusually high transaction volume detected: {tx_count} pending transactions"
@@ -569,7 +647,7 @@ def run_end_to_end_test():
     # Step 6: Print UTXO state
     print("\n📦 Final UTXO Set:")
     print(node.blockchain.utxo_set)
-    for addr in node.blockchain.utxo_set.utxos:
+    for addr in node.blockchain.utxo_set.addresses:
         print(f"   🔎 {addr} →", node.blockchain.utxo_set.get_balance(addr))
 
     print("\n Blockcahin: ")
@@ -141,14 +141,7 @@ class PeerToPeer:
         if message_type == 'TRANSACTION':
             # Process new transaction
             transaction_dict = data
-            transaction = Transaction(
-                sender=transaction_dict['sender'],
-                receiver=transaction_dict['receiver'],
-                amount=transaction_dict['amount'],
-                timestamp=transaction_dict['timestamp'],
-                signature=transaction_dict['signature'],
-                tx_id=transaction_dict['tx_id']
-            )
+            transaction = Transaction.from_dict(transaction_dict)
             
             if self.blockchain:
                 # Add transaction to blockchain's unconfirmed transactions
@@ -160,34 +153,17 @@ class PeerToPeer:
         elif message_type == 'BLOCK':
             # Process new block
             block_dict = data
+            block = Block.from_dict(block_dict)
+            print(f"Received block {block.index} with hash {block_dict.get('hash', '')[:10]}...")
             
-            # Create transactions from dict
-            transactions = []
-            for tx_dict in block_dict['transactions']:
-                tx = Transaction(
-                    sender=tx_dict['sender'],
-                    receiver=tx_dict['receiver'],
-                    amount=tx_dict['amount'],
-                    timestamp=tx_dict['timestamp'],
-                    signature=tx_dict['signature'],
-                    tx_id=tx_dict['tx_id']
-                )
-                transactions.append(tx)
-            
-            # Create block from dict
-            block = Block(
-                index=block_dict['index'],
-                previous_hash=block_dict['previous_hash'],
-                transactions=transactions,
-                timestamp=block_dict['timestamp'],
-                nonce=block_dict['nonce']
-            )
-            block.hash = block_dict['hash']
-            block.merkle_root = block_dict['merkle_root']
-            
-            # TODO: Validate and add block to blockchain
-            # This would require additional blockchain functionality
-            print(f"Received block {block.index} with hash {block.hash[:10]}...")
+            if block.hash != block_dict.get('hash'):
+                print(f"Block {block.index} does not match its hash")
+            elif self.blockchain:
+                # Connected, filed on a side branch or held as an orphan by the blockchain
+                if self.blockchain.add_received_block(block):
+                    print(f"Accepted block {block.index}")
+                else:
+                    print(f"Did not accept block {block.index}")
         
         elif message_type == 'PEER':
             # Add new peer
@@ -378,9 +354,8 @@ class PeerToPeer:
             return False
         
         # Prepare blockchain data
-        chain_data = []
-        for block in self.blockchain.chain:
-            chain_data.append(block.to_dict())
+        with self.blockchain.chain_lock.read_lock():
+            chain_data = [block.to_dict() for block in self.blockchain.chain]
         
         message = {
             'type': 'BLOCKCHAIN',
@@ -0,0 +1,198 @@
+import os
+import base64
+import struct
+import zlib
+
+from blockchain.transaction import Transaction
+from wallet.key import SCHEME_RSA_PSS, SCHEME_ECDSA_SECP256K1, SCHEME_ED25519
+from .record_format import U16, U32, pack_bytes, pack_text, pack_number, Reader
+
+# File header: magic, format version
+MEMPOOL_FILE_MAGIC = b"CMPL"
+MEMPOOL_FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+# Each record: payload length, CRC32 of the payload
+RECORD_HEADER = struct.Struct('<II')
+# Fixed part of a transaction: flags, timestamp, amount, fee, time it entered the mempool
+TX_FIXED = struct.Struct('<Bdddd')
+
+# Transaction flags
+FLAG_AMOUNT_INT = 0x01
+FLAG_FEE_INT = 0x02
+FLAG_TIMESTAMP_INT = 0x04
+FLAG_SIGNATURE = 0x08
+FLAG_PUBLIC_KEY = 0x10
+FLAG_INPUTS = 0x20
+# Signature scheme, in the top two bits (0: untagged, i.e. RSA-PSS)
+SCHEME_SHIFT = 6
+SCHEME_CODES = {None: 0, SCHEME_RSA_PSS: 1, SCHEME_ECDSA_SECP256K1: 2, SCHEME_ED25519: 3}
+SCHEME_TAGS = {code: scheme for scheme, code in SCHEME_CODES.items()}
+
+PEM_HEADER = "-----BEGIN PUBLIC KEY-----"
+PEM_FOOTER = "-----END PUBLIC KEY-----"
+
+
+def _pem_to_der(pem):
+    body = "".join(line for line in pem.strip().splitlines() if not line.startswith("-----"))
+    return base64.b64decode(body)
+
+def _der_to_pem(der):
+    body = base64.b64encode(der).decode('ascii')
+    lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    return "\n".join([PEM_HEADER] + lines + [PEM_FOOTER]) + "\n"
+
+
+def encode_transaction(transaction, added_at):
+    """
+    Encode a pending transaction into a compact binary record payload.
+    :param transaction: Transaction object
+    :param added_at: Time the transaction entered the mempool
+    :return: Encoded bytes
+    """
+    flags = 0
+    if isinstance(transaction.amount, int):
+        flags |= FLAG_AMOUNT_INT
+    if isinstance(transaction.fee, int):
+        flags |= FLAG_FEE_INT
+    if isinstance(transaction.timestamp, int):
+        flags |= FLAG_TIMESTAMP_INT
+    if transaction.signature:
+        flags |= FLAG_SIGNATURE
+    if transaction.public_key:
+        flags |= FLAG_PUBLIC_KEY
+    if transaction.inputs is not None:
+        flags |= FLAG_INPUTS
+    if transaction.scheme not in SCHEME_CODES:
+        raise ValueError(f"Unknown signature scheme: {transaction.scheme}")
+    flags |= SCHEME_CODES[transaction.scheme] << SCHEME_SHIFT
+
+    parts = [TX_FIXED.pack(flags, transaction.timestamp, transaction.amount, transaction.fee, added_at)]
+    pack_text(parts, transaction.sender)
+    pack_text(parts, transaction.receiver)
+    pack_text(parts, transaction.tx_id)
+    if flags & FLAG_SIGNATURE:
+        pack_text(parts, transaction.signature)
+    if flags & FLAG_PUBLIC_KEY:
+        pack_bytes(parts, _pem_to_der(transaction.public_key))
+    if flags & FLAG_INPUTS:
+        parts.append(U16.pack(len(transaction.inputs)))
+        for tx_id, output_index in transaction.inputs:
+            pack_text(parts, tx_id)
+            parts.append(U32.pack(output_index))
+        parts.append(U16.pack(len(transaction.outputs)))
+        for address, amount in transaction.outputs:
+            pack_text(parts, address)
+            pack_number(parts, amount)
+    return b"".join(parts)
+
+
+def decode_transaction(payload):
+    """
+    Decode a record payload written by encode_transaction.
+    :param payload: Encoded bytes
+    :return: (Transaction, added_at) tuple
+    """
+    reader = Reader(payload)
+    flags, timestamp, amount, fee, added_at = reader.unpack(TX_FIXED)
+    sender = reader.text()
+    receiver = reader.text()
+    tx_id = reader.text()
+    signature = reader.text() if flags & FLAG_SIGNATURE else None
+    public_key = _der_to_pem(reader.bytes()) if flags & FLAG_PUBLIC_KEY else None
+
+    inputs = outputs = None
+    if flags & FLAG_INPUTS:
+        inputs = []
+        for _ in range(reader.unpack(U16)[0]):
+            inputs.append((reader.text(), reader.unpack(U32)[0]))
+        outputs = []
+        for _ in range(reader.unpack(U16)[0]):
+            outputs.append((reader.text(), reader.number()))
+
+    transaction = Transaction(
+        sender=sender,
+        receiver=receiver,
+        amount=int(amount) if flags & FLAG_AMOUNT_INT else amount,
+        timestamp=int(timestamp) if flags & FLAG_TIMESTAMP_INT else timestamp,
+        signature=signature,
+        tx_id=tx_id,
+        fee=int(fee) if flags & FLAG_FEE_INT else fee,
+        inputs=inputs,
+        outputs=outputs,
+        public_key=public_key,
+        scheme=SCHEME_TAGS[flags >> SCHEME_SHIFT]
+    )
+    return transaction, added_at
+
+
+class MempoolFile:
+    @staticmethod
+    def save(entries, file_name):
+        """
+        Write pending transactions to a compact binary file.
+        The file is written next to the target and renamed over it, so a crash
+        mid-write leaves the previous dump intact.
+        :param entries: Iterable of (transaction, added_at) tuples
+        :param file_name: File name for storage
+        :return: Number of transactions written
+        """
+        directory = os.path.dirname(os.path.abspath(file_name))
+        os.makedirs(directory, exist_ok=True)
+        temp_name = file_name + ".tmp"
+
+        count = 0
+        with open(temp_name, 'wb') as file:
+            file.write(FILE_HEADER.pack(MEMPOOL_FILE_MAGIC, MEMPOOL_FILE_VERSION))
+            for transaction, added_at in entries:
+                try:
+                    payload = encode_transaction(transaction, added_at)
+                except ValueError as e:
+                    print(f"Skipping unsavable transaction {transaction.tx_id}: {e}")
+                    continue
+                file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+                file.write(payload)
+                count += 1
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, file_name)
+        return count
+
+    @staticmethod
+    def load(file_name):
+        """
+        Stream pending transactions back from a file written by save.
+        Corrupted records are skipped; a truncated tail ends the stream.
+        :param file_name: File name to load data from
+        :return: Generator of (transaction, added_at) tuples
+        """
+        try:
+            file = open(file_name, 'rb')
+        except FileNotFoundError:
+            print(f"No mempool file found: {file_name}")
+            return
+
+        with file:
+            header = file.read(FILE_HEADER.size)
+            if len(header) != FILE_HEADER.size:
+                return
+            magic, version = FILE_HEADER.unpack(header)
+            if magic != MEMPOOL_FILE_MAGIC or version != MEMPOOL_FILE_VERSION:
+                print(f"Unsupported mempool file: {file_name}")
+                return
+
+            while True:
+                record_header = file.read(RECORD_HEADER.size)
+                if len(record_header) != RECORD_HEADER.size:
+                    return
+                length, checksum = RECORD_HEADER.unpack(record_header)
+                payload = file.read(length)
+                if len(payload) != length:
+                    print(f"Truncated mempool file: {file_name}")
+                    return
+                if zlib.crc32(payload) != checksum:
+                    print("Skipping corrupted mempool record")
+                    continue
+                try:
+                    yield decode_transaction(payload)
+                except (ValueError, struct.error, UnicodeDecodeError) as e:
+                    print(f"Skipping unreadable mempool record: {e}")
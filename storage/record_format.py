@@ -0,0 +1,78 @@
+import struct
+
+U8 = struct.Struct('<B')
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+F64 = struct.Struct('<d')
+
+# Kinds of packed text: plain UTF-8, or hex stored as raw bytes
+TEXT_PLAIN = 0
+TEXT_HEX = 1
+
+
+def pack_bytes(parts, data):
+    """
+    Pack a length-prefixed byte string.
+    :param parts: List of byte strings the record is built from
+    :param data: Bytes to pack
+    """
+    parts.append(U16.pack(len(data)))
+    parts.append(data)
+
+
+def pack_text(parts, text):
+    """
+    Pack a string, halving it when it is lowercase hex (tx IDs, signatures).
+    :param parts: List of byte strings the record is built from
+    :param text: String to pack
+    """
+    try:
+        raw = bytes.fromhex(text)
+        if raw.hex() == text:
+            parts.append(U8.pack(TEXT_HEX))
+            pack_bytes(parts, raw)
+            return
+    except ValueError:
+        pass
+    parts.append(U8.pack(TEXT_PLAIN))
+    pack_bytes(parts, text.encode('utf-8'))
+
+
+def pack_number(parts, value):
+    """
+    Pack an int or float, keeping track of which it was.
+    :param parts: List of byte strings the record is built from
+    :param value: Number to pack
+    """
+    parts.append(U8.pack(isinstance(value, int)))
+    parts.append(F64.pack(value))
+
+
+class Reader:
+    """Cursor over a record payload."""
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def bytes(self):
+        (length,) = self.unpack(U16)
+        data = self.data[self.offset:self.offset + length]
+        if len(data) != length:
+            raise ValueError("Truncated field")
+        self.offset += length
+        return data
+
+    def text(self):
+        (kind,) = self.unpack(U8)
+        data = self.bytes()
+        return data.hex() if kind == TEXT_HEX else data.decode('utf-8')
+
+    def number(self):
+        is_int, value = self.unpack(U8)[0], self.unpack(F64)[0]
+        return int(value) if is_int else value
@@ -0,0 +1,243 @@
+import os
+import struct
+import hashlib
+import zlib
+
+from blockchain.utxo import UTXO
+from .record_format import U32, F64, pack_text, Reader
+
+# File header: magic, format version, height, block hash, chain work, UTXO count, content hash
+SNAPSHOT_MAGIC = b"CUTX"
+SNAPSHOT_VERSION = 1
+FILE_HEADER = struct.Struct('<4sBI32s32sQ32s')
+# Each chunk: compressed length, number of UTXOs, CRC32 of the compressed bytes
+CHUNK_HEADER = struct.Struct('<III')
+# UTXOs per chunk by default
+DEFAULT_SNAPSHOT_CHUNK_SIZE = 4096
+
+
+def encode_utxo(utxo):
+    """
+    Encode a UTXO into its snapshot record.
+    :param utxo: UTXO object
+    :return: Encoded bytes
+    """
+    parts = []
+    pack_text(parts, utxo.transaction_id)
+    parts.append(U32.pack(utxo.output_index))
+    parts.append(F64.pack(utxo.amount))
+    pack_text(parts, utxo.owner_address)
+    return b"".join(parts)
+
+
+def decode_utxos(payload, count):
+    """
+    Decode the records of one chunk.
+    :param payload: Uncompressed chunk bytes
+    :param count: Number of records in the chunk
+    :return: List of UTXO objects
+    """
+    reader = Reader(payload)
+    utxos = []
+    for _ in range(count):
+        tx_id = reader.text()
+        (output_index,) = reader.unpack(U32)
+        (amount,) = reader.unpack(F64)
+        utxos.append(UTXO(tx_id, output_index, amount, reader.text()))
+    if reader.offset != len(payload):
+        raise ValueError("Trailing bytes in snapshot chunk")
+    return utxos
+
+
+def content_hash(utxos):
+    """
+    Hash a UTXO set the way snapshots do: SHA-256 over its records in outpoint order.
+    The hash doesn't depend on chunking or compression, so a node replaying
+    the chain can compare its own set with a snapshot.
+    :param utxos: Iterable of UTXO objects sorted by (transaction ID, output index)
+    :return: Hex digest
+    """
+    digest = hashlib.sha256()
+    for utxo in utxos:
+        digest.update(encode_utxo(utxo))
+    return digest.hexdigest()
+
+
+def _hash_bytes(block_hash):
+    raw = bytes.fromhex(block_hash)
+    if len(raw) != 32:
+        raise ValueError(f"Not a 32-byte block hash: {block_hash}")
+    return raw
+
+
+class UTXOSnapshot:
+    @staticmethod
+    def write(utxos, file_name, height, block_hash, chain_work, chunk_size=DEFAULT_SNAPSHOT_CHUNK_SIZE):
+        """
+        Write a UTXO set to a compact binary snapshot.
+        Records are zlib-compressed in chunks of chunk_size UTXOs, each with a
+        CRC32, and the header carries the hash of the whole set. The file is
+        written next to the target and renamed over it.
+        :param utxos: Iterable of UTXO objects sorted by (transaction ID, output index)
+        :param file_name: File name for storage
+        :param height: Height of the block the set corresponds to
+        :param block_hash: Hash of that block
+        :param chain_work: Cumulative proof-of-work up to that block
+        :param chunk_size: UTXOs per chunk
+        :return: Hex content hash of the snapshot
+        """
+        directory = os.path.dirname(os.path.abspath(file_name))
+        os.makedirs(directory, exist_ok=True)
+        temp_name = file_name + ".tmp"
+
+        digest = hashlib.sha256()
+        count = 0
+        with open(temp_name, 'wb') as file:
+            # Rewritten once the count and content hash are known
+            file.write(bytes(FILE_HEADER.size))
+            records = []
+            last_outpoint = None
+            for utxo in utxos:
+                outpoint = (utxo.transaction_id, utxo.output_index)
+                if last_outpoint is not None and outpoint <= last_outpoint:
+                    raise ValueError("UTXOs must be written in outpoint order")
+                last_outpoint = outpoint
+                records.append(encode_utxo(utxo))
+                if len(records) == chunk_size:
+                    UTXOSnapshot._write_chunk(file, records, digest)
+                    count += len(records)
+                    records = []
+            if records:
+                UTXOSnapshot._write_chunk(file, records, digest)
+                count += len(records)
+
+            file.seek(0)
+            file.write(FILE_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, height, _hash_bytes(block_hash),
+                                        chain_work.to_bytes(32, 'big'), count, digest.digest()))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, file_name)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _write_chunk(file, records, digest):
+        payload = b"".join(records)
+        digest.update(payload)
+        compressed = zlib.compress(payload)
+        file.write(CHUNK_HEADER.pack(len(compressed), len(records), zlib.crc32(compressed)))
+        file.write(compressed)
+
+    @staticmethod
+    def read_header(file_name):
+        """
+        Read the header of a snapshot.
+        :param file_name: File name to read
+        :return: Dictionary of height, block_hash, chain_work, utxo_count and content_hash
+        """
+        with open(file_name, 'rb') as file:
+            return UTXOSnapshot._parse_header(file.read(FILE_HEADER.size), file_name)
+
+    @staticmethod
+    def _parse_header(data, file_name):
+        if len(data) != FILE_HEADER.size:
+            raise ValueError(f"Truncated snapshot header: {file_name}")
+        magic, version, height, block_hash, chain_work, count, digest = FILE_HEADER.unpack(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot file: {file_name}")
+        return {
+            'height': height,
+            'block_hash': block_hash.hex(),
+            'chain_work': int.from_bytes(chain_work, 'big'),
+            'utxo_count': count,
+            'content_hash': digest.hex(),
+        }
+
+    @staticmethod
+    def read(file_name):
+        """
+        Stream the UTXOs of a snapshot back, chunk by chunk.
+        Every chunk is checked against its CRC32 and the records against the
+        content hash in the header; the hash can only be confirmed after the
+        last chunk, so callers should apply the chunks in a way they can roll back.
+        :param file_name: File name to read
+        :return: Generator of UTXO lists, in outpoint order
+        :raises ValueError: If the file is corrupted or doesn't match its content hash
+        """
+        with open(file_name, 'rb') as file:
+            header = UTXOSnapshot._parse_header(file.read(FILE_HEADER.size), file_name)
+            digest = hashlib.sha256()
+            remaining = header['utxo_count']
+            last_outpoint = None
+            while remaining:
+                chunk_header = file.read(CHUNK_HEADER.size)
+                if len(chunk_header) != CHUNK_HEADER.size:
+                    raise ValueError(f"Truncated snapshot: {file_name}")
+                length, count, checksum = CHUNK_HEADER.unpack(chunk_header)
+                compressed = file.read(length)
+                if len(compressed) != length or zlib.crc32(compressed) != checksum or count > remaining:
+                    raise ValueError(f"Corrupted snapshot chunk in {file_name}")
+                try:
+                    payload = zlib.decompress(compressed)
+                    utxos = decode_utxos(payload, count)
+                except (zlib.error, struct.error, UnicodeDecodeError) as e:
+                    raise ValueError(f"Unreadable snapshot chunk in {file_name}: {e}")
+                digest.update(payload)
+
+                # Sorted order makes the content hash canonical
+                for utxo in utxos:
+                    outpoint = (utxo.transaction_id, utxo.output_index)
+                    if last_outpoint is not None and outpoint <= last_outpoint:
+                        raise ValueError(f"Snapshot records out of order in {file_name}")
+                    last_outpoint = outpoint
+                remaining -= count
+                yield utxos
+
+            if file.read(1) or digest.hexdigest() != header['content_hash']:
+                raise ValueError(f"Snapshot does not match its content hash: {file_name}")
+
+
+def benchmark_snapshot(file_name, count=200000, addresses=10000, chunk_size=DEFAULT_SNAPSHOT_CHUNK_SIZE):
+    """
+    Time writing and bulk loading a snapshot of a large UTXO set.
+    :param file_name: File path for the benchmark snapshot (overwritten)
+    :param count: Number of UTXOs
+    :param addresses: Number of distinct owner addresses
+    :param chunk_size: UTXOs per chunk
+    :return: Dictionary of timings, file size and bytes per UTXO
+    """
+    import time
+    from blockchain.utxo import UTXOSet
+
+    utxo_set = UTXOSet()
+    for i in range(count):
+        tx_id = hashlib.sha256(str(i).encode()).hexdigest()
+        utxo_set.add_utxo(UTXO(tx_id, i % 3, float(i % 50 + 1), f"address{i % addresses}"))
+
+    start_time = time.perf_counter()
+    UTXOSnapshot.write(utxo_set.iter_sorted(), file_name, 0, "00" * 32, 1, chunk_size)
+    write_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    loaded = UTXOSet()
+    loaded.bulk_load(UTXOSnapshot.read(file_name))
+    load_time = time.perf_counter() - start_time
+    assert len(loaded) == count
+
+    size = os.path.getsize(file_name)
+    return {
+        'utxos': count,
+        'write_seconds': write_time,
+        'load_seconds': load_time,
+        'bytes': size,
+        'bytes_per_utxo': size / count,
+    }
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    stats = benchmark_snapshot(os.path.join(tempfile.mkdtemp(), "bench.snapshot"))
+    print(f"UTXOs:           {stats['utxos']:,}")
+    print(f"Write:           {stats['write_seconds']:.2f}s")
+    print(f"Bulk load:       {stats['load_seconds']:.2f}s")
+    print(f"File size:       {stats['bytes']:,} bytes ({stats['bytes_per_utxo']:.1f} per UTXO)")
@@ -0,0 +1,434 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from blockchain.utxo import UTXO, UTXOSet
+from blockchain.concurrency import synchronized
+
+# Unspent outputs (and address balances) kept in memory by default
+DEFAULT_UTXO_CACHE_SIZE = 100000
+
+
+class UTXOStore(UTXOSet):
+    """
+    UTXO set kept in an SQLite database, with a write-back memory cache.
+
+    Lookups go to a bounded LRU cache of recently used outpoints and address
+    balances, and fall back to the database. Changes are held in memory as
+    dirty entries until flush(), which the blockchain calls once per
+    connected block: the block, its UTXO changes and the new tip are written
+    in a single transaction, so the database always matches a whole block.
+    The set can grow beyond RAM, and a restart reloads it instead of
+    replaying the chain.
+    """
+
+    def __init__(self, db_file, cache_size=DEFAULT_UTXO_CACHE_SIZE):
+        """
+        Open (or create) a UTXO database.
+        :param db_file: File path for the SQLite database
+        :param cache_size: Number of outpoints, and of address balances, cached in memory
+        """
+        self.db_file = db_file
+        self.cache_size = cache_size
+        self.lock = threading.RLock()
+        # Autocommit mode; flush() opens its own transaction
+        self.connection = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+
+        # {outpoint: UTXO or None} for clean entries; None means known to be unspendable
+        self._cache = OrderedDict()
+        # {outpoint: UTXO (added) or None (spent)} changed since the last flush
+        self._dirty = {}
+        # {address: (balance, utxo count)} clean and changed since the last flush
+        self._balance_cache = OrderedDict()
+        self._dirty_balances = {}
+        self._count = self.connection.execute("SELECT COUNT(*) FROM utxos").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def create_tables(self):
+        """
+        Create the tables for unspent outputs, balances and the stored chain.
+        """
+        self.connection.executescript("""
+        CREATE TABLE IF NOT EXISTS utxos (
+            tx_id TEXT NOT NULL,
+            output_index INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            owner TEXT NOT NULL,
+            PRIMARY KEY (tx_id, output_index)
+        );
+        CREATE INDEX IF NOT EXISTS utxos_by_owner ON utxos (owner);
+        CREATE TABLE IF NOT EXISTS balances (
+            address TEXT PRIMARY KEY,
+            balance REAL NOT NULL,
+            utxo_count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blocks (
+            height INTEGER PRIMARY KEY,
+            hash TEXT NOT NULL,
+            data TEXT NOT NULL,
+            undo TEXT
+        );
+        """)
+        # Databases written before undo entries were stored
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(blocks)")]
+        if 'undo' not in columns:
+            self.connection.execute("ALTER TABLE blocks ADD COLUMN undo TEXT")
+
+    def _remember(self, cache, key, value):
+        """Put a clean entry in an LRU cache, evicting the least recently used ones."""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _lookup(self, outpoint):
+        if outpoint in self._dirty:
+            return self._dirty[outpoint]
+        if outpoint in self._cache:
+            self._cache.move_to_end(outpoint)
+            self.hits += 1
+            return self._cache[outpoint]
+
+        self.misses += 1
+        row = self.connection.execute(
+            "SELECT amount, owner FROM utxos WHERE tx_id = ? AND output_index = ?", outpoint
+        ).fetchone()
+        utxo = UTXO(outpoint[0], outpoint[1], row[0], row[1]) if row else None
+        self._remember(self._cache, outpoint, utxo)
+        return utxo
+
+    def _balance_entry(self, address):
+        if address in self._dirty_balances:
+            return self._dirty_balances[address]
+        if address in self._balance_cache:
+            self._balance_cache.move_to_end(address)
+            return self._balance_cache[address]
+
+        row = self.connection.execute(
+            "SELECT balance, utxo_count FROM balances WHERE address = ?", (address,)
+        ).fetchone()
+        entry = (row[0], row[1]) if row else (0.0, 0)
+        self._remember(self._balance_cache, address, entry)
+        return entry
+
+    def _set_balance(self, address, balance, count):
+        self._balance_cache.pop(address, None)
+        # An address left without outputs drops any float drift in its balance
+        self._dirty_balances[address] = (balance, count) if count else (0.0, 0)
+
+    @synchronized
+    def add_utxo(self, utxo):
+        """
+        Add a UTXO to the set.
+        :param utxo: The UTXO object to add
+        :return: True if the UTXO was added, False if it already exists
+        """
+        outpoint = (utxo.transaction_id, utxo.output_index)
+        if self._lookup(outpoint) is not None:
+            return False
+
+        self._cache.pop(outpoint, None)
+        self._dirty[outpoint] = utxo
+        balance, count = self._balance_entry(utxo.owner_address)
+        self._set_balance(utxo.owner_address, balance + utxo.amount, count + 1)
+        self._count += 1
+        return True
+
+    @synchronized
+    def spend_utxo(self, transaction_id, output_index, owner_address=None):
+        """
+        Mark a UTXO as spent by removing it from the set.
+        :param transaction_id: Transaction ID of the UTXO
+        :param output_index: Output index of the UTXO
+        :param owner_address: Address of the owner (optional; checked if given)
+        :return: The spent UTXO if found and removed, None otherwise
+        """
+        outpoint = (transaction_id, output_index)
+        utxo = self._lookup(outpoint)
+        if utxo is None:
+            return None
+        if owner_address is not None and utxo.owner_address != owner_address:
+            return None
+
+        self._cache.pop(outpoint, None)
+        self._dirty[outpoint] = None
+        balance, count = self._balance_entry(utxo.owner_address)
+        self._set_balance(utxo.owner_address, balance - utxo.amount, count - 1)
+        self._count -= 1
+        return utxo
+
+    @synchronized
+    def get_utxo(self, transaction_id, output_index):
+        """
+        Look up an unspent output by its outpoint.
+        :param transaction_id: Transaction ID of the UTXO
+        :param output_index: Output index of the UTXO
+        :return: The UTXO if it is unspent, None otherwise
+        """
+        return self._lookup((transaction_id, output_index))
+
+    @synchronized
+    def get_utxos(self, address):
+        """
+        Get all UTXOs for a specific address, oldest first.
+        :param address: The wallet address to get UTXOs for
+        :return: List of UTXO objects owned by the address
+        """
+        utxos = {}
+        rows = self.connection.execute(
+            "SELECT tx_id, output_index, amount FROM utxos WHERE owner = ? ORDER BY rowid", (address,)
+        )
+        for tx_id, output_index, amount in rows:
+            if (tx_id, output_index) not in self._dirty:
+                utxos[(tx_id, output_index)] = UTXO(tx_id, output_index, amount, address)
+        # Outputs created since the last flush come after the stored ones
+        for outpoint, utxo in self._dirty.items():
+            if utxo is not None and utxo.owner_address == address:
+                utxos[outpoint] = utxo
+        return list(utxos.values())
+
+    @synchronized
+    def get_balance(self, address):
+        """
+        Get the total balance for an address.
+        :param address: The wallet address to get the balance for
+        :return: The total balance
+        """
+        return self._balance_entry(address)[0]
+
+    @synchronized
+    def is_unspent(self, transaction_id, output_index, address=None):
+        """
+        Check if a specific UTXO is unspent.
+        :param transaction_id: Transaction ID of the UTXO
+        :param output_index: Output index of the UTXO
+        :param address: Address of the owner (optional; checked if given)
+        :return: True if the UTXO is unspent, False otherwise
+        """
+        utxo = self._lookup((transaction_id, output_index))
+        if utxo is None:
+            return False
+        return address is None or utxo.owner_address == address
+
+    @property
+    @synchronized
+    def addresses(self):
+        """
+        Addresses owning at least one unspent output.
+        :return: List of addresses
+        """
+        stored = {row[0] for row in self.connection.execute("SELECT address FROM balances")}
+        for address, (_, count) in self._dirty_balances.items():
+            if count:
+                stored.add(address)
+            else:
+                stored.discard(address)
+        return list(stored)
+
+    @synchronized
+    def flush(self, block=None, height=None, undo=None):
+        """
+        Write the pending changes, and the block that caused them, in one transaction.
+        Blocks stored at or above the height are removed first, so flushing with a
+        height and no block records the disconnection of the blocks from there on.
+        :param block: Block whose connection produced the changes (optional)
+        :param height: Its height in the chain
+        :param undo: The block's BlockUndo, stored so it can be disconnected after a restart
+        """
+        added = [(tx_id, output_index, utxo.amount, utxo.owner_address)
+                 for (tx_id, output_index), utxo in self._dirty.items() if utxo is not None]
+        spent = [outpoint for outpoint, utxo in self._dirty.items() if utxo is None]
+        balances = [(address, balance, count) for address, (balance, count) in self._dirty_balances.items()
+                    if count]
+        emptied = [(address,) for address, (_, count) in self._dirty_balances.items() if not count]
+
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany("DELETE FROM utxos WHERE tx_id = ? AND output_index = ?", spent)
+            connection.executemany("INSERT OR REPLACE INTO utxos VALUES (?, ?, ?, ?)", added)
+            connection.executemany("INSERT OR REPLACE INTO balances VALUES (?, ?, ?)", balances)
+            connection.executemany("DELETE FROM balances WHERE address = ?", emptied)
+            if height is not None:
+                connection.execute("DELETE FROM blocks WHERE height >= ?", (height,))
+            if block is not None:
+                undo_json = json.dumps(undo.to_dict()) if undo is not None else None
+                connection.execute("INSERT INTO blocks VALUES (?, ?, ?, ?)",
+                                   (height, block.hash, block.to_json(), undo_json))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        # Written entries become clean, hot cache entries
+        for outpoint, utxo in self._dirty.items():
+            self._remember(self._cache, outpoint, utxo)
+        for address, entry in self._dirty_balances.items():
+            self._remember(self._balance_cache, address, entry)
+        self._dirty.clear()
+        self._dirty_balances.clear()
+
+    @synchronized
+    def iter_sorted(self):
+        """
+        Iterate over every UTXO in outpoint order (as written to snapshots).
+        Pending changes are flushed first so the database holds the whole set.
+        :return: Iterator of UTXO objects sorted by (transaction ID, output index)
+        """
+        self.flush()
+        rows = self.connection.execute(
+            "SELECT tx_id, output_index, amount, owner FROM utxos ORDER BY tx_id, output_index"
+        )
+        return (UTXO(tx_id, output_index, amount, owner) for tx_id, output_index, amount, owner in rows)
+
+    @synchronized
+    def bulk_load(self, chunks):
+        """
+        Fill an empty store from a snapshot in one transaction.
+        Balances are computed in SQL once the outputs are in, and a snapshot
+        failing its checks part way is rolled back.
+        :param chunks: Iterable of UTXO lists, e.g. from UTXOSnapshot.read()
+        """
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            for chunk in chunks:
+                connection.executemany(
+                    "INSERT INTO utxos VALUES (?, ?, ?, ?)",
+                    [(u.transaction_id, u.output_index, u.amount, u.owner_address) for u in chunk]
+                )
+            connection.execute("DELETE FROM balances")
+            connection.execute(
+                "INSERT INTO balances SELECT owner, SUM(amount), COUNT(*) FROM utxos GROUP BY owner"
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        self._cache.clear()
+        self._balance_cache.clear()
+        self._dirty.clear()
+        self._dirty_balances.clear()
+        self._count = connection.execute("SELECT COUNT(*) FROM utxos").fetchone()[0]
+
+    @synchronized
+    def store_blocks(self, blocks):
+        """
+        Store blocks whose UTXO changes are already in the set, e.g. the history
+        below a snapshot once it has been validated. They have no undo entries.
+        :param blocks: Blocks of the chain from the genesis block on, in order
+        """
+        rows = [(height, block.hash, block.to_json()) for height, block in enumerate(blocks)]
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany("INSERT OR REPLACE INTO blocks (height, hash, data) VALUES (?, ?, ?)", rows)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    @synchronized
+    def load_blocks(self):
+        """
+        Read the blocks stored alongside the UTXO set.
+        :return: List of (block dictionary, undo dictionary or None) tuples, in height order
+        """
+        rows = self.connection.execute("SELECT data, undo FROM blocks ORDER BY height")
+        return [(json.loads(data), json.loads(undo) if undo else None) for data, undo in rows]
+
+    @synchronized
+    def get_stats(self):
+        """
+        Get cache metrics.
+        :return: Dictionary of UTXO count, cache sizes, pending changes, hits and misses
+        """
+        return {
+            'utxos': self._count,
+            'cached': len(self._cache),
+            'cached_balances': len(self._balance_cache),
+            'dirty': len(self._dirty),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    @synchronized
+    def close(self):
+        """
+        Write pending changes and close the database.
+        """
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"UTXOStore(db_file={self.db_file}, utxos={self._count}, cached={len(self._cache)})"
+
+
+def benchmark_utxo_store(db_file, count=200000, block_size=1000, cache_size=20000, lookups=50000):
+    """
+    Time block-sized batches of inserts and lookups on a store larger than its cache.
+    :param db_file: File path for the benchmark database (overwritten)
+    :param count: Number of UTXOs to create
+    :param block_size: UTXOs added between flushes
+    :param cache_size: Outpoints kept in memory
+    :param lookups: Number of unspent checks to time
+    :return: Dictionary of operations per second and cache metrics
+    """
+    import os
+    import time
+    import random
+    import hashlib
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    store = UTXOStore(db_file, cache_size=cache_size)
+    tx_ids = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+    start_time = time.perf_counter()
+    for i, tx_id in enumerate(tx_ids):
+        store.add_utxo(UTXO(tx_id, 0, 1.0, f"address{i % 10000}"))
+        if (i + 1) % block_size == 0:
+            store.flush()
+    store.flush()
+    add_time = time.perf_counter() - start_time
+
+    # Recent outputs are spent far more often than old ones
+    hot = tx_ids[-cache_size // 2:]
+    hits, misses = store.hits, store.misses
+    start_time = time.perf_counter()
+    for _ in range(lookups):
+        pool = hot if random.random() < 0.9 else tx_ids
+        store.is_unspent(random.choice(pool), 0)
+    lookup_time = time.perf_counter() - start_time
+
+    hits, misses = store.hits - hits, store.misses - misses
+    store.close()
+    return {
+        'utxos': count,
+        'add_ops': count / add_time,
+        'lookup_ops': lookups / lookup_time,
+        'hit_rate': hits / max(1, hits + misses),
+        'db_bytes': os.path.getsize(db_file),
+    }
+
+
+if __name__ == "__main__":
+    stats = benchmark_utxo_store("utxo_benchmark.db")
+    print(f"UTXOs:             {stats['utxos']:,}")
+    print(f"add_utxo + flush:  {stats['add_ops']:,.0f} ops/s")
+    print(f"is_unspent:        {stats['lookup_ops']:,.0f} ops/s (cache hit rate {stats['hit_rate']:.0%})")
+    print(f"Database size:     {stats['db_bytes']:,} bytes")
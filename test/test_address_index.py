@@ -0,0 +1,71 @@
+from blockchain.address_index import AddressIndex
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+
+ADDRESSES = ["alice", "bob", "carol"]
+
+
+def make_blocks(count=20, per_block=5):
+    blocks = []
+    for height in range(count):
+        transactions = [Transaction("0", ADDRESSES[height % 3], 5.0, timestamp=1000.0 + height * 10)]
+        for i in range(per_block):
+            sender, receiver = ADDRESSES[(height + i) % 3], ADDRESSES[(height + i + 1) % 3]
+            # Timestamps inside a block are not ordered, as with real submissions
+            transactions.append(Transaction(sender, receiver, 1.0, timestamp=1000.0 + height * 10 - i))
+        blocks.append(Block(height, "0" * 64, transactions))
+    return blocks
+
+
+def brute_force(blocks, address):
+    found = [(tx.timestamp, height, position)
+             for height, block in enumerate(blocks)
+             for position, tx in enumerate(block.transactions)
+             if tx.receiver == address or (tx.sender == address and not tx.is_coinbase())]
+    return [(height, position) for _, height, position in sorted(found, reverse=True)]
+
+
+def test_query_matches_a_full_scan_with_paging_and_time_ranges():
+    blocks = make_blocks()
+    index = AddressIndex()
+    for height, block in enumerate(blocks):
+        index.connect_block(block, height)
+
+    for address in ADDRESSES:
+        expected = brute_force(blocks, address)
+        assert index.query(address) == expected
+        assert index.count(address) == len(expected)
+        pages = [index.query(address, offset=offset, limit=7) for offset in range(0, len(expected), 7)]
+        assert [entry for page in pages for entry in page] == expected
+        assert index.query(address, newest_first=False, offset=3, limit=4) == expected[::-1][3:7]
+
+        in_range = [(h, p) for h, p in expected if 1050 <= blocks[h].transactions[p].timestamp <= 1100]
+        assert index.query(address, start_time=1050, end_time=1100) == in_range
+        assert index.query(address, start_time=1050, end_time=1100, offset=2, limit=3) == in_range[2:5]
+
+
+def test_disconnect_removes_block_entries():
+    blocks = make_blocks(count=6)
+    index = AddressIndex()
+    for height, block in enumerate(blocks):
+        index.connect_block(block, height)
+    for height in (5, 4):
+        index.disconnect_block(blocks[height], height)
+
+    for address in ADDRESSES:
+        assert index.query(address) == brute_force(blocks[:4], address)
+    assert index.query("nobody") == []
+
+
+def test_every_output_owner_sees_the_transaction():
+    payment = Transaction("alice", "bob", 2.0, fee=0.1, timestamp=1000.0, inputs=[("ab" * 32, 0)],
+                          outputs=[("bob", 2.0), ("carol", 3.0), ("alice", 4.9), ("carol", 1.0)])
+    block = Block(1, "0" * 64, [Transaction("0", "miner", 5.1, timestamp=999.0), payment])
+    index = AddressIndex()
+    index.connect_block(block, 1)
+    for address in ADDRESSES:
+        assert index.query(address) == [(1, 1)]
+    assert index.query("miner") == [(1, 0)]
+
+    index.disconnect_block(block, 1)
+    assert len(index) == 0
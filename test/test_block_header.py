@@ -0,0 +1,41 @@
+import hashlib
+
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block, BLOCK_HEADER_SIZE, LEGACY_BLOCK_VERSION
+from blockchain.transaction import Transaction
+from mining.proof_of_work import proof_of_work, is_valid_proof, difficulty_to_bits
+
+
+def payments(count):
+    return [Transaction(f"sender{i}", f"receiver{i}", i + 1.0, timestamp=1000 + i) for i in range(count)]
+
+
+def test_hash_commits_to_transactions_only_through_the_merkle_root():
+    bits = difficulty_to_bits(1)
+    block = Block(1, "00" * 32, payments(3), timestamp=2000, bits=bits)
+    assert len(block.header_bytes()) == BLOCK_HEADER_SIZE
+    assert block.hash == hashlib.sha256(block.header_bytes()).hexdigest()
+
+    # Signatures are not part of the tx_id, so they leave the header alone
+    signed = [Transaction.from_dict(dict(tx.to_dict(), signature="ab" * 64)) for tx in payments(3)]
+    assert Block(1, "00" * 32, signed, timestamp=2000, bits=bits).hash == block.hash
+    # Dropping a transaction changes the merkle root and so the hash
+    fewer = Block(1, "00" * 32, payments(2), timestamp=2000, bits=bits)
+    assert fewer.merkle_root != block.merkle_root and fewer.hash != block.hash
+
+    rebuilt = Block.from_dict(block.to_dict())
+    assert rebuilt.hash == block.hash and rebuilt.header_bytes() == block.header_bytes()
+
+
+def test_legacy_json_hashed_blocks_still_validate():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    block = Block(1, blockchain.chain[-1].hash, [Transaction("0", "miner", 5.0)], version=LEGACY_BLOCK_VERSION)
+    result = proof_of_work(block, difficulty=1)
+    block.hash = result['hash']
+    assert block.hash.startswith("0") and is_valid_proof(block, difficulty=1)
+    assert Block.from_dict(block.to_dict()).hash == block.hash
+
+    assert blockchain.connect_block(block)
+    assert blockchain.is_chain_valid()
+    block.update(nonce=block.nonce + 1)
+    assert not blockchain.is_chain_valid()
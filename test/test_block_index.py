@@ -0,0 +1,178 @@
+import shutil
+
+from blockchain.blockchain import Blockchain, BLOCK_REWARD
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from mining.proof_of_work import proof_of_work, POW_LIMIT_BITS
+from wallet.key import SCHEME_ED25519
+from wallet.wallet import Wallet
+
+
+def make_peers(tmp_path, wallet, count):
+    """Blockchains sharing the same genesis block, as after an initial sync."""
+    genesis_db = str(tmp_path / "genesis.db")
+    Blockchain(difficulty=1, miner_address=wallet.address, utxo_db=genesis_db).utxo_set.close()
+    peers = []
+    for i in range(count):
+        shutil.copy(genesis_db, tmp_path / f"peer{i}.db")
+        peers.append(Blockchain(difficulty=1, retarget_interval=10**6, utxo_db=str(tmp_path / f"peer{i}.db")))
+    return peers
+
+
+def mine(blockchain, wallet, receiver, count):
+    blocks = []
+    for _ in range(count):
+        tx = Transaction(wallet.address, receiver, 1.0, fee=0.1)
+        wallet.sign_transaction(tx)
+        assert blockchain.add_transaction(tx)
+        blocks.append(blockchain.mine_block(receiver))
+    return blocks
+
+
+def mine_block_of(blockchain, transactions):
+    """A block on the tip holding exactly the given transactions."""
+    block = Block(index=len(blockchain.chain), previous_hash=blockchain.chain[-1].hash,
+                  transactions=transactions, bits=blockchain.get_next_bits())
+    block.hash = proof_of_work(block, workers=1)['hash']
+    return block
+
+
+def test_branch_with_most_work_becomes_the_chain(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    ours, theirs = make_peers(tmp_path, wallet, 2)
+    our_blocks = mine(ours, wallet, "alice", 2)
+    their_blocks = mine(theirs, wallet, "bob", 3)
+
+    # Equal work keeps the tip seen first, but the side branch is indexed
+    assert ours.add_received_block(their_blocks[0].to_dict())
+    assert ours.add_received_block(their_blocks[1].to_dict())
+    assert ours.chain[-1].hash == our_blocks[-1].hash
+    assert ours.get_block_by_hash(their_blocks[1].hash).hash == their_blocks[1].hash
+    assert ours.block_index.get(their_blocks[1].hash).height == 2
+
+    assert ours.add_received_block(their_blocks[2].to_dict())
+    assert [block.hash for block in ours.chain] == [block.hash for block in theirs.chain]
+    assert ours.get_block_by_height(3).hash == their_blocks[2].hash
+    assert ours.get_balance("bob") == theirs.get_balance("bob")
+    assert ours.get_balance("alice") == 0.0
+    # The abandoned branch stays indexed and its payments are pending again
+    assert ours.get_block_by_hash(our_blocks[1].hash) is not None
+    assert len(ours.mempool) == 2
+    assert not ours.add_received_block(their_blocks[2].to_dict())  # Already known
+
+
+def test_orphans_wait_for_their_parent(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    ours, theirs = make_peers(tmp_path, wallet, 2)
+    their_blocks = mine(theirs, wallet, "bob", 3)
+
+    assert not ours.add_received_block(their_blocks[2].to_dict())
+    assert not ours.add_received_block(their_blocks[1].to_dict())
+    assert len(ours.block_index.orphans) == 2
+    assert ours.add_received_block(their_blocks[0].to_dict())
+    assert [block.hash for block in ours.chain] == [block.hash for block in theirs.chain]
+    assert not ours.block_index.orphans
+
+    tampered = dict(their_blocks[2].to_dict(), nonce=their_blocks[2].nonce + 1)
+    assert not ours.add_received_block(tampered)
+
+
+def test_orphans_need_proof_of_work_at_a_plausible_target(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    ours, theirs = make_peers(tmp_path, wallet, 2)
+    real = mine(theirs, wallet, "bob", 2)[1]
+
+    unknown_parent = "ab" * 32
+    unmined = Block(5, unknown_parent, [Transaction("0", "spammer", 5.0)], bits=ours.get_next_bits())
+    while unmined.hash.startswith("0"):
+        unmined.update(nonce=unmined.nonce + 1)
+        unmined.update(hash=unmined.calculate_hash())
+    trivial = Block(5, unknown_parent, [Transaction("0", "spammer", 5.0)], bits=POW_LIMIT_BITS)
+    trivial.hash = proof_of_work(trivial, workers=1)['hash']
+    for block in (unmined, trivial):
+        assert not ours.add_received_block(block.to_dict())
+    assert not ours.block_index.orphans
+
+    assert not ours.add_received_block(real.to_dict())
+    assert list(ours.block_index.orphans) == [real.hash]
+
+
+def test_blocks_must_claim_one_bounded_reward_first(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    ours, = make_peers(tmp_path, wallet, 1)
+    payment = Transaction(wallet.address, "bob", 1.0, fee=0.5)
+    wallet.sign_transaction(payment)
+
+    invalid = [
+        [Transaction("0", "evil", 1e9, timestamp=1), Transaction("0", "evil", 1e9, timestamp=2)],
+        [Transaction("0", "evil", BLOCK_REWARD, timestamp=1), Transaction("0", "evil", BLOCK_REWARD, timestamp=2)],
+        [Transaction("0", "evil", BLOCK_REWARD + 0.6), payment],
+        [payment, Transaction("0", "evil", BLOCK_REWARD)],
+        [payment],
+    ]
+    for transactions in invalid:
+        assert not ours.add_received_block(mine_block_of(ours, transactions).to_dict())
+        assert len(ours.chain) == 1 and ours.get_balance("evil") == 0.0
+
+    assert ours.add_received_block(mine_block_of(ours, [Transaction("0", "miner", BLOCK_REWARD + 0.5),
+                                                        payment]).to_dict())
+    assert ours.get_balance("miner") == BLOCK_REWARD + 0.5
+
+
+def test_block_repeating_its_last_transaction_is_rejected(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    ours, theirs = make_peers(tmp_path, wallet, 2)
+    mine(ours, wallet, "alice", 1)
+    payments = [Transaction(wallet.address, receiver, 1.0, fee=0.1) for receiver in ("bob", "carol")]
+    for tx in payments:
+        wallet.sign_transaction(tx)
+    block = mine_block_of(theirs, [Transaction("0", "miner", BLOCK_REWARD + 0.2)] + payments)
+
+    # Same merkle root and so the same hash, but carol would be paid twice. With
+    # equal work it would only be indexed on a side branch, taking the honest block's place
+    malleated = block.to_dict()
+    malleated['transactions'] = malleated['transactions'] + malleated['transactions'][-1:]
+    assert Block.from_dict(malleated).hash == block.hash
+    assert not ours.add_received_block(malleated)
+    assert ours.get_block_by_hash(block.hash) is None
+
+    assert ours.add_received_block(block.to_dict())
+    assert len(ours.get_block_by_hash(block.hash).transactions) == 3
+
+
+def test_failed_reorg_forgets_the_bad_branch_and_restores_the_mempool():
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    blockchain = Blockchain(difficulty=1, miner_address=wallet.address, retarget_interval=10**6)
+    genesis, genesis_output = blockchain.chain[0], (blockchain.chain[0].transactions[0].tx_id, 0)
+
+    def signed_spend(receiver):
+        tx = Transaction(wallet.address, receiver, 10.0, fee=0.5, inputs=[genesis_output],
+                         outputs=[(receiver, 10.0), (wallet.address, 39.5)])
+        wallet.sign_transaction(tx)
+        return tx
+
+    def mined(index, previous_hash, transactions):
+        block = Block(index, previous_hash, [Transaction("0", "miner", BLOCK_REWARD)] + transactions,
+                      bits=blockchain.get_next_bits())
+        block.hash = proof_of_work(block, workers=1)['hash']
+        return block
+
+    # Branch B: a valid block spending the genesis output, then one spending funds nobody has
+    overspend = Transaction(wallet.address, "bob", 1000.0)
+    wallet.sign_transaction(overspend)
+    b1 = mined(1, genesis.hash, [signed_spend("carol")])
+    b2 = mined(2, b1.hash, [overspend])
+    b3 = mined(3, b2.hash, [])
+    a1 = mined(1, genesis.hash, [])
+    assert blockchain.connect_block(a1) and blockchain.connect_block(mined(2, a1.hash, []))
+    pending = signed_spend("bob")
+    assert blockchain.add_transaction(pending)
+    chain = [block.hash for block in blockchain.chain]
+
+    assert blockchain.add_received_block(b1.to_dict()) and blockchain.add_received_block(b2.to_dict())
+    # More work: the reorg connects b1, which evicts the pending spend, then fails on b2
+    assert not blockchain.add_received_block(b3.to_dict())
+    assert [block.hash for block in blockchain.chain] == chain
+    assert b1.hash in blockchain.block_index
+    assert b2.hash not in blockchain.block_index and b3.hash not in blockchain.block_index
+    assert pending in blockchain.mempool and blockchain.spent_index.spender(genesis_output) == pending.tx_id
@@ -0,0 +1,156 @@
+import threading
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from blockchain.utxo import UTXO
+from blockchain.concurrency import ReadWriteLock
+
+SENDERS = 4
+OUTPUTS_PER_SENDER = 40
+SUBMITTERS_PER_SENDER = 3
+FEE = 0.1
+
+
+def make_chain():
+    blockchain = Blockchain(difficulty=1, miner_address="genesis", retarget_interval=10**6)
+    for s in range(SENDERS):
+        for i in range(OUTPUTS_PER_SENDER):
+            blockchain.utxo_set.add_utxo(UTXO(f"funding{s}", i, 1.0, f"sender{s}"))
+    return blockchain
+
+
+def test_concurrent_submitters_miners_and_readers():
+    """Competing submitters, a miner and balance readers must not lose or duplicate spends."""
+    blockchain = make_chain()
+    total_supply = sum(blockchain.utxo_set.get_balance(a) for a in list(blockchain.utxo_set.addresses))
+    accepted = []
+    accepted_lock = threading.Lock()
+    errors = []
+    done = threading.Event()
+
+    def submit(sender_index, submitter_index):
+        sender = f"sender{sender_index}"
+        try:
+            # Every submitter of a sender tries to spend every one of its outpoints
+            for i in range(OUTPUTS_PER_SENDER):
+                tx = Transaction(sender, f"receiver{sender_index}_{submitter_index}", 1.0 - FEE,
+                                 fee=FEE, inputs=[(f"funding{sender_index}", i)])
+                # Unsigned on purpose: the test exercises locking only
+                if blockchain.add_transaction(tx, check_signature=False):
+                    with accepted_lock:
+                        accepted.append(tx)
+        except Exception as e:
+            errors.append(e)
+
+    def mine():
+        try:
+            while not done.is_set():
+                blockchain.mine_block("miner")
+        except Exception as e:
+            errors.append(e)
+
+    def read_balances():
+        try:
+            while not done.is_set():
+                for s in range(SENDERS):
+                    balance = blockchain.get_balance(f"sender{s}")
+                    assert 0.0 <= balance <= OUTPUTS_PER_SENDER
+        except Exception as e:
+            errors.append(e)
+
+    submitters = [threading.Thread(target=submit, args=(s, k))
+                  for s in range(SENDERS) for k in range(SUBMITTERS_PER_SENDER)]
+    background = [threading.Thread(target=mine)] + [threading.Thread(target=read_balances) for _ in range(2)]
+    for thread in background + submitters:
+        thread.start()
+    for thread in submitters:
+        thread.join()
+    done.set()
+    for thread in background:
+        thread.join()
+
+    # Mine whatever is still pending
+    while len(blockchain.mempool):
+        blockchain.mine_block("miner")
+
+    assert not errors
+    # Each outpoint was accepted exactly once across the competing submitters
+    assert len(accepted) == SENDERS * OUTPUTS_PER_SENDER
+    spent = [tx.inputs[0] for tx in accepted]
+    assert len(set(spent)) == len(spent)
+
+    confirmed = {tx.tx_id for block in blockchain.chain[1:] for tx in block.transactions[1:]}
+    assert confirmed == {tx.tx_id for tx in accepted}
+    assert not blockchain.spent_index.mempool
+    assert len(blockchain.template_builder) == 0
+
+    # Nothing was lost or created: receivers got the amounts, the miner the fees and rewards
+    for s in range(SENDERS):
+        assert blockchain.get_balance(f"sender{s}") == 0.0
+    received = sum(blockchain.get_balance(f"receiver{s}_{k}")
+                   for s in range(SENDERS) for k in range(SUBMITTERS_PER_SENDER))
+    assert abs(received - len(accepted) * (1.0 - FEE)) < 1e-6
+    rewards = sum(block.transactions[0].amount for block in blockchain.chain[1:])
+    balances = sum(blockchain.utxo_set.get_balance(a) for a in list(blockchain.utxo_set.addresses))
+    assert abs(balances - (total_supply + rewards - len(accepted) * FEE)) < 1e-6
+    assert blockchain.get_balance("miner") == rewards
+    assert blockchain.is_chain_valid()
+
+
+def test_read_write_lock_allows_parallel_readers():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=5)
+
+    def reader():
+        with lock.read_lock():
+            inside.wait()  # Only passes if all three readers hold the lock together
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    assert not inside.broken
+
+
+def test_read_write_lock_is_reentrant_for_writer():
+    lock = ReadWriteLock()
+    with lock.write_lock():
+        with lock.write_lock():
+            with lock.read_lock():
+                pass
+    with lock.read_lock():
+        with lock.read_lock():
+            pass
+    # Fully released: another thread can take the write lock
+    acquired = []
+    thread = threading.Thread(target=lambda: (lock.acquire_write(), acquired.append(True), lock.release_write()))
+    thread.start()
+    thread.join(timeout=5)
+    assert acquired == [True]
+
+
+def test_signature_cache_skips_reverification_but_not_tampering():
+    from wallet.wallet import Wallet
+    wallet = Wallet()
+    blockchain = Blockchain(difficulty=1, miner_address=wallet.address, signature_cache_entries=2)
+    transactions = []
+    for i in range(3):
+        tx = Transaction(wallet.address, f"receiver{i}", 1.0)
+        wallet.sign_transaction(tx)
+        transactions.append(tx)
+
+    assert blockchain.verify_transactions(transactions[:2]) == [True, True]
+    assert blockchain.verify_transactions(transactions[:2]) == [True, True]
+    stats = blockchain.signature_cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 2, 2)
+
+    # Same tx_id and signature over a different amount must be checked, and fail
+    tampered = Transaction.from_dict(transactions[0].to_dict())
+    tampered.update(amount=2.0)
+    assert blockchain.verify_transactions([tampered]) == [False]
+
+    # Bounded: the least recently used entry makes room
+    assert blockchain.verify_transactions(transactions[2:]) == [True]
+    stats = blockchain.signature_cache.get_stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from mining.cancellation import CancellationToken
+from mining.miner import Miner
+from mining.proof_of_work import proof_of_work, target_to_bits
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def hard_chain():
+    """A chain whose next block would take far longer to mine than any test."""
+    blockchain = Blockchain(difficulty=12, miner_address="miner", retarget_interval=10**6)
+    assert blockchain.add_transaction(Transaction("miner", "bob", 1.0, fee=0.1), check_signature=False)
+    return blockchain
+
+
+def test_cancelled_search_stops_and_reports_its_hashes():
+    block = Block(1, "00" * 32, [Transaction("0", "miner", 5.0)], bits=target_to_bits(1 << 180))
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel, args=("test",)).start()
+    start = time.time()
+    assert proof_of_work(block, workers=1, cancel_token=token) is None
+    assert time.time() - start < 5
+    assert token.reason == "test" and token.hashes_done > 0
+    assert not token.cancel("again")  # Only the first reason is kept
+
+
+def test_new_tip_cancels_mining_on_the_old_one(monkeypatch):
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    assert blockchain.add_transaction(Transaction("miner", "bob", 1.0, fee=0.1), check_signature=False)
+    # Only the template being searched gets an unreachable target; the competing block is easy
+    monkeypatch.setattr(blockchain, "get_next_bits", lambda *args: target_to_bits(1 << 180))
+    token = CancellationToken()
+    result = []
+    miner = threading.Thread(target=lambda: result.append(blockchain.mine_block("miner", workers=1,
+                                                                                cancel_token=token)))
+    miner.start()
+    wait_for(lambda: token in blockchain._mining_tokens)
+    monkeypatch.undo()
+
+    competing = Block(1, blockchain.chain[-1].hash, [Transaction("0", "other miner", 5.0)],
+                      bits=blockchain.get_next_bits())
+    competing.hash = proof_of_work(competing, workers=1)['hash']
+    assert blockchain.connect_block(competing)
+    miner.join(timeout=10)
+    assert result == [None] and token.reason == "new_tip"
+    assert not blockchain._mining_tokens
+
+
+def test_miner_rebuilds_its_template_when_the_mempool_improves():
+    blockchain = hard_chain()
+    miner = Miner("miner", blockchain, workers=1)
+    miner.start_mining()
+    try:
+        wait_for(lambda: miner.current_token in blockchain._mining_tokens)
+        first = miner.current_token
+        # The template held the whole mempool, so any new transaction improves it
+        assert blockchain.add_transaction(Transaction("miner", "carol", 1.0, fee=0.01), check_signature=False)
+        wait_for(lambda: miner.current_token is not None and miner.current_token is not first)
+        second = miner.current_token
+    finally:
+        miner.stop_mining()
+        miner.mining_thread.join(timeout=10)
+
+    assert first.reason == "mempool"
+    metrics = miner.get_metrics()
+    assert metrics['templates_cancelled'] >= 1 and metrics['cancel_reasons']['mempool'] >= 1
+    # Latency runs from the cancellation until the rebuilt template's search started
+    assert second.started_at > first.cancelled_at
+    assert miner.restart_latencies[0] == second.started_at - first.cancelled_at
+    assert metrics['wasted_hashes'] > 0 and metrics['restart_latency_max_ms'] > 0
@@ -0,0 +1,36 @@
+from wallet.key import key_scheme, sign_data, verify_data, SCHEME_ED25519
+from wallet.key_pool import KeyPool
+from wallet.wallet import Wallet
+
+
+def test_pool_refills_as_keys_are_handed_out():
+    with KeyPool(target=4, scheme=SCHEME_ED25519, workers=2, batch_size=2) as pool:
+        assert pool.wait_until_ready(timeout=30) and len(pool) == 4
+        private_key, public_key = pool.get()
+        assert key_scheme(private_key) == SCHEME_ED25519
+        assert verify_data(public_key, sign_data(private_key, b"data"), b"data")
+
+        assert pool.wait_until_ready(timeout=30)
+        wallets = [Wallet(key_pool=pool) for _ in range(3)]
+        assert len({wallet.address for wallet in wallets}) == 3
+        assert all(wallet.scheme == SCHEME_ED25519 for wallet in wallets)
+        assert len(pool.take(6)) == 6
+        assert pool.wait_until_ready(timeout=30) and len(pool) == 4
+        assert pool.handed_out == 10 and pool.generated_inline == 0
+
+
+def test_closed_pool_stops_generating_but_still_hands_out_keys():
+    pool = KeyPool(target=2, scheme=SCHEME_ED25519, workers=1)
+    pool.wait_until_ready(timeout=30)
+    pool.close()
+    assert pool._executor is None
+    pool.get()
+    pool.get()
+    assert len(pool) == 0 and pool._in_flight == 0
+    # Dry and closed: keys are generated in the caller instead
+    private_key, _ = pool.get()
+    assert key_scheme(private_key) == SCHEME_ED25519 and pool.generated_inline == 1
+    assert pool._executor is None and not pool.wait_until_ready(timeout=0.1)
+    key_pairs = pool.take(3)
+    assert len(key_pairs) == 3 and all(key_scheme(private_key) == SCHEME_ED25519 for private_key, _ in key_pairs)
+    assert pool._executor is None and pool.generated_inline == 4
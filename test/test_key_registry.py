@@ -0,0 +1,45 @@
+from blockchain.transaction import Transaction
+from wallet.key import (PublicKeyRegistry, generate_key_pair, serialize_public_key, pem_to_address,
+                        public_key_registry, SCHEME_ED25519)
+from wallet.wallet import Wallet
+
+
+def key_with_address():
+    _, public_key = generate_key_pair(SCHEME_ED25519)
+    pem = serialize_public_key(public_key)
+    return pem_to_address(pem), pem
+
+
+def test_resolve_parses_each_key_once_and_checks_its_address():
+    registry = PublicKeyRegistry()
+    address, pem = key_with_address()
+    other_address, other_pem = key_with_address()
+
+    key = registry.resolve(address, pem)
+    assert key is not None and registry.resolve(address, pem) is key and registry.get(address) is key
+    assert registry.get_stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'evictions': 0}
+    # A key only resolves for the address it hashes to
+    assert registry.resolve(address, other_pem) is None
+    assert registry.resolve(other_address, pem) is None
+    assert registry.get(address) is key and other_address not in registry
+
+
+def test_registry_is_bounded_and_evicts_the_least_recently_used():
+    registry = PublicKeyRegistry(max_entries=3)
+    keys = [key_with_address() for _ in range(4)]
+    for address, pem in keys[:3]:
+        registry.resolve(address, pem)
+    registry.resolve(*keys[0])  # Most recently used now
+    registry.resolve(*keys[3])
+    assert len(registry) == 3 and registry.get_stats()['evictions'] == 1
+    assert keys[1][0] not in registry and keys[0][0] in registry and keys[3][0] in registry
+
+
+def test_verification_resolves_sender_keys_through_the_registry():
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    tx = Transaction(wallet.address, "bob", 1.0)
+    wallet.sign_transaction(tx)
+    before = public_key_registry.get_stats()['hits']
+    assert tx.verify_signature()
+    assert public_key_registry.get_stats()['hits'] == before + 1
+    assert public_key_registry.get(wallet.address) is wallet.public_key
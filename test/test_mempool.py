@@ -0,0 +1,183 @@
+import sys
+
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block
+from blockchain.mempool import Mempool, ENTRY_INDEX_OVERHEAD, _deep_sizeof
+from blockchain.transaction import Transaction
+from mining.proof_of_work import proof_of_work
+from wallet.key import SCHEME_ED25519
+from wallet.wallet import Wallet
+
+
+def test_entry_memory_includes_cached_encodings():
+    mempool = Mempool()
+    tx = Transaction("alice", "bob", 1.0, fee=0.1, inputs=[("ab" * 32, 0)], outputs=[("bob", 1.0), ("alice", 2.0)])
+    assert mempool.add(tx.seal())
+    entry = mempool.entries[tx.tx_id]
+
+    # Relaying, mining and signature checks fill the caches after admission
+    tx.to_dict(), tx.to_json(), tx.transaction_data(), tx.fee_rate()
+    assert entry.memory == _deep_sizeof(tx, set()) + sys.getsizeof(entry) + ENTRY_INDEX_OVERHEAD
+    assert mempool.get_stats()['memory'] == entry.memory
+
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def add_transaction(self, transaction):
+        self.events.append(("add", transaction.tx_id))
+
+    def remove_transaction(self, tx_id):
+        self.events.append(("remove", tx_id))
+
+
+def test_indexes_follow_additions_and_removals():
+    mempool = Mempool()
+    recorder = Recorder()
+    mempool.add_listener(recorder)
+    transactions = [Transaction(f"sender{i % 3}", f"receiver{i}", 1.0, fee=(i * 7 % 10) / 100, timestamp=1000 + i)
+                    for i in range(30)]
+    for tx in transactions:
+        assert mempool.add(tx)
+    assert not mempool.add(transactions[0])
+    assert len(mempool) == 30 and list(mempool) == transactions
+    assert mempool.get(transactions[4].tx_id) is transactions[4] and mempool.get("unknown") is None
+    assert mempool.get_by_sender("sender1") == transactions[1::3]
+
+    cheapest = min(transactions, key=lambda tx: (tx.fee_rate(), transactions.index(tx)))
+    assert mempool.lowest_fee_entry().transaction is cheapest
+    removed = mempool.remove_many([cheapest.tx_id, "unknown"] + [tx.tx_id for tx in transactions[20:]])
+    assert len(removed) == 11 and cheapest not in mempool
+    assert mempool.lowest_fee_entry().fee_rate == min(tx.fee_rate() for tx in mempool)
+    assert mempool.get_by_sender("sender2") == [tx for tx in transactions[2:20:3] if tx is not cheapest]
+
+    mempool.remove_many([tx.tx_id for tx in transactions])
+    stats = mempool.get_stats()
+    assert (stats['transactions'], stats['bytes'], stats['memory']) == (0, 0, 0)
+    assert not mempool.by_sender and not mempool.children and mempool.lowest_fee_entry() is None
+    assert recorder.events.count(("add", transactions[0].tx_id)) == 1
+    assert len([event for event in recorder.events if event[0] == "remove"]) == 30
+
+
+def make_package():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    genesis_output = (blockchain.chain[0].transactions[0].tx_id, 0)
+    parent = Transaction("miner", "alice", 20.0, fee=0.1, inputs=[genesis_output],
+                         outputs=[("alice", 20.0), ("miner", 29.9)])
+    child = Transaction("alice", "bob", 19.0, fee=0.5, inputs=[(parent.tx_id, 0)],
+                        outputs=[("bob", 19.0), ("alice", 0.5)])
+    assert blockchain.add_transaction(parent, check_signature=False)
+    assert blockchain.add_transaction(child, check_signature=False)
+    return blockchain, genesis_output, parent, child
+
+
+def test_child_of_pending_transaction_is_mined_after_its_parent():
+    blockchain, _, parent, child = make_package()
+    assert blockchain.mempool.children[parent.tx_id] == {child.tx_id}
+    # Pending outputs are valued and can only be spent once
+    overspend = Transaction("alice", "carol", 25.0, inputs=[(parent.tx_id, 0)], outputs=[("carol", 25.0)])
+    conflict = Transaction("alice", "carol", 5.0, inputs=[(parent.tx_id, 0)], outputs=[("carol", 5.0)])
+    not_owned = Transaction("mallory", "carol", 5.0, inputs=[(parent.tx_id, 1)], outputs=[("carol", 5.0)])
+    for tx in (overspend, conflict, not_owned):
+        assert not blockchain.add_transaction(tx, check_signature=False)
+
+    block, selected = blockchain._create_block_template("miner")
+    assert [tx.tx_id for tx in selected] == [parent.tx_id, child.tx_id]
+    assert blockchain.mine_block("miner")
+    assert len(blockchain.mempool) == 0
+    assert blockchain.get_balance("bob") == 19.0 and blockchain.get_balance("alice") == 0.5
+
+
+def test_conflicting_block_evicts_the_whole_package():
+    blockchain, genesis_output, parent, child = make_package()
+    double_spend = Transaction("miner", "carol", 49.0, fee=1.0, inputs=[genesis_output], outputs=[("carol", 49.0)])
+    block = Block(index=1, previous_hash=blockchain.chain[-1].hash,
+                  transactions=[Transaction("0", "miner", 6.0), double_spend], bits=blockchain.get_next_bits())
+    block.hash = proof_of_work(block, workers=1)['hash']
+    assert blockchain.connect_block(block)
+    assert parent not in blockchain.mempool and child not in blockchain.mempool
+    assert len(blockchain.mempool) == 0 and not blockchain.mempool.children
+
+
+def test_block_spending_implicitly_evicts_pending_claims_on_the_same_outputs():
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    blockchain = Blockchain(difficulty=1, miner_address=wallet.address, retarget_interval=10**6)
+    genesis_output = (blockchain.chain[0].transactions[0].tx_id, 0)
+    implicit = Transaction(wallet.address, "bob", 30.0, fee=1.0)
+    explicit = Transaction(wallet.address, "carol", 10.0, fee=0.1, inputs=[genesis_output],
+                           outputs=[("carol", 10.0), (wallet.address, 39.9)])
+    for tx in (implicit, explicit):
+        wallet.sign_transaction(tx)
+        assert blockchain.add_transaction(tx)
+
+    # The better-paying implicit transaction takes the genesis output first
+    block = blockchain.mine_block("miner")
+    assert [tx.tx_id for tx in block.transactions[1:]] == [implicit.tx_id]
+    assert explicit not in blockchain.mempool and len(blockchain.spent_index) == 0
+    assert blockchain.get_missing_inputs(explicit) == [genesis_output]
+
+
+def chain_of(count, fee):
+    """A pending parent and `count - 1` descendants, each spending its parent's output 0."""
+    # Fixed timestamps give every transaction the same size, hence the same fee rate
+    transactions = [Transaction("alice", "alice", 10.0, fee=fee, timestamp=1000, inputs=[("ab" * 32, 0)],
+                                outputs=[("alice", 10.0)])]
+    for i in range(count - 1):
+        parent = transactions[-1]
+        transactions.append(Transaction("alice", "alice", 10.0, fee=fee, timestamp=1001 + i,
+                                        inputs=[(parent.tx_id, 0)], outputs=[("alice", 10.0)]))
+    return transactions
+
+
+def test_memory_limit_evicts_cheapest_packages_and_raises_the_fee_floor():
+    payments = [Transaction(f"sender{i}", "bob", 1.0, fee=0.01 * (i + 1), timestamp=1000 + i) for i in range(8)]
+    package = chain_of(3, fee=0.001)
+    probe = Mempool()
+    for tx in payments + package:
+        probe.add(tx)
+    mempool = Mempool(max_bytes=probe.total_memory - 1, fee_halflife=3600)
+
+    for tx in package + payments:
+        assert mempool.add(tx)
+    assert mempool.get_descendants(package[0].tx_id) == [tx.tx_id for tx in package[1:]]
+    # Over budget by one byte: the cheapest entry goes, and everything spending it
+    evicted = mempool.trim_to_size()
+    assert evicted == package
+    assert mempool.total_memory <= mempool.max_bytes and len(mempool) == 8
+    assert mempool.get_min_fee_rate() > package[0].fee_rate()
+    assert mempool.get_stats()['evicted'] == 3
+
+    # Without further pressure the floor halves every fee_halflife
+    floor = mempool.get_min_fee_rate()
+    mempool._last_fee_update -= 3600
+    assert mempool.get_min_fee_rate() < floor / 2
+
+
+def test_full_mempool_rejects_transactions_below_the_floor():
+    # Room for about three entries
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6, max_mempool_bytes=10000)
+    for i in range(10):
+        assert blockchain.add_transaction(Transaction("miner", f"receiver{i}", 1.0, fee=0.001 * (i + 1)),
+                                          check_signature=False)
+    assert 0 < len(blockchain.mempool) < 10 and blockchain.mempool.total_memory <= 10000
+    assert [tx.receiver for tx in blockchain.mempool] == [f"receiver{i}" for i in range(10 - len(blockchain.mempool), 10)]
+
+    assert blockchain.mempool.get_min_fee_rate() > 0
+    assert not blockchain.add_transaction(Transaction("miner", "cheap", 1.0, fee=0.0005), check_signature=False)
+    assert blockchain.add_transaction(Transaction("miner", "generous", 1.0, fee=1.0), check_signature=False)
+
+
+def test_expiry_drops_old_transactions_with_their_descendants():
+    mempool = Mempool(expiry=3600)
+    now = 100000.0
+    old_package = chain_of(2, fee=0.01)
+    mempool.add(old_package[0], added_at=now - 7200)
+    mempool.add(old_package[1], added_at=now)  # Recent, but spends an expired parent
+    recent = Transaction("bob", "carol", 1.0, fee=0.01)
+    mempool.add(recent, added_at=now - 60)
+
+    assert mempool.expire(now=now) == old_package
+    assert list(mempool) == [recent] and mempool.get_stats()['expired'] == 2
+    assert mempool.expire(now=now) == []
@@ -0,0 +1,54 @@
+import os
+
+from blockchain.transaction import Transaction
+from storage.mempool_file import MempoolFile, FILE_HEADER, RECORD_HEADER
+from wallet.key import SIGNATURE_SCHEMES
+from wallet.wallet import Wallet
+
+
+def pending_transactions():
+    transactions = []
+    for i, scheme in enumerate(SIGNATURE_SCHEMES):
+        wallet = Wallet(scheme=scheme)
+        tx = Transaction(wallet.address, f"receiver{i}", 1.5 + i, fee=0.01)
+        wallet.sign_transaction(tx)
+        transactions.append(tx)
+    transactions.append(Transaction("sender", "récepteur", 3, timestamp=1700000000, fee=0))
+    transactions.append(Transaction("sender", "bob", 2.5, fee=0.25, inputs=[("ab" * 32, 1), ("cd" * 32, 0)],
+                                    outputs=[("bob", 2.5), ("sender", 7.25)]))
+    return [(tx, 1700000000.5 + i) for i, tx in enumerate(transactions)]
+
+
+def test_round_trip_keeps_transactions_and_signatures(tmp_path):
+    file_name = str(tmp_path / "mempool.dat")
+    entries = pending_transactions()
+    assert MempoolFile.save(entries, file_name) == len(entries)
+    assert not os.path.exists(file_name + ".tmp")
+
+    loaded = list(MempoolFile.load(file_name))
+    assert len(loaded) == len(entries)
+    for (original, added_at), (restored, restored_at) in zip(entries, loaded):
+        assert restored.to_dict() == original.to_dict() and restored_at == added_at
+        assert restored.has_valid_id()
+        assert type(restored.amount) is type(original.amount)
+    for restored, _ in loaded[:len(SIGNATURE_SCHEMES)]:
+        assert restored.verify_signature()
+
+
+def test_corrupted_records_are_skipped_and_truncation_ends_the_stream(tmp_path):
+    file_name = str(tmp_path / "mempool.dat")
+    entries = pending_transactions()
+    MempoolFile.save(entries, file_name)
+    data = bytearray(open(file_name, 'rb').read())
+
+    # Flip a byte inside the first record's payload: its checksum no longer matches
+    data[FILE_HEADER.size + RECORD_HEADER.size + 5] ^= 0xFF
+    open(file_name, 'wb').write(bytes(data))
+    assert [tx.tx_id for tx, _ in MempoolFile.load(file_name)] == [tx.tx_id for tx, _ in entries[1:]]
+
+    open(file_name, 'wb').write(bytes(data[:-3]))
+    assert [tx.tx_id for tx, _ in MempoolFile.load(file_name)] == [tx.tx_id for tx, _ in entries[1:-1]]
+
+    open(file_name, 'wb').write(b"XXXX" + bytes(data[4:]))
+    assert list(MempoolFile.load(file_name)) == []
+    assert list(MempoolFile.load(str(tmp_path / "missing.dat"))) == []
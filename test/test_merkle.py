@@ -0,0 +1,63 @@
+import hashlib
+
+from blockchain.block import Block
+from blockchain.merkle import MerkleTree, verify_proof
+from blockchain.transaction import Transaction
+
+
+def tx_ids(count, tag="tx"):
+    return [hashlib.sha256(f"{tag}{i}".encode()).hexdigest() for i in range(count)]
+
+
+def test_incremental_updates_match_rebuilding():
+    ids = tx_ids(37)
+    tree = MerkleTree()
+    for size, tx_id in enumerate(ids, 1):
+        tree.append(tx_id)
+        assert tree.root_hex == MerkleTree(ids[:size]).root_hex
+    assert len(tree) == 37
+
+    for index, tx_id in zip((0, 17, 36), tx_ids(3, tag="replacement")):
+        ids[index] = tx_id
+        tree.replace(index, tx_id)
+        assert tree.root_hex == MerkleTree(ids).root_hex
+    assert MerkleTree().root_hex == MerkleTree([]).root_hex
+
+
+def test_proofs_verify_against_the_root_only():
+    for count in (1, 2, 5, 16, 33):
+        ids = tx_ids(count)
+        tree = MerkleTree(ids)
+        for tx_id in ids:
+            proof = tree.get_proof(tx_id)
+            assert len(proof) == len(tree.levels) - 1
+            assert verify_proof(tx_id, proof, tree.root_hex)
+        other = tx_ids(1, tag="other")[0]
+        assert tree.get_proof(other) is None and not verify_proof(other, None, tree.root_hex)
+        if count > 1:
+            # A proof is only good for its own leaf
+            assert not verify_proof(ids[0], tree.get_proof(ids[1]), tree.root_hex)
+
+
+def test_internal_nodes_cannot_be_proven_as_transactions():
+    tree = MerkleTree(tx_ids(4))
+    left, right = tree.levels[1]
+    # Pairing the two internal nodes gives the root, but not when read as a leaf
+    assert not verify_proof(left.hex(), [(right.hex(), 'right')], tree.root_hex)
+    assert not verify_proof(right.hex(), [(left.hex(), 'left')], tree.root_hex)
+    assert MerkleTree([tx_ids(1)[0]]).root_hex != tx_ids(1)[0]
+
+
+def test_block_keeps_its_root_and_proofs_current():
+    transactions = [Transaction(f"sender{i}", f"receiver{i}", 1.0, timestamp=1000 + i) for i in range(4)]
+    block = Block(1, "00" * 32, transactions[:3])
+    block.add_transaction(transactions[3])
+    assert block.merkle_root == block.calculate_merkle_root() == Block(1, "00" * 32, transactions).merkle_root
+    assert block.hash == block.calculate_hash()
+
+    reward = Transaction("0", "miner", 5.0, timestamp=999)
+    block.replace_transaction(0, reward)
+    assert block.has_valid_merkle_root()
+    proof = block.get_proof(reward.tx_id)
+    assert block.verify_transaction_proof(reward.tx_id, proof)
+    assert block.get_proof(transactions[0].tx_id) is None
@@ -0,0 +1,45 @@
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from mining.proof_of_work import (MidstateMiner, proof_of_work, is_valid_proof, meets_target,
+                                  difficulty_to_bits)
+
+
+def make_block(bits=difficulty_to_bits(2)):
+    transactions = [Transaction(f"sender{i}", f"receiver{i}", i + 1.0, timestamp=1000 + i) for i in range(5)]
+    return Block(7, "11" * 32, transactions, timestamp=5000, bits=bits)
+
+
+def first_valid_nonce(block):
+    """The per-nonce loop the midstate engine replaces."""
+    for nonce in range(1 << 20):
+        block.update(nonce=nonce)
+        block_hash = block.calculate_hash()
+        if meets_target(block_hash, block.bits):
+            return {'nonce': nonce, 'hash': block_hash}
+
+
+def test_midstate_search_matches_hashing_each_header():
+    expected = first_valid_nonce(make_block())
+    assert expected['nonce'] > 0
+
+    engine = MidstateMiner(make_block(), batch_size=64)
+    assert engine.scan(0, 1 << 20) == expected
+    assert engine.hashes_done >= expected['nonce'] + 1
+    assert MidstateMiner(make_block()).scan(0, expected['nonce']) is None
+
+    block = make_block()
+    assert proof_of_work(block, workers=1) == expected
+    block.hash = expected['hash']
+    assert block.nonce == expected['nonce'] and is_valid_proof(block, bits=block.bits)
+
+
+def test_parallel_search_matches_single_process_including_timestamp_rolls():
+    serial, parallel = make_block(), make_block()
+    # With 64 nonces per timestamp at 1 in 256 odds this block needs timestamp rolls
+    expected = proof_of_work(serial, workers=1, max_nonce=64)
+    assert proof_of_work(parallel, workers=3, max_nonce=64) == expected
+    assert serial.timestamp > 5000 and parallel.timestamp == serial.timestamp
+    assert parallel.nonce == serial.nonce < 64
+
+    wide_serial, wide_parallel = make_block(difficulty_to_bits(3)), make_block(difficulty_to_bits(3))
+    assert proof_of_work(wide_parallel, workers=4) == proof_of_work(wide_serial, workers=1)
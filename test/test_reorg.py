@@ -0,0 +1,92 @@
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from mining.proof_of_work import proof_of_work, meets_target, POW_LIMIT_BITS
+
+
+ADDRESSES = ("miner", "other miner", "bob", "carol")
+
+
+def snapshot(blockchain):
+    utxos = {(u.transaction_id, u.output_index, u.amount, u.owner_address)
+             for address in blockchain.utxo_set.addresses
+             for u in blockchain.utxo_set.get_utxos(address)}
+    return ([block.hash for block in blockchain.chain], utxos, dict(blockchain.spent_index.mempool),
+            {a: blockchain.address_index.count(a) for a in ADDRESSES})
+
+
+def mine_with_payment(blockchain, miner, receiver, amount):
+    tx = Transaction("miner", receiver, amount, fee=0.1)
+    assert blockchain.add_transaction(tx, check_signature=False)
+    return blockchain.mine_block(miner)
+
+
+def test_disconnect_restores_the_state_before_each_block():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    states = [snapshot(blockchain)]
+    for amount in (1.0, 2.0, 3.0):
+        assert mine_with_payment(blockchain, "miner", "bob", amount)
+        states.append(snapshot(blockchain))
+
+    while len(blockchain.chain) > 1:
+        states.pop()
+        assert blockchain.disconnect_block() is not None
+        assert snapshot(blockchain) == states[-1]
+    assert blockchain.disconnect_block() is None  # Genesis stays
+
+
+def test_reorganize_switches_branches_and_restores_on_failure():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    assert mine_with_payment(blockchain, "miner", "bob", 1.0)
+    fork_height = len(blockchain.chain) - 1
+    branch_a = [mine_with_payment(blockchain, "miner", "bob", 2.0),
+                mine_with_payment(blockchain, "miner", "bob", 3.0)]
+    state_a = snapshot(blockchain)
+
+    # Build a longer competing branch from the fork point
+    blockchain.disconnect_block()
+    blockchain.disconnect_block()
+    branch_b = [mine_with_payment(blockchain, "other miner", "carol", 4.0) for _ in range(3)]
+    state_b = snapshot(blockchain)
+
+    assert blockchain.reorganize(fork_height, branch_a, check_signatures=False)
+    assert snapshot(blockchain) == state_a
+    # Payments only confirmed on the abandoned branch are pending again
+    assert len(blockchain.mempool) == 3
+
+    assert blockchain.reorganize(fork_height, branch_b, check_signatures=False)
+    assert snapshot(blockchain) == state_b
+    assert blockchain.get_balance("carol") == 12.0
+
+    # A block that doesn't link to the branch is rejected and the chain left as it was
+    bad_branch = [branch_a[0], branch_b[2]]
+    assert not blockchain.reorganize(fork_height, bad_branch, check_signatures=False)
+    assert snapshot(blockchain) == state_b
+
+
+def unmined_block(blockchain, index, previous_hash, easier_bits=None):
+    """A block whose hash misses the expected target, claiming that target or meeting an easier one."""
+    expected = blockchain.get_next_bits(index)
+    block = Block(index, previous_hash, [Transaction("0", "miner", 5.0)], bits=easier_bits or expected)
+    while meets_target(block.hash, expected) or (easier_bits and not meets_target(block.hash, easier_bits)):
+        block.update(nonce=block.nonce + 1)
+        block.update(hash=block.calculate_hash())
+    return block
+
+
+def test_unmined_or_misplaced_blocks_are_not_connected():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    genesis = blockchain.chain[0]
+    mined = mine_with_payment(blockchain, "miner", "bob", 1.0)
+    state = snapshot(blockchain)
+
+    assert not blockchain.connect_block(unmined_block(blockchain, 2, mined.hash, easier_bits=POW_LIMIT_BITS))
+    assert not blockchain.connect_block(unmined_block(blockchain, 2, mined.hash))
+    misplaced = Block(5, mined.hash, [Transaction("0", "miner", 5.0)], bits=blockchain.get_next_bits())
+    misplaced.hash = proof_of_work(misplaced, workers=1)['hash']
+    assert not blockchain.connect_block(misplaced)
+    assert snapshot(blockchain) == state
+
+    # The reorg path connects through the same checks and restores the old branch
+    assert not blockchain.reorganize(0, [unmined_block(blockchain, 1, genesis.hash)], check_signatures=False)
+    assert snapshot(blockchain) == state and blockchain.is_chain_valid()
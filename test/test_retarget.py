@@ -0,0 +1,77 @@
+import time
+
+from blockchain.blockchain import Blockchain, MAX_RETARGET_FACTOR, MAX_FUTURE_BLOCK_TIME
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from mining.proof_of_work import (proof_of_work, bits_to_target, target_to_bits, difficulty_to_bits, meets_target,
+                                  MAX_TARGET, POW_LIMIT_BITS)
+
+
+def test_compact_bits_encoding():
+    assert bits_to_target(0x1d00ffff) == 0xffff << 208
+    assert bits_to_target(POW_LIMIT_BITS) == MAX_TARGET
+    for bits in (0x1d00ffff, 0x1b0404cb, 0x207fffff, 0x03123456, 0x02008000):
+        assert target_to_bits(bits_to_target(bits)) == bits
+    # The top mantissa bit is a sign bit, so such targets move up a byte
+    assert target_to_bits(0x80) == 0x02008000
+    # Encoding rounds the target down, never up
+    assert bits_to_target(target_to_bits(123456789)) <= 123456789
+    assert bits_to_target(difficulty_to_bits(1)) <= 16 ** 63 - 1
+
+    bits = target_to_bits(1 << 200)
+    assert meets_target(f"{1 << 200:064x}", bits)
+    assert not meets_target(f"{(1 << 200) + 1:064x}", bits)
+
+
+def chain_with_gaps(gap, interval=3, block_time=60):
+    """A chain whose blocks are `gap` seconds apart, one interval long."""
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=interval,
+                            target_block_time=block_time)
+    start = blockchain.chain[0].timestamp
+    for height in range(1, interval):
+        block = Block(height, blockchain.chain[-1].hash, [Transaction("0", "miner", 5.0, timestamp=start + height)],
+                      timestamp=start + height * gap, bits=blockchain.get_next_bits())
+        block.hash = proof_of_work(block, workers=1)['hash']
+        assert blockchain.connect_block(block)
+    return blockchain
+
+
+def test_target_follows_observed_block_times():
+    initial = bits_to_target(difficulty_to_bits(1))
+
+    on_time = chain_with_gaps(60)
+    assert bits_to_target(on_time.get_next_bits()) == bits_to_target(target_to_bits(initial))
+    # Twice as fast halves the target (twice the work per block)
+    fast = chain_with_gaps(30)
+    assert bits_to_target(fast.get_next_bits()) == bits_to_target(target_to_bits(initial // 2))
+    # Adjustments are clamped in both directions, and never past the easiest target
+    very_fast = chain_with_gaps(1)
+    assert bits_to_target(very_fast.get_next_bits()) == bits_to_target(target_to_bits(initial // MAX_RETARGET_FACTOR))
+    very_slow = chain_with_gaps(3600)
+    assert bits_to_target(very_slow.get_next_bits()) == min(initial * MAX_RETARGET_FACTOR, MAX_TARGET)
+
+    # Between retargets the target is carried over
+    assert on_time.get_next_bits(2) == on_time.chain[1].bits
+
+
+def test_block_timestamps_are_bounded_by_median_time_past_and_the_clock():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    start = blockchain.chain[0].timestamp
+
+    def block_at(timestamp):
+        block = Block(len(blockchain.chain), blockchain.chain[-1].hash, [Transaction("0", "miner", 5.0)],
+                      timestamp=timestamp, bits=blockchain.get_next_bits())
+        block.hash = proof_of_work(block, workers=1)['hash']
+        return block
+
+    for height in range(1, 12):
+        assert blockchain.connect_block(block_at(start + height * 60))
+    # Median of the previous 11 blocks (heights 1 to 11)
+    median = blockchain.get_median_time_past()
+    assert median == start + 6 * 60
+
+    # Winding the clock back to the median, or far forward, would let miners lower the difficulty
+    assert not blockchain.add_received_block(block_at(median).to_dict())
+    assert not blockchain.connect_block(block_at(time.time() + MAX_FUTURE_BLOCK_TIME + 60))
+    assert len(blockchain.chain) == 12
+    assert blockchain.add_received_block(block_at(median + 1).to_dict())
@@ -0,0 +1,64 @@
+import pickle
+
+import pytest
+
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+
+
+def test_sealed_transaction_caches_encodings_until_updated():
+    tx = Transaction("alice", "bob", 1.0, fee=0.1, timestamp=1000)
+    assert tx.to_json() is not tx.to_json()  # Unsealed: rebuilt on every call
+    tx.seal()
+    assert tx.sealed
+    assert tx.to_json() is tx.to_json() and tx.transaction_data() is tx.transaction_data()
+    with pytest.raises(AttributeError):
+        tx.amount = 2.0
+
+    tx_id, data = tx.tx_id, tx.transaction_data()
+    tx.update(amount=2.0)
+    assert tx.to_dict()['amount'] == 2.0 and tx.transaction_data() != data
+    assert tx.tx_id == tx_id and not tx.has_valid_id()  # Only recalculated when passed
+    tx.update(tx_id=tx._calculate_tx_id())
+    assert tx.has_valid_id() and tx.to_dict()['tx_id'] == tx.tx_id
+    with pytest.raises(AttributeError):
+        tx.update(colour="red")
+
+    # Caches are not pickled, but sealing is
+    copy = pickle.loads(pickle.dumps(tx))
+    assert copy.sealed and not copy._encodings and copy.to_json() == tx.to_json()
+
+
+def test_sealed_block_changes_only_through_its_mutation_apis():
+    transactions = [Transaction(f"sender{i}", "bob", 1.0, timestamp=1000 + i) for i in range(3)]
+    block = Block(1, "00" * 32, transactions[:2], timestamp=2000).seal()
+    assert all(tx.sealed for tx in block.transactions)
+    assert block.header_bytes() is block.header_bytes()
+    with pytest.raises(AttributeError):
+        block.nonce = 5
+
+    header = block.header_bytes()
+    block.update(nonce=5)
+    assert block.header_bytes() != header and block.calculate_hash() != block.hash
+    block.update(hash=block.calculate_hash())
+
+    block.add_transaction(transactions[2])
+    assert transactions[2].sealed and block.has_valid_merkle_root()
+    assert block.hash == block.calculate_hash()
+    assert block.to_dict() == Block(1, "00" * 32, transactions, timestamp=2000, nonce=5).to_dict()
+
+
+def test_changing_a_returned_dict_leaves_the_cache_intact():
+    tx = Transaction("alice", "bob", 1.0, fee=0.1, timestamp=1000, inputs=[("ab" * 32, 0)],
+                     outputs=[("bob", 1.0), ("alice", 2.0)]).seal()
+    block = Block(1, "00" * 32, [Transaction("0", "miner", 5.1, timestamp=999), tx], timestamp=2000).seal()
+    tx_json, block_json = tx.to_json(), block.to_json()
+    tx_dict, block_dict = tx.to_dict(), block.to_dict()
+
+    tx_dict['outputs'][1][1] = 1000.0
+    tx_dict['inputs'].append(["cd" * 32, 1])
+    block_dict['transactions'][1]['outputs'].clear()
+    block_dict['transactions'][0]['amount'] = 1000.0
+    assert tx.to_dict()['outputs'] == [["bob", 1.0], ["alice", 2.0]] and tx.to_json() == tx_json
+    assert block.to_dict()['transactions'][1] == tx.to_dict()
+    assert block.to_dict()['transactions'][0]['amount'] == 5.1 and block.to_json() == block_json
@@ -0,0 +1,45 @@
+import pytest
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from wallet.key import (generate_key_pair, key_scheme, sign_data, verify_data, SIGNATURE_SCHEMES,
+                        SCHEME_RSA_PSS, SCHEME_ED25519)
+from wallet.wallet import Wallet
+
+
+@pytest.mark.parametrize("scheme", SIGNATURE_SCHEMES)
+def test_each_scheme_signs_and_verifies(scheme):
+    private_key, public_key = generate_key_pair(scheme)
+    assert key_scheme(private_key) == key_scheme(public_key) == scheme
+    signature = sign_data(private_key, b"payload")
+    assert verify_data(public_key, signature, b"payload", scheme)
+    assert not verify_data(public_key, signature, b"payload!", scheme)
+    for other in SIGNATURE_SCHEMES:
+        if other != scheme:
+            assert not verify_data(public_key, signature, b"payload", other)
+
+
+def test_transactions_carry_and_check_their_scheme_tag():
+    wallets = [Wallet(scheme=scheme) for scheme in SIGNATURE_SCHEMES]
+    transactions = []
+    for wallet in wallets:
+        tx = Transaction(wallet.address, "bob", 1.0, fee=0.01)
+        wallet.sign_transaction(tx)
+        assert tx.scheme == wallet.scheme and tx.verify_signature()
+        transactions.append(tx)
+
+    for tx in transactions:
+        for other in SIGNATURE_SCHEMES + ("unknown",):
+            if other != tx.scheme:
+                relabelled = Transaction.from_dict(dict(tx.to_dict(), scheme=other))
+                assert not relabelled.verify_signature()
+
+    # Signatures made before schemes were tagged are RSA-PSS
+    untagged = Transaction.from_dict({key: value for key, value in transactions[0].to_dict().items() if key != 'scheme'})
+    assert transactions[0].scheme == SCHEME_RSA_PSS and untagged.scheme is None
+    assert untagged.verify_signature()
+
+    blockchain = Blockchain(difficulty=1, miner_address="miner")
+    relabelled = Transaction.from_dict(dict(transactions[2].to_dict(), scheme=SCHEME_RSA_PSS))
+    assert transactions[2].scheme == SCHEME_ED25519
+    assert blockchain.verify_transactions(transactions + [relabelled]) == [True, True, True, False]
@@ -0,0 +1,103 @@
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from blockchain.utxo import UTXO, UTXOSet
+from mining.proof_of_work import proof_of_work
+
+
+def make_chain():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    genesis_output = (blockchain.chain[0].transactions[0].tx_id, 0)
+    return blockchain, genesis_output
+
+
+def mined(blockchain, transactions):
+    block = Block(index=len(blockchain.chain), previous_hash=blockchain.chain[-1].hash,
+                  transactions=transactions, bits=blockchain.get_next_bits())
+    block.hash = proof_of_work(block, workers=1)['hash']
+    return block
+
+
+def spend(outpoint, outputs, fee=0.0):
+    receiver, amount = outputs[0]
+    return Transaction("miner", receiver, amount, fee=fee, inputs=[outpoint], outputs=outputs)
+
+
+def test_malformed_transactions_are_rejected_at_admission():
+    blockchain, genesis_output = make_chain()
+    rejected = [
+        spend(genesis_output, [("thief", 1000.0), ("sink", -950.0)]),  # Negative output pays for the theft
+        spend(genesis_output, [("bob", 10.0), ("sink", 0.0)]),
+        spend(genesis_output, [("bob", 10.0)], fee=-5.0),
+        spend(genesis_output, [("bob", 60.0)]),  # More than the 50 coins spent
+        spend(genesis_output, [("bob", 30.0)], fee=25.0),
+        Transaction("miner", "bob", 10.0, inputs=[genesis_output], outputs=[("carol", 10.0)]),
+        Transaction("miner", "bob", 10.0, inputs=[genesis_output, genesis_output], outputs=[("bob", 10.0)]),
+        Transaction("miner", "bob", -10.0),
+    ]
+    for tx in rejected:
+        assert not blockchain.add_transaction(tx, check_signature=False)
+    assert len(blockchain.mempool) == 0
+
+    assert blockchain.add_transaction(spend(genesis_output, [("bob", 10.0), ("miner", 39.0)], fee=1.0),
+                                      check_signature=False)
+
+
+def test_block_with_negative_output_is_rejected():
+    blockchain, genesis_output = make_chain()
+    state = (len(blockchain.chain), blockchain.get_balance("miner"), len(blockchain.utxo_set))
+    reward = Transaction("0", "miner", 5.0)
+    theft = spend(genesis_output, [("thief", 1000.0), ("sink", -950.0)])
+    assert not blockchain.connect_block(mined(blockchain, [reward, theft]))
+    assert (len(blockchain.chain), blockchain.get_balance("miner"), len(blockchain.utxo_set)) == state
+    assert blockchain.get_balance("thief") == 0
+
+
+def test_forged_tx_id_is_rejected():
+    blockchain, genesis_output = make_chain()
+    honest = spend(genesis_output, [("bob", 10.0), ("miner", 40.0)])
+    forged = Transaction.from_dict(dict(honest.to_dict(), outputs=[("bob", 10.0), ("thief", 40.0)]))
+    assert forged.tx_id == honest.tx_id and not forged.has_valid_id()
+    assert not blockchain.add_transaction(forged, check_signature=False)
+
+    reward = Transaction("0", "miner", 5.0, tx_id="ab" * 32)
+    assert not blockchain.connect_block(mined(blockchain, [reward]))
+    assert len(blockchain.chain) == 1
+
+
+def test_repeated_outputs_fail_instead_of_being_skipped():
+    blockchain, _ = make_chain()
+    view = blockchain.utxo_set.view()
+    reward = Transaction("0", "miner", 5.0)
+    assert view.update_utxos(reward)
+    assert not view.update_utxos(reward)
+    payment = Transaction("miner", "bob", 1.0)
+    assert view.update_utxos(payment)
+    assert not view.update_utxos(payment)
+    assert view.get_balance("bob") == 1.0 and view.get_balance("miner") == 54.0
+
+
+def test_explicit_inputs_spend_exactly_the_named_outputs():
+    utxo_set = UTXOSet()
+    for index, amount in enumerate((10.0, 20.0, 30.0)):
+        utxo_set.add_utxo(UTXO("funding", index, amount, "alice"))
+    utxo_set.add_utxo(UTXO("funding", 3, 40.0, "bob"))
+
+    payment = Transaction("alice", "carol", 25.0, fee=0.5, inputs=[("funding", 0), ("funding", 1)],
+                          outputs=[("carol", 25.0), ("alice", 4.5)])
+    assert utxo_set.update_utxos(payment)
+    assert not utxo_set.is_unspent("funding", 0) and not utxo_set.is_unspent("funding", 1)
+    assert utxo_set.get_utxo(payment.tx_id, 0).amount == 25.0
+    assert utxo_set.get_utxo(payment.tx_id, 1).owner_address == "alice"
+    assert utxo_set.get_balance("alice") == 34.5  # 30 untouched plus 4.5 change
+
+    rejected = [
+        Transaction("alice", "carol", 5.0, inputs=[("funding", 0)], outputs=[("carol", 5.0)]),  # Spent
+        Transaction("alice", "carol", 5.0, inputs=[("funding", 3)], outputs=[("carol", 5.0)]),  # Bob's
+        Transaction("alice", "carol", 5.0, inputs=[("missing", 0)], outputs=[("carol", 5.0)]),
+        Transaction("alice", "carol", 30.0, fee=0.1, inputs=[("funding", 2)], outputs=[("carol", 30.0)]),
+    ]
+    state = {address: utxo_set.get_balance(address) for address in ("alice", "bob", "carol")}
+    for tx in rejected:
+        assert not utxo_set.update_utxos(tx)
+    assert {address: utxo_set.get_balance(address) for address in state} == state
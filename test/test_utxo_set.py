@@ -0,0 +1,41 @@
+import random
+
+from blockchain.utxo import UTXO, UTXOSet
+
+
+def test_indexes_and_running_balances_follow_adds_and_spends():
+    utxo_set = UTXOSet()
+    reference = {}
+    rng = random.Random(3)
+    for step in range(2000):
+        if reference and rng.random() < 0.4:
+            outpoint = rng.choice(sorted(reference))
+            owner = reference.pop(outpoint).owner_address
+            assert utxo_set.spend_utxo(*outpoint, owner_address=owner).owner_address == owner
+            assert utxo_set.spend_utxo(*outpoint) is None
+        else:
+            utxo = UTXO(f"tx{step}", step % 3, rng.randint(1, 100) / 4, f"address{rng.randrange(20)}")
+            assert utxo_set.add_utxo(utxo)
+            assert not utxo_set.add_utxo(utxo)
+            reference[(utxo.transaction_id, utxo.output_index)] = utxo
+
+    assert len(utxo_set) == len(reference)
+    for address in (f"address{i}" for i in range(20)):
+        owned = [u for u in reference.values() if u.owner_address == address]
+        assert sorted(u.transaction_id for u in utxo_set.get_utxos(address)) == sorted(u.transaction_id for u in owned)
+        assert abs(utxo_set.get_balance(address) - sum(u.amount for u in owned)) < 1e-9
+        # Addresses without outputs are dropped from both indexes
+        assert (address in utxo_set.addresses) == (address in utxo_set.balances) == bool(owned)
+    for (tx_id, index), utxo in reference.items():
+        assert utxo_set.is_unspent(tx_id, index) and utxo_set.is_unspent(tx_id, index, utxo.owner_address)
+        assert not utxo_set.is_unspent(tx_id, index, "someone else")
+        assert utxo_set.get_utxo(tx_id, index) is utxo
+
+
+def test_spend_checks_the_owner():
+    utxo_set = UTXOSet()
+    utxo_set.add_utxo(UTXO("tx", 0, 5.0, "alice"))
+    assert utxo_set.spend_utxo("tx", 0, "bob") is None
+    assert utxo_set.get_balance("alice") == 5.0
+    assert utxo_set.spend_utxo("tx", 0, "alice") is not None
+    assert utxo_set.get_balance("alice") == 0.0 and not utxo_set.is_unspent("tx", 0)
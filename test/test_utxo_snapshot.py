@@ -0,0 +1,103 @@
+import pytest
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from blockchain.utxo import UTXO, UTXOSet
+from storage.utxo_snapshot import UTXOSnapshot, content_hash
+from storage.utxo_store import UTXOStore
+from wallet.key import SCHEME_ED25519
+from wallet.wallet import Wallet
+
+
+def test_snapshot_round_trip_and_corruption(tmp_path):
+    utxo_set = UTXOSet()
+    for i in range(1000):
+        utxo_set.add_utxo(UTXO(f"{i:064x}" if i % 2 else f"tx{i}", i % 3, i * 0.5, f"address{i % 7}"))
+    file_name = str(tmp_path / "utxos.snapshot")
+    digest = UTXOSnapshot.write(utxo_set.iter_sorted(), file_name, 5, "ab" * 32, 12345, chunk_size=64)
+
+    header = UTXOSnapshot.read_header(file_name)
+    assert header == {'height': 5, 'block_hash': "ab" * 32, 'chain_work': 12345, 'utxo_count': 1000,
+                      'content_hash': digest}
+    store = UTXOStore(str(tmp_path / "utxo.db"))
+    store.bulk_load(UTXOSnapshot.read(file_name))
+    assert content_hash(store.iter_sorted()) == digest == content_hash(utxo_set.iter_sorted())
+    for address in utxo_set.addresses:
+        assert abs(store.get_balance(address) - utxo_set.get_balance(address)) < 1e-9
+    store.close()
+
+    data = bytearray(open(file_name, 'rb').read())
+    data[-10] ^= 0xFF
+    open(file_name, 'wb').write(bytes(data))
+    loaded = UTXOSet()
+    with pytest.raises(ValueError):
+        loaded.bulk_load(UTXOSnapshot.read(file_name))
+    assert len(loaded) == 0
+
+
+def test_bootstrap_from_snapshot_then_validate_history(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    source = Blockchain(difficulty=1, miner_address=wallet.address, retarget_interval=3)
+    for i in range(4):
+        tx = Transaction(wallet.address, f"receiver{i}", 1.0, fee=0.1)
+        wallet.sign_transaction(tx)
+        assert source.add_transaction(tx)
+        source.mine_block("miner")
+    file_name = str(tmp_path / "chain.snapshot")
+    digest = source.export_snapshot(file_name)
+
+    node = Blockchain(difficulty=1, retarget_interval=3, utxo_db=str(tmp_path / "node.db"))
+    assert not node.load_snapshot(file_name, source.chain, expected_hash="00" * 32)
+    assert node.load_snapshot(file_name, source.chain, expected_hash=digest)
+    # Balances are served straight away
+    for address in (wallet.address, "miner", "receiver3"):
+        assert node.get_balance(address) == pytest.approx(source.get_balance(address))
+
+    assert node.wait_for_history_validation(timeout=30) == "valid"
+    assert node.is_chain_valid()
+    assert len(node.get_address_history("receiver2")) == 1
+    assert node.block_index.get(source.chain[1].hash).height == 1
+
+    # The bootstrapped node extends the chain, and a restart finds the whole of it
+    tx = Transaction(wallet.address, "receiver4", 1.0, fee=0.1)
+    wallet.sign_transaction(tx)
+    assert node.add_transaction(tx)
+    assert node.mine_block("miner")
+    node.utxo_set.close()
+    restarted = Blockchain(difficulty=1, retarget_interval=3, utxo_db=str(tmp_path / "node.db"))
+    assert len(restarted.chain) == len(source.chain) + 1
+    assert restarted.get_balance("receiver4") == 1.0
+    restarted.utxo_set.close()
+
+
+def test_snapshot_with_tampered_balances_is_refused_after_validation(tmp_path):
+    wallet = Wallet(scheme=SCHEME_ED25519)
+    source = Blockchain(difficulty=1, miner_address=wallet.address, retarget_interval=10**6)
+    for i in range(2):
+        tx = Transaction(wallet.address, f"receiver{i}", 1.0, fee=0.1)
+        wallet.sign_transaction(tx)
+        assert source.add_transaction(tx)
+        source.mine_block("miner")
+    source.export_snapshot(str(tmp_path / "honest.snapshot"))
+    honest = UTXOSnapshot.read_header(str(tmp_path / "honest.snapshot"))
+
+    # Internally consistent: the header, chunks and content hash all match the forged set
+    forged = UTXOSet()
+    for utxo in source.utxo_set.iter_sorted():
+        forged.add_utxo(UTXO(utxo.transaction_id, utxo.output_index, utxo.amount, utxo.owner_address))
+    forged.add_utxo(UTXO("ab" * 32, 0, 1e6, "thief"))
+    file_name = str(tmp_path / "forged.snapshot")
+    digest = UTXOSnapshot.write(forged.iter_sorted(), file_name, honest['height'], honest['block_hash'],
+                                honest['chain_work'])
+
+    node = Blockchain(difficulty=1, retarget_interval=10**6)
+    assert node.load_snapshot(file_name, source.chain, expected_hash=digest)
+    assert node.wait_for_history_validation(timeout=30) == "invalid"
+
+    assert not node.add_transaction(Transaction("thief", "accomplice", 1000.0), check_signature=False)
+    assert node.mine_block("miner") is None
+    tx = Transaction(wallet.address, "receiver2", 1.0, fee=0.1)
+    wallet.sign_transaction(tx)
+    assert source.add_transaction(tx)
+    assert not node.add_received_block(source.mine_block("miner").to_dict())
+    assert len(node.chain) == len(source.chain) - 1
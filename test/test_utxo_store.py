@@ -0,0 +1,61 @@
+import random
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from blockchain.utxo import UTXO, UTXOSet
+from storage.utxo_store import UTXOStore
+
+
+def test_store_matches_in_memory_set_with_a_small_cache(tmp_path):
+    store = UTXOStore(str(tmp_path / "utxo.db"), cache_size=8)
+    memory = UTXOSet()
+    rng = random.Random(1)
+    live = []
+    for step in range(2000):
+        if live and rng.random() < 0.4:
+            outpoint = live.pop(rng.randrange(len(live)))
+            assert store.spend_utxo(*outpoint) is not None
+            memory.spend_utxo(*outpoint)
+        else:
+            utxo = UTXO(f"tx{step}", step % 3, float(rng.randint(1, 9)), f"address{rng.randint(0, 20)}")
+            assert store.add_utxo(utxo) == memory.add_utxo(UTXO(*utxo.to_dict().values()))
+            live.append((utxo.transaction_id, utxo.output_index))
+        if step % 50 == 0:
+            store.flush()
+        assert len(store._cache) <= 8
+
+    assert len(store) == len(memory)
+    assert sorted(store.addresses) == sorted(memory.addresses)
+    for address in memory.addresses:
+        assert abs(store.get_balance(address) - memory.get_balance(address)) < 1e-9
+        assert ({(u.transaction_id, u.output_index) for u in store.get_utxos(address)} ==
+                {(u.transaction_id, u.output_index) for u in memory.get_utxos(address)})
+    store.close()
+
+    reopened = UTXOStore(str(tmp_path / "utxo.db"), cache_size=8)
+    assert len(reopened) == len(memory)
+    assert all(reopened.is_unspent(*outpoint) for outpoint in live)
+    reopened.close()
+
+
+def test_restart_reloads_chain_and_utxos_without_replay(tmp_path):
+    db_file = str(tmp_path / "chain.db")
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6, utxo_db=db_file)
+    blockchain.utxo_set.add_utxo(UTXO("funding", 0, 10.0, "alice"))
+    tx = Transaction("alice", "bob", 4.0, fee=1.0, inputs=[("funding", 0)],
+                     outputs=[("bob", 4.0), ("alice", 5.0)])
+    assert blockchain.add_transaction(tx, check_signature=False)
+    blockchain.mine_block("miner")
+    balances = {a: blockchain.get_balance(a) for a in ("miner", "alice", "bob")}
+    chain_hashes = [block.hash for block in blockchain.chain]
+    blockchain.utxo_set.close()
+
+    restarted = Blockchain(difficulty=1, miner_address="someone else", retarget_interval=10**6,
+                           utxo_db=db_file)
+    assert [block.hash for block in restarted.chain] == chain_hashes
+    assert {a: restarted.get_balance(a) for a in ("miner", "alice", "bob")} == balances
+    assert restarted.get_balance("someone else") == 0.0
+    assert not restarted.utxo_set.is_unspent("funding", 0)
+    assert restarted.is_double_spending(tx) and not restarted.add_transaction(tx, check_signature=False)
+    assert restarted.is_chain_valid()
+    restarted.utxo_set.close()
@@ -0,0 +1,57 @@
+import random
+
+from blockchain.blockchain import Blockchain
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+from blockchain.utxo import UTXO, UTXOSet
+from mining.proof_of_work import proof_of_work
+
+
+def outpoints(utxo_set, addresses):
+    return {address: sorted((u.transaction_id, u.output_index, u.amount) for u in utxo_set.get_utxos(address))
+            for address in addresses}
+
+
+def test_view_matches_applying_directly_and_leaves_base_untouched():
+    base, direct = UTXOSet(), UTXOSet()
+    for i in range(50):
+        for utxo_set in (base, direct):
+            utxo_set.add_utxo(UTXO(f"funding{i}", 0, 1.0, f"address{i % 5}"))
+    before = outpoints(base, [f"address{i}" for i in range(5)])
+
+    view = base.view()
+    nested = view.view()
+    rng = random.Random(7)
+    live = [(f"funding{i}", 0) for i in range(50)]
+    for step in range(300):
+        if live and rng.random() < 0.5:
+            outpoint = live.pop(rng.randrange(len(live)))
+            assert nested.spend_utxo(*outpoint) is not None
+            direct.spend_utxo(*outpoint)
+        else:
+            utxo = UTXO(f"tx{step}", 0, 2.0, f"address{rng.randrange(5)}")
+            assert nested.add_utxo(utxo) and direct.add_utxo(UTXO(*utxo.to_dict().values()))
+            live.append((utxo.transaction_id, 0))
+    addresses = [f"address{i}" for i in range(5)]
+    assert outpoints(nested, addresses) == outpoints(direct, addresses)
+    assert outpoints(base, addresses) == before
+
+    nested.commit()
+    assert outpoints(base, addresses) == before  # Only reached the outer view
+    view.commit()
+    assert outpoints(base, addresses) == outpoints(direct, addresses)
+    assert len(base) == len(direct) and len(view) == len(base)
+    for address in addresses:
+        assert abs(base.get_balance(address) - direct.get_balance(address)) < 1e-9
+
+
+def test_block_spending_unavailable_funds_is_rejected():
+    blockchain = Blockchain(difficulty=1, miner_address="miner", retarget_interval=10**6)
+    state = (len(blockchain.chain), blockchain.get_balance("miner"), len(blockchain.utxo_set))
+    reward = Transaction("0", "miner", 5.0)
+    overspend = Transaction("miner", "bob", 60.0)
+    block = Block(index=1, previous_hash=blockchain.chain[-1].hash, transactions=[reward, overspend],
+                  bits=blockchain.get_next_bits())
+    block.hash = proof_of_work(block, workers=1)['hash']
+    assert not blockchain.connect_block(block)
+    assert (len(blockchain.chain), blockchain.get_balance("miner"), len(blockchain.utxo_set)) == state
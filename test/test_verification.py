@@ -0,0 +1,36 @@
+from blockchain.transaction import Transaction
+from blockchain.verification import BatchVerifier, SignatureCache
+from wallet.key import SCHEME_ED25519
+from wallet.wallet import Wallet
+
+
+def signed_transactions(count):
+    senders = [Wallet(scheme=SCHEME_ED25519) for _ in range(3)]
+    transactions = []
+    for i in range(count):
+        wallet = senders[i % len(senders)]
+        tx = Transaction(wallet.address, f"receiver{i}", 1.0 + i, fee=0.01)
+        wallet.sign_transaction(tx)
+        transactions.append(tx)
+    return transactions
+
+
+def test_worker_pool_returns_results_in_input_order():
+    transactions = signed_transactions(7)
+    # Same signature and tx_id, different amount
+    transactions[4] = Transaction.from_dict(dict(transactions[4].to_dict(), amount=500.0))
+    expected = [True] * 7
+    expected[4] = False
+
+    verifier = BatchVerifier(workers=2, chunk_size=2, cache=SignatureCache())
+    try:
+        assert verifier.verify(transactions) == expected
+        assert verifier._pool is not None  # Four chunks went to the worker processes
+        assert len(verifier.cache) == 6
+        # Cached successes are skipped; the tampered entry is checked again and still fails
+        assert verifier.verify(transactions) == expected
+        assert verifier.cache.get_stats()['hits'] == 6
+    finally:
+        verifier.close()
+    assert verifier._pool is None
+    assert BatchVerifier(workers=1).verify(transactions) == expected
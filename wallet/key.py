@@ -1,27 +1,130 @@
 import os
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.primitives import serialization
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519, padding
+from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.backends import default_backend
+from cryptography.exceptions import InvalidSignature
 
-def generate_key_pair():
+# Parsed public keys remembered by the key registry
+DEFAULT_KEY_REGISTRY_ENTRIES = 10000
+
+# Signature schemes (the tag carried by transactions)
+SCHEME_RSA_PSS = "rsa-pss"
+SCHEME_ECDSA_SECP256K1 = "ecdsa-secp256k1"
+SCHEME_ED25519 = "ed25519"
+SIGNATURE_SCHEMES = (SCHEME_RSA_PSS, SCHEME_ECDSA_SECP256K1, SCHEME_ED25519)
+DEFAULT_SIGNATURE_SCHEME = SCHEME_RSA_PSS
+
+def generate_key_pair(scheme=DEFAULT_SIGNATURE_SCHEME):
     """
-    Generate a new RSA key pair for cryptocurrency wallet.
+    Generate a new key pair for cryptocurrency wallet.
+    
+    Args:
+        scheme: Signature scheme of the key (RSA-2048 with PSS by default)
     
     Returns:
         tuple: (private_key, public_key) as cryptography objects
     """
     # Generate private key
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
+    if scheme == SCHEME_RSA_PSS:
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+            backend=default_backend()
+        )
+    elif scheme == SCHEME_ECDSA_SECP256K1:
+        private_key = ec.generate_private_key(ec.SECP256K1(), backend=default_backend())
+    elif scheme == SCHEME_ED25519:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unknown signature scheme: {scheme}")
     
     # Get public key
     public_key = private_key.public_key()
     
     return private_key, public_key
 
+def key_scheme(key):
+    """
+    Get the signature scheme of a private or public key.
+    
+    Args:
+        key: The cryptography key object
+    
+    Returns:
+        str: Scheme tag
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return SCHEME_RSA_PSS
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and key.curve.name == "secp256k1":
+        return SCHEME_ECDSA_SECP256K1
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return SCHEME_ED25519
+    raise ValueError(f"Unsupported key type: {type(key).__name__}")
+
+def sign_data(private_key, data):
+    """
+    Sign data with the scheme of the private key.
+    
+    Args:
+        private_key: The private key object
+        data: Bytes to sign
+    
+    Returns:
+        bytes: The signature
+    """
+    scheme = key_scheme(private_key)
+    if scheme == SCHEME_RSA_PSS:
+        return private_key.sign(
+            data,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+    if scheme == SCHEME_ECDSA_SECP256K1:
+        return private_key.sign(data, ec.ECDSA(hashes.SHA256()))
+    return private_key.sign(data)
+
+def verify_data(public_key, signature, data, scheme=None):
+    """
+    Verify a signature with the scheme of the public key.
+    
+    Args:
+        public_key: The public key object
+        signature: Signature bytes
+        data: Bytes that were signed
+        scheme: Scheme the signature claims to use (must match the key if given)
+    
+    Returns:
+        bool: True if the signature is valid
+    """
+    key_type = key_scheme(public_key)
+    if scheme is not None and scheme != key_type:
+        return False
+    try:
+        if key_type == SCHEME_RSA_PSS:
+            public_key.verify(
+                signature,
+                data,
+                padding.PSS(
+                    mgf=padding.MGF1(hashes.SHA256()),
+                    salt_length=padding.PSS.MAX_LENGTH
+                ),
+                hashes.SHA256()
+            )
+        elif key_type == SCHEME_ECDSA_SECP256K1:
+            public_key.verify(signature, data, ec.ECDSA(hashes.SHA256()))
+        else:
+            public_key.verify(signature, data)
+        return True
+    except InvalidSignature:
+        return False
+
 def save_key_to_file(key, filename, is_private=True, password=None):
     """
     Save a key to a file.
@@ -31,7 +134,7 @@ def save_key_to_file(key, filename, is_private=True, password=None):
         filename: Path to save the key
         is_private: Whether the key is a private key
         password: Password to encrypt the private key (optional)
-        
+    
     Returns:
         bool: True if successful
     """
@@ -73,7 +176,7 @@ def load_key_from_file(filename, is_private=True, password=None):
         filename: Path to the key file
         is_private: Whether the key is a private key
         password: Password to decrypt the private key (if needed)
-        
+    
     Returns:
         The loaded key as a cryptography object
     """
@@ -112,7 +215,7 @@ def serialize_public_key(public_key):
     
     Args:
         public_key: The public key object
-        
+    
     Returns:
         str: PEM encoded public key
     """
@@ -128,7 +231,7 @@ def deserialize_public_key(pem_string):
     
     Args:
         pem_string: PEM encoded public key string
-        
+    
     Returns:
         The public key object
     """
@@ -137,4 +240,190 @@ def deserialize_public_key(pem_string):
         pem_bytes,
         backend=default_backend()
     )
-    return public_key
\ No newline at end of file
+    return public_key
+
+def pem_to_address(pem_string):
+    """
+    Derive the wallet address of a PEM encoded public key without parsing it.
+    
+    Args:
+        pem_string: PEM encoded public key string, as produced by serialize_public_key
+    
+    Returns:
+        str: Wallet address ("CRY" followed by 34 base64 characters)
+    """
+    sha256_hash = hashlib.sha256(pem_string.encode()).digest()
+    ripemd_hash = hashlib.sha256(sha256_hash).digest()  # Simplified (instead of RIPEMD-160)
+    address = base64.b64encode(ripemd_hash).decode('utf-8')
+    return "CRY" + address[:34]
+
+def public_key_to_address(public_key):
+    """
+    Derive the wallet address of a public key.
+    
+    Args:
+        public_key: The public key object
+    
+    Returns:
+        str: Wallet address ("CRY" followed by 34 base64 characters)
+    """
+    return pem_to_address(serialize_public_key(public_key))
+
+
+class PublicKeyRegistry:
+    """
+    Bounded LRU map of address -> parsed public key.
+    
+    Transactions carry their sender's key as PEM text. Resolving it through
+    the registry parses and checks it against the address once; later
+    transactions of the same sender carrying the same PEM get the parsed key
+    back directly. Verification of mempool transactions and of blocks both
+    resolve keys here, which is how the registry gets filled.
+    """
+    
+    def __init__(self, max_entries=DEFAULT_KEY_REGISTRY_ENTRIES):
+        """
+        Initialize an empty registry.
+        
+        Args:
+            max_entries: Number of addresses to remember
+        """
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # {address: (pem string, public key object)}
+        self._keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def register(self, address, public_key, pem_string=None):
+        """
+        Remember the key of an address, evicting the least recently used one if full.
+        
+        Args:
+            address: Wallet address the key belongs to
+            public_key: The public key object
+            pem_string: Its PEM encoding (serialized if not given)
+        """
+        if pem_string is None:
+            pem_string = serialize_public_key(public_key)
+        with self.lock:
+            self._keys[address] = (pem_string, public_key)
+            self._keys.move_to_end(address)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+                self.evictions += 1
+    
+    def resolve(self, address, pem_string):
+        """
+        Get the parsed key for an address from the PEM a transaction carries.
+        
+        Args:
+            address: Sender address the key must belong to
+            pem_string: PEM encoded public key carried by the transaction
+        
+        Returns:
+            The public key object, or None if the key does not belong to the address
+        """
+        with self.lock:
+            entry = self._keys.get(address)
+            if entry is not None and entry[0] == pem_string:
+                self._keys.move_to_end(address)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        public_key = deserialize_public_key(pem_string)
+        # The canonical PEM hashes straight to the address; anything else is re-encoded first
+        if pem_to_address(pem_string) != address and public_key_to_address(public_key) != address:
+            return None
+        self.register(address, public_key, pem_string)
+        return public_key
+    
+    def get(self, address):
+        """
+        Get the registered key of an address.
+        
+        Args:
+            address: Wallet address
+        
+        Returns:
+            The public key object, or None if unknown
+        """
+        with self.lock:
+            entry = self._keys.get(address)
+            return entry[1] if entry is not None else None
+    
+    def get_stats(self):
+        """
+        Get registry metrics.
+        
+        Returns:
+            dict: Entries, hits, misses and evictions
+        """
+        with self.lock:
+            return {
+                'entries': len(self._keys),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+    
+    def __contains__(self, address):
+        return address in self._keys
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return f"PublicKeyRegistry(entries={len(self._keys)}/{self.max_entries}, hits={self.hits})"
+
+
+# Registry shared by every verification path of this process
+public_key_registry = PublicKeyRegistry()
+
+
+def benchmark_signature_schemes(count=500):
+    """
+    Measure key generation, signing and verification throughput of each scheme.
+    
+    Args:
+        count: Number of signatures made and checked per scheme
+    
+    Returns:
+        dict: {scheme: {'keygen': keys/s, 'sign': signatures/s, 'verify': checks/s,
+            'signature_hex': hex characters per signature}}
+    """
+    import time
+    
+    payload = b'{"amount": 1.0, "receiver": "CRYreceiver", "sender": "CRYsender", "timestamp": 0}'
+    stats = {}
+    for scheme in SIGNATURE_SCHEMES:
+        keygen_count = 5 if scheme == SCHEME_RSA_PSS else 100
+        start_time = time.perf_counter()
+        for _ in range(keygen_count):
+            private_key, public_key = generate_key_pair(scheme)
+        keygen_rate = keygen_count / (time.perf_counter() - start_time)
+        
+        start_time = time.perf_counter()
+        signatures = [sign_data(private_key, payload) for _ in range(count)]
+        sign_rate = count / (time.perf_counter() - start_time)
+        
+        start_time = time.perf_counter()
+        assert all(verify_data(public_key, signature, payload) for signature in signatures)
+        verify_rate = count / (time.perf_counter() - start_time)
+        
+        stats[scheme] = {
+            'keygen': keygen_rate,
+            'sign': sign_rate,
+            'verify': verify_rate,
+            'signature_hex': len(signatures[0].hex()),
+        }
+    return stats
+
+
+if __name__ == "__main__":
+    for scheme, result in benchmark_signature_schemes().items():
+        print(f"{scheme:16} keygen {result['keygen']:>9,.0f}/s  sign {result['sign']:>9,.0f}/s  "
+              f"verify {result['verify']:>9,.0f}/s  signature {result['signature_hex']} hex chars")
@@ -0,0 +1,230 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.hazmat.primitives import serialization
+
+from .key import generate_key_pair, DEFAULT_SIGNATURE_SCHEME
+
+# Keys kept ready by default
+DEFAULT_KEY_POOL_SIZE = 16
+# Keys generated per job sent to a worker process
+KEY_BATCH_SIZE = 4
+
+def _generate_serialized_keys(scheme, count):
+    """
+    Generate private keys and serialize them to DER (runs in a worker process).
+
+    Args:
+        scheme: Signature scheme of the keys
+        count: Number of keys to generate
+
+    Returns:
+        list: DER encoded PKCS8 private keys
+    """
+    keys = []
+    for _ in range(count):
+        private_key, _ = generate_key_pair(scheme)
+        keys.append(private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    return keys
+
+def _load_key_pair(der):
+    """Rebuild a (private_key, public_key) pair from a DER encoded private key."""
+    private_key = serialization.load_der_private_key(der, password=None)
+    return private_key, private_key.public_key()
+
+
+class KeyPool:
+    """
+    Keeps a number of key pairs generated ahead of time.
+
+    Keys are generated in background worker processes and topped up as they
+    are handed out, so creating a wallet or node takes a ready key instead of
+    waiting for RSA key generation. When the pool runs dry, get() falls back
+    to generating a key in the calling process.
+    """
+
+    def __init__(self, target=DEFAULT_KEY_POOL_SIZE, scheme=DEFAULT_SIGNATURE_SCHEME, workers=None,
+                 batch_size=KEY_BATCH_SIZE):
+        """
+        Initialize a pool and start filling it.
+
+        Args:
+            target: Number of key pairs to keep ready
+            scheme: Signature scheme of the keys
+            workers: Number of generator processes (None uses every core)
+            batch_size: Keys generated per worker job
+        """
+        self.target = target
+        self.scheme = scheme
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._ready = deque()
+        self._in_flight = 0  # Keys being generated for the pool
+        self._executor = None
+        self._closed = False
+        self.handed_out = 0
+        self.generated_inline = 0
+        self._refill()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _refill(self):
+        """Submit generation jobs until ready plus in-flight keys reach the target."""
+        with self._cond:
+            while not self._closed and len(self._ready) + self._in_flight < self.target:
+                count = min(self.batch_size, self.target - len(self._ready) - self._in_flight)
+                self._in_flight += count
+                future = self._get_executor().submit(_generate_serialized_keys, self.scheme, count)
+                future.add_done_callback(lambda f, count=count: self._collect(f, count))
+
+    def _collect(self, future, count):
+        """Move keys from a finished job into the pool."""
+        failed = future.cancelled() or future.exception() is not None
+        with self._cond:
+            self._in_flight -= count
+            if failed:
+                if not self._closed:
+                    print(f"Key generation failed: {future.exception()}")
+                return
+            self._ready.extend(_load_key_pair(der) for der in future.result())
+            self._cond.notify_all()
+        self._refill()
+
+    def get(self):
+        """
+        Take a key pair, generating one in place if none is ready.
+
+        Returns:
+            tuple: (private_key, public_key)
+        """
+        with self._cond:
+            key_pair = self._ready.popleft() if self._ready else None
+            self.handed_out += 1
+        if key_pair is None:
+            key_pair = generate_key_pair(self.scheme)
+            self.generated_inline += 1
+        self._refill()
+        return key_pair
+
+    def take(self, count):
+        """
+        Take many key pairs at once.
+
+        Ready keys are handed out first; the rest are generated across the
+        worker processes in parallel, or in the calling process once the pool
+        is closed.
+
+        Args:
+            count: Number of key pairs
+
+        Returns:
+            list: (private_key, public_key) tuples
+        """
+        with self._cond:
+            key_pairs = [self._ready.popleft() for _ in range(min(count, len(self._ready)))]
+            self.handed_out += count
+            closed = self._closed
+
+        missing = count - len(key_pairs)
+        if missing and closed:
+            # Starting a new executor here would leak its workers
+            key_pairs.extend(generate_key_pair(self.scheme) for _ in range(missing))
+            self.generated_inline += missing
+        elif missing:
+            sizes = [min(self.batch_size, missing - i) for i in range(0, missing, self.batch_size)]
+            futures = [self._get_executor().submit(_generate_serialized_keys, self.scheme, size)
+                       for size in sizes]
+            for future in futures:
+                key_pairs.extend(_load_key_pair(der) for der in future.result())
+        self._refill()
+        return key_pairs
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Block until the pool holds its target number of keys.
+
+        Args:
+            timeout: Seconds to wait at most (None waits forever)
+
+        Returns:
+            bool: True if the pool is full
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._ready) < self.target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self):
+        """Stop generating keys and shut down the worker processes."""
+        with self._cond:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._ready)
+
+    def __repr__(self):
+        """Debug-friendly string representation."""
+        return (f"KeyPool(scheme={self.scheme}, ready={len(self._ready)}/{self.target}, "
+                f"in_flight={self._in_flight})")
+
+
+def benchmark_key_pool(count=32, scheme=DEFAULT_SIGNATURE_SCHEME):
+    """
+    Compare creating wallets one by one against handing them out from a filled pool.
+
+    Args:
+        count: Number of wallets to create
+        scheme: Signature scheme of the keys
+
+    Returns:
+        dict: Seconds taken inline, from a warm pool, and with Wallet.create_many
+    """
+    from .wallet import Wallet
+
+    start_time = time.perf_counter()
+    for _ in range(count):
+        Wallet(scheme=scheme)
+    stats = {'inline': time.perf_counter() - start_time}
+
+    with KeyPool(target=count, scheme=scheme) as pool:
+        pool.wait_until_ready()
+        start_time = time.perf_counter()
+        for _ in range(count):
+            Wallet(key_pool=pool)
+        stats['warm_pool'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    Wallet.create_many(count, scheme=scheme)
+    stats['create_many'] = time.perf_counter() - start_time
+    return stats
+
+
+if __name__ == "__main__":
+    stats = benchmark_key_pool()
+    print(f"32 wallets, inline keygen:  {stats['inline']:.3f}s")
+    print(f"32 wallets, warm key pool:  {stats['warm_pool']:.3f}s")
+    print(f"Wallet.create_many(32):     {stats['create_many']:.3f}s")
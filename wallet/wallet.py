@@ -3,34 +3,73 @@ import json
 import time
 import hashlib
 import base64
-from .key import generate_key_pair, save_key_to_file, load_key_from_file, serialize_public_key
+from .key import (generate_key_pair, save_key_to_file, load_key_from_file, serialize_public_key,
+                  pem_to_address, public_key_registry, key_scheme, DEFAULT_SIGNATURE_SCHEME)
+from .key_pool import KeyPool
 from cryptography.hazmat.primitives.asymmetric import rsa
 
 class Wallet:
-    def __init__(self, private_key=None, public_key=None, address=None, blockchain=None):
+    def __init__(self, private_key=None, public_key=None, address=None, blockchain=None,
+                 scheme=DEFAULT_SIGNATURE_SCHEME, key_pool=None):
         """
         Initialize a new wallet for cryptocurrency.
+        The scheme (rsa-pss, ecdsa-secp256k1 or ed25519) applies to newly generated keys;
+        a wallet built from existing keys uses theirs. New keys are taken from
+        key_pool (a KeyPool) when given, whose scheme then applies.
         """
         self.private_key = private_key
         self.public_key = public_key
         self.address = address
         self.blockchain = blockchain
+        self.scheme = key_scheme(private_key) if private_key else scheme
+        self.public_key_pem = serialize_public_key(public_key) if public_key else None
 
         if not self.private_key or not self.public_key:
-            self._generate_keys()
+            if key_pool is not None:
+                self.private_key, self.public_key = key_pool.get()
+                self.scheme = key_pool.scheme
+                self._generate_address()
+            else:
+                self._generate_keys()
 
     def _generate_keys(self):
-        """Generate a new RSA key pair and address."""
-        self.private_key, self.public_key = generate_key_pair()
+        """Generate a new key pair of the wallet's scheme and its address."""
+        self.private_key, self.public_key = generate_key_pair(self.scheme)
         self._generate_address()
 
+    @classmethod
+    def create_many(cls, count, blockchain=None, scheme=DEFAULT_SIGNATURE_SCHEME, key_pool=None):
+        """
+        Create wallets in bulk, generating their keys in parallel worker processes.
+
+        Args:
+            count: Number of wallets
+            blockchain: Blockchain reference given to every wallet (optional)
+            scheme: Signature scheme of the keys (ignored when key_pool is given)
+            key_pool: KeyPool to take keys from (a temporary one is used otherwise)
+
+        Returns:
+            list: The new wallets
+        """
+        if key_pool is None:
+            with KeyPool(target=0, scheme=scheme) as pool:
+                key_pairs = pool.take(count)
+        else:
+            key_pairs = key_pool.take(count)
+
+        wallets = []
+        for private_key, public_key in key_pairs:
+            wallet = cls(private_key=private_key, public_key=public_key, blockchain=blockchain)
+            wallet._generate_address()
+            wallets.append(wallet)
+        return wallets
+
     def _generate_address(self):
         """Create a wallet address by hashing the public key."""
-        pubkey_pem = serialize_public_key(self.public_key).encode()
-        sha256_hash = hashlib.sha256(pubkey_pem).digest()
-        ripemd_hash = hashlib.sha256(sha256_hash).digest()  # Simplified (instead of RIPEMD-160)
-        address = base64.b64encode(ripemd_hash).decode('utf-8')
-        self.address = "CRY" + address[:34]
+        # Serialized once: the same PEM is hashed here and attached to every transaction
+        self.public_key_pem = serialize_public_key(self.public_key)
+        self.address = pem_to_address(self.public_key_pem)
+        public_key_registry.register(self.address, self.public_key, self.public_key_pem)
 
     def save_wallet(self, folder_path=".", password=None):
         """Save keys and wallet info to files."""
@@ -67,20 +106,52 @@ class Wallet:
         wallet._generate_address()
         return wallet
 
-    def create_transaction(self, receiver_address, amount):
+    def create_transaction(self, receiver_address, amount, fee=0.0):
         from blockchain.transaction import Transaction
         if not self.blockchain:
             raise ValueError("Blockchain reference is required.")
-        if self.get_balance() < amount:
+        if self.get_balance() < amount + fee:
             raise ValueError("Insufficient balance.")
 
-        tx = Transaction(sender=self.address, receiver=receiver_address, amount=amount)
+        inputs, input_total = self.select_utxos(amount + fee)
+        outputs = [(receiver_address, amount)]
+        if input_total > amount + fee:
+            outputs.append((self.address, input_total - amount - fee))  # Change
+
+        tx = Transaction(sender=self.address, receiver=receiver_address, amount=amount, fee=fee,
+                         inputs=inputs, outputs=outputs,
+                         public_key=self.public_key_pem)
         self.sign_transaction(tx)
         return tx
 
+    def select_utxos(self, target):
+        """
+        Pick unspent outputs of this wallet covering an amount, skipping outputs
+        already spent by pending transactions.
+
+        Args:
+            target: Amount (payment plus fee) the inputs must cover
+
+        Returns:
+            tuple: (list of (tx_id, output_index) outpoints, total input amount)
+        """
+        inputs = []
+        total = 0.0
+        for utxo in self.blockchain.get_spendable_utxos(self.address):
+            if total >= target:
+                break
+            inputs.append((utxo.transaction_id, utxo.output_index))
+            total += utxo.amount
+
+        if total < target:
+            raise ValueError("Insufficient unspent outputs (some are spent by pending transactions).")
+        return inputs, total
+
     def sign_transaction(self, transaction):
         if not self.private_key:
             raise ValueError("Private key is required.")
+        if not transaction.public_key and transaction.sender == self.address:
+            transaction.update(public_key=self.public_key_pem)
         return transaction.sign_transaction(self.private_key)
 
     def get_balance(self):
@@ -88,23 +159,26 @@ class Wallet:
             raise ValueError("Blockchain reference is required.")
         return self.blockchain.get_balance(self.address)
 
-    def get_transaction_history(self):
+    def get_transaction_history(self, offset=0, limit=None, start_time=None, end_time=None):
+        """
+        Confirmed transactions of this wallet, newest first, read from the
+        blockchain's address index. Use offset/limit to page through them and
+        start_time/end_time to restrict them to a time range.
+        """
         if not self.blockchain:
             raise ValueError("Blockchain reference is required.")
 
         txs = []
-        for block in self.blockchain.chain:
-            for tx in block.transactions:
-                if tx.sender == self.address or tx.receiver == self.address:
-                    txs.append({
-                        'tx_id': tx.tx_id,
-                        'timestamp': tx.timestamp,
-                        'amount': tx.amount,
-                        'type': "sent" if tx.sender == self.address else "received",
-                        'counterparty': tx.receiver if tx.sender == self.address else tx.sender,
-                        'block_index': block.index
-                    })
-        return sorted(txs, key=lambda x: x['timestamp'], reverse=True)
+        for height, tx in self.blockchain.get_address_history(self.address, start_time, end_time, offset, limit):
+            txs.append({
+                'tx_id': tx.tx_id,
+                'timestamp': tx.timestamp,
+                'amount': tx.amount,
+                'type': "sent" if tx.sender == self.address else "received",
+                'counterparty': tx.receiver if tx.sender == self.address else tx.sender,
+                'block_index': height
+            })
+        return txs
 
     def __repr__(self):
         balance = self.get_balance() if self.blockchain else "unknown"